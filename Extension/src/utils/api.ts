@@ -279,3 +279,33 @@ export async function getRelatedMarkets(marketId?: string, eventTitle?: string,
     throw error;
   }
 }
+
+export interface LivePricesResponse {
+  count: number;
+  prices: Record<string, number | null>;
+  missing: string[];
+}
+
+// Current prices for many CLOB tokens in one request (list views)
+export async function getLivePrices(tokenIds: string[]): Promise<Record<string, number | null>> {
+  const ids = Array.from(new Set(tokenIds.filter(Boolean)));
+  if (ids.length === 0) return {};
+
+  const prices: Record<string, number | null> = {};
+  try {
+    // The endpoint accepts at most 200 token IDs per call
+    for (let i = 0; i < ids.length; i += 200) {
+      const params = new URLSearchParams({ token_ids: ids.slice(i, i + 200).join(',') });
+      const response = await fetch(`${BACKEND_BASE_URL}/clob/prices?${params}`);
+      if (!response.ok) {
+        throw new Error(`API error: ${response.statusText}`);
+      }
+      const data: LivePricesResponse = await response.json();
+      Object.assign(prices, data.prices);
+    }
+    return prices;
+  } catch (error) {
+    console.error('[API] Error fetching live prices:', error);
+    throw error;
+  }
+}
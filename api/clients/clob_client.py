@@ -1,68 +1,134 @@
 """Polymarket CLOB API Client for live price data."""
 
-import httpx
+import asyncio
+import time
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
+from polymarket.get_markets_data import mids
+from polymarket.transport import aget
+from api.executor import run_blocking
+from api.clients.price_history_store import PriceHistoryStore, price_history_store
 
 CLOB_BASE = "https://clob.polymarket.com"
 TIMEOUT = 30
+# Concurrent price-history lookups for tokens with no midpoint
+MAX_HISTORY_FALLBACKS = 8
 
 class ClobClient:
-    def __init__(self):
+    def __init__(self, history_store: Optional[PriceHistoryStore] = None):
         self.base_url = CLOB_BASE
-        self.client = httpx.AsyncClient(timeout=TIMEOUT)
+        self.history_store = history_store or price_history_store
     
-    async def get_price_history(
+    async def _fetch_history(
         self,
         token_id: str,
-        start_time: Optional[datetime] = None,
-        end_time: Optional[datetime] = None
-    ) -> List[Dict[str, Any]]:
-        """Fetch price history for a token"""
+        start_ts: Optional[float] = None,
+        end_ts: Optional[float] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """GET /prices-history; None when the request fails"""
         params = {"token_id": token_id}
         
-        if start_time:
-            params["start_time"] = int(start_time.timestamp())
-        if end_time:
-            params["end_time"] = int(end_time.timestamp())
+        if start_ts:
+            params["start_time"] = int(start_ts)
+        if end_ts:
+            params["end_time"] = int(end_ts)
         
         try:
-            response = await self.client.get(
+            response = await aget(
                 f"{self.base_url}/prices-history",
-                params=params
+                params=params,
+                timeout=TIMEOUT,
             )
             response.raise_for_status()
             data = response.json()
+            if isinstance(data, dict):
+                data = data.get("history")
             if isinstance(data, list):
                 return data
             return []
         except Exception as e:
             print(f"Error fetching price history for {token_id}: {e}")
-            return []
+            return None
+    
+    async def get_price_history(
+        self,
+        token_id: str,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """Fetch price history for a token directly from CLOB"""
+        history = await self._fetch_history(
+            token_id,
+            start_time.timestamp() if start_time else None,
+            end_time.timestamp() if end_time else None,
+        )
+        return history or []
     
     async def get_price_history_window(
         self,
         token_id: str,
         days: int = 30
     ) -> List[Dict[str, Any]]:
-        """Get price history for a specific time window"""
-        end_time = datetime.utcnow()
-        start_time = end_time - timedelta(days=days)
-        return await self.get_price_history(token_id, start_time, end_time)
+        """
+        Get price history for a specific time window
+        
+        Served from the local price-history store; CLOB is only asked for
+        points newer than the last stored one (or for a range not stored yet).
+        """
+        end = time.time()
+        points = await self.history_store.window(token_id, end - days * 86400, end, self._fetch_history)
+        return [{"timestamp": int(t), "price": float(p)} for t, p in points]
     
     async def get_current_price(self, token_id: str) -> Optional[float]:
         """Get current price for a token"""
+        token_id = str(token_id).strip()
+        return (await self.get_current_prices([token_id])).get(token_id)
+    
+    async def get_current_prices(self, token_ids: List[str]) -> Dict[str, Optional[float]]:
+        """
+        Current prices for many tokens
+        
+        Midpoints come through the shared short-TTL midpoint cache (one bulk
+        /midpoints call for whatever is not cached). Tokens without a
+        midpoint, e.g. with an empty order book, fall back to their last
+        stored price-history point.
+        
+        Args:
+            token_ids: CLOB token IDs
+        
+        Returns:
+            Dictionary of token_id -> price (None if unavailable)
+        """
+        ids = list(dict.fromkeys(str(t).strip() for t in token_ids if str(t).strip()))
+        if not ids:
+            return {}
+        
+        prices: Dict[str, Optional[float]] = {}
         try:
-            history = await self.get_price_history_window(token_id, days=1)
-            if history:
-                # Get the most recent price
-                latest = max(history, key=lambda x: x.get("timestamp", 0))
-                price = latest.get("price") or latest.get("lastPrice") or latest.get("midPrice")
-                return float(price) if price is not None else None
-            return None
+            for token_id, value in (await run_blocking(mids, ids)).items():
+                prices[token_id] = float(value) if value is not None else None
         except Exception as e:
-            print(f"Error fetching current price for {token_id}: {e}")
-            return None
+            print(f"Error fetching midpoints for {len(ids)} tokens: {e}")
+        
+        missing = [t for t in ids if prices.get(t) is None]
+        if missing:
+            end = time.time()
+            semaphore = asyncio.Semaphore(MAX_HISTORY_FALLBACKS)
+            
+            async def last_traded(token_id: str) -> Optional[float]:
+                async with semaphore:
+                    points = await self.history_store.window(token_id, end - 86400, end, self._fetch_history)
+                # Points are sorted by time; the last one is the most recent price
+                return float(points[-1, 1]) if len(points) else None
+            
+            results = await asyncio.gather(*(last_traded(t) for t in missing), return_exceptions=True)
+            for token_id, price in zip(missing, results):
+                if isinstance(price, Exception):
+                    print(f"Error fetching current price for {token_id}: {price}")
+                    price = None
+                prices[token_id] = price
+        
+        return {t: prices.get(t) for t in ids}
     
     async def close(self):
-        await self.client.aclose()
+        """Nothing to release: requests go through the shared transport client"""
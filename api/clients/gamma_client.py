@@ -1,22 +1,23 @@
 """Polymarket Gamma API Client."""
 
-import httpx
 from typing import List, Dict, Any, Optional
 import json
 
+from polymarket.transport import aget
+
 GAMMA_BASE = "https://gamma-api.polymarket.com"
 TIMEOUT = 30
 
 class GammaClient:
     def __init__(self):
         self.base_url = GAMMA_BASE
-        self.client = httpx.AsyncClient(timeout=TIMEOUT)
     
     async def get_tags(self, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
         """Fetch all tags from Gamma API"""
-        response = await self.client.get(
+        response = await aget(
             f"{self.base_url}/tags",
-            params={"limit": limit, "offset": offset}
+            params={"limit": limit, "offset": offset},
+            timeout=TIMEOUT,
         )
         response.raise_for_status()
         data = response.json()
@@ -65,9 +66,10 @@ class GammaClient:
             "limit": limit,
             "offset": offset,
         }
-        response = await self.client.get(
+        response = await aget(
             f"{self.base_url}/events",
-            params=params
+            params=params,
+            timeout=TIMEOUT,
         )
         response.raise_for_status()
         data = response.json()
@@ -78,9 +80,10 @@ class GammaClient:
     async def get_market_by_slug(self, slug: str) -> Optional[Dict[str, Any]]:
         """Get market details by slug"""
         try:
-            response = await self.client.get(
+            response = await aget(
                 f"{self.base_url}/markets",
-                params={"slug": slug}
+                params={"slug": slug},
+                timeout=TIMEOUT,
             )
             response.raise_for_status()
             markets = response.json()
@@ -157,4 +160,4 @@ class GammaClient:
         return all_markets
     
     async def close(self):
-        await self.client.aclose()
+        """Nothing to release: requests go through the shared transport client"""
@@ -9,10 +9,30 @@ from typing import List, Dict, Any, Optional
 import os
 import numpy as np
 
+from api.executor import run_blocking
+from api.clients.embedding_cache import EmbeddingCache, embedding_cache
+
+def _word_overlap(text1: str, text2: str) -> float:
+    """Jaccard similarity of the lowercase word sets"""
+    words1 = set(text1.lower().split())
+    words2 = set(text2.lower().split())
+    if not words1 or not words2:
+        return 0.0
+    return len(words1 & words2) / len(words1 | words2)
+
+
+def _cosine_one_vs_many(primary: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """Cosine of primary against every row of matrix, clipped to [0, 1]"""
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(primary)
+    cosines = (matrix @ primary) / np.where(norms == 0, 1.0, norms)
+    return np.clip(cosines, 0.0, 1.0)
+
+
 class GeminiClient:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[EmbeddingCache] = None):
         """Initialize Gemini client with API key from env or parameter"""
         api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self.embedding_cache = cache or embedding_cache
         
         if genai is None or not api_key:
             print("⚠️  Gemini AI not available (missing google-generativeai or API key)")
@@ -33,38 +53,74 @@ class GeminiClient:
     
     def get_embedding(self, text: str) -> Optional[List[float]]:
         """Generate embedding for text using Gemini's embedding model"""
-        if not self.embedding_model:
-            return None
-        
-        try:
-            result = genai.embed_content(
-                model=self.embedding_model,
-                content=text,
-                task_type="retrieval_document"  # or "retrieval_query" for queries
-            )
-            embedding = result['embedding']
-            return embedding
-        except Exception as e:
-            print(f"Error generating embedding: {e}")
-            return None
+        return self._cached_embedding(text, "retrieval_document")
     
     def get_query_embedding(self, text: str) -> Optional[List[float]]:
         """Generate embedding for a query (optimized for search)"""
+        return self._cached_embedding(text, "retrieval_query")
+    
+    def _cached_embedding(self, text: str, task_type: str) -> Optional[List[float]]:
+        """Single-text embedding through the content-addressed cache"""
         if not self.embedding_model:
             return None
         
+        cached = self.embedding_cache.get(self.embedding_model, task_type, text)
+        if cached is not None:
+            return cached.tolist()
+        
         try:
             result = genai.embed_content(
                 model=self.embedding_model,
                 content=text,
-                task_type="retrieval_query"
+                task_type=task_type
             )
             embedding = result['embedding']
+            self.embedding_cache.put(self.embedding_model, task_type, text, embedding)
             return embedding
         except Exception as e:
-            print(f"Error generating query embedding: {e}")
+            print(f"Error generating {task_type} embedding: {e}")
             return None
     
+    def get_embeddings(
+        self,
+        texts: List[str],
+        task_type: str = "retrieval_document"
+    ) -> List[Optional[List[float]]]:
+        """
+        Embed many texts in one request (embed_content with list input)
+
+        Cached texts are served locally and only the rest are sent. Gemini
+        accepts up to 100 texts per call; callers batch accordingly.
+        Returns one embedding per text (None where the request failed).
+        """
+        if not self.embedding_model or not texts:
+            return [None] * len(texts)
+        
+        cached = self.embedding_cache.get_many(self.embedding_model, task_type, texts)
+        missing = [text for text in dict.fromkeys(texts) if text not in cached]
+        
+        embedded: Dict[str, List[float]] = {}
+        if missing:
+            try:
+                result = genai.embed_content(
+                    model=self.embedding_model,
+                    content=missing,
+                    task_type=task_type
+                )
+                embeddings = result['embedding']
+                if len(embeddings) == len(missing):
+                    embedded = dict(zip(missing, embeddings))
+                    self.embedding_cache.put_many(self.embedding_model, task_type, embedded)
+                else:
+                    print(f"Embedding batch size mismatch: sent {len(missing)}, got {len(embeddings)}")
+            except Exception as e:
+                print(f"Error generating batch embeddings: {e}")
+        
+        return [
+            cached[text].tolist() if text in cached else embedded.get(text)
+            for text in texts
+        ]
+    
     def extract_entities(self, text: str) -> Dict[str, Any]:
         """Extract entities and keywords from text using Gemini"""
         if not self.model:
@@ -110,18 +166,60 @@ Return only valid JSON."""
     def compute_semantic_similarity(
         self,
         text1: str,
-        text2: str
+        text2: str,
+        use_llm: bool = False
     ) -> float:
-        """Compute semantic similarity between two texts"""
+        """
+        Compute semantic similarity between two texts
+
+        By default this is the cosine of the two (cached) embeddings; pass
+        use_llm=True for the slower generate_content rating.
+        """
+        if use_llm:
+            return self.llm_similarity(text1, text2)
+        return self.semantic_similarities(text1, [text2])[0]
+    
+    def semantic_similarities(
+        self,
+        primary: str,
+        candidates: List[str],
+        rerank_top: int = 0
+    ) -> List[float]:
+        """
+        Similarity of one text against many, scored in a single matrix op
+
+        All texts are embedded in one batched call (served from the embedding
+        cache when possible) and compared by cosine, clipped to [0, 1]. Texts
+        without an embedding fall back to word overlap. If rerank_top > 0 the
+        best rerank_top candidates are re-scored with the LLM.
+        """
+        if not candidates:
+            return []
+        
+        scores = [_word_overlap(primary, text) for text in candidates]
+        texts = [primary] + list(candidates)
+        vectors: List[Optional[List[float]]] = []
+        for i in range(0, len(texts), 100):
+            vectors.extend(self.get_embeddings(texts[i:i + 100], task_type="semantic_similarity"))
+        if vectors[0] is not None:
+            present = [i for i, vector in enumerate(vectors[1:]) if vector is not None]
+            if present:
+                matrix = np.asarray([vectors[i + 1] for i in present], dtype=np.float32)
+                cosines = _cosine_one_vs_many(np.asarray(vectors[0], dtype=np.float32), matrix)
+                for i, value in zip(present, cosines):
+                    scores[i] = float(value)
+        
+        if rerank_top > 0 and self.model:
+            best = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)[:rerank_top]
+            for i in best:
+                scores[i] = self.llm_similarity(primary, candidates[i])
+        
+        return scores
+    
+    def llm_similarity(self, text1: str, text2: str) -> float:
+        """Ask Gemini to rate the similarity of two titles (one request per pair)"""
         if not self.model:
-            # Fallback: simple word overlap (Jaccard similarity)
-            words1 = set(text1.lower().split())
-            words2 = set(text2.lower().split())
-            if not words1 or not words2:
-                return 0.0
-            intersection = words1.intersection(words2)
-            union = words1.union(words2)
-            return len(intersection) / len(union) if union else 0.0
+            return _word_overlap(text1, text2)
         
         try:
             prompt = f"""Rate the semantic similarity between these two market titles on a scale of 0 to 1.
@@ -143,23 +241,10 @@ Return only a single number between 0 and 1 (e.g., 0.75)"""
                 return max(0.0, min(1.0, score))
             except:
                 # Fallback if parsing fails
-                words1 = set(text1.lower().split())
-                words2 = set(text2.lower().split())
-                if not words1 or not words2:
-                    return 0.0
-                intersection = words1.intersection(words2)
-                union = words1.union(words2)
-                return len(intersection) / len(union) if union else 0.0
+                return _word_overlap(text1, text2)
         except Exception as e:
             print(f"Error computing similarity with Gemini: {e}")
-            # Fallback
-            words1 = set(text1.lower().split())
-            words2 = set(text2.lower().split())
-            if not words1 or not words2:
-                return 0.0
-            intersection = words1.intersection(words2)
-            union = words1.union(words2)
-            return len(intersection) / len(union) if union else 0.0
+            return _word_overlap(text1, text2)
     
     async def rank_recommendations(
         self,
@@ -192,7 +277,8 @@ Candidates:
 
 Return the top {min(limit, len(candidate_markets))} most relevant market numbers (e.g., "1,3,7,...")"""
             
-            response = self.model.generate_content(prompt)
+            # The SDK call is blocking; keep it off the event loop
+            response = await run_blocking(self.model.generate_content, prompt)
             # Parse the response to get ranked indices
             ranked_indices = []
             for part in response.text.strip().split(','):
@@ -0,0 +1,239 @@
+"""Persistent per-token CLOB price history (one NumPy .npy file per token, memory-mapped reads)."""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from api.executor import run_blocking
+
+# One <sha1>.history.npy per token ("" disables persistence): float64 rows, the first holding
+# [covered_from, fetched_at] and the rest [timestamp, price], so points and metadata are
+# always replaced together
+PRICE_HISTORY_DIR = os.getenv(
+    "PRICE_HISTORY_DIR",
+    os.path.join(tempfile.gettempdir(), "polymarket_price_history"),
+)
+# A window is served from disk without asking CLOB for new points if the last fetch is this recent
+PRICE_HISTORY_REFRESH_SECONDS = float(os.getenv("PRICE_HISTORY_REFRESH_SECONDS", "60"))
+# Points older than this are dropped when a token's file is rewritten
+PRICE_HISTORY_RETENTION_DAYS = int(os.getenv("PRICE_HISTORY_RETENTION_DAYS", "400"))
+
+# fetch(token_id, start_ts, end_ts) -> history entries, or None if the request failed
+Fetcher = Callable[[str, float, float], Awaitable[Optional[List[Dict[str, Any]]]]]
+
+EMPTY = np.empty((0, 2), dtype=np.float64)
+
+
+def history_points(entries: List[Dict[str, Any]]) -> np.ndarray:
+    """[timestamp seconds, price] rows from CLOB history entries, sorted by time"""
+    rows = []
+    for entry in entries or []:
+        timestamp = entry.get("timestamp") or entry.get("time") or entry.get("t")
+        price = entry.get("price") or entry.get("lastPrice") or entry.get("midPrice") or entry.get("p")
+        try:
+            timestamp = float(timestamp)
+            price = float(price)
+        except (TypeError, ValueError):
+            continue
+        rows.append((timestamp / 1000 if timestamp > 1e11 else timestamp, price))
+    if not rows:
+        return EMPTY
+    points = np.asarray(rows, dtype=np.float64)
+    return points[np.argsort(points[:, 0], kind="stable")]
+
+
+def merge_points(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+    """Union of two sorted point arrays; on equal timestamps the new price wins"""
+    combined = np.concatenate([old, new])
+    combined = combined[np.argsort(combined[:, 0], kind="stable")]
+    timestamps = combined[:, 0]
+    keep = np.append(timestamps[1:] != timestamps[:-1], True)
+    return combined[keep]
+
+
+class PriceHistoryStore:
+    """
+    Local time-series store for CLOB price history.
+
+    Each token keeps one .npy file: a header row recording the range already
+    covered and when CLOB was last asked, then its points. A window request
+    is answered from the memory-mapped file; only the part not yet stored
+    (older than covered_from, or newer than the last stored point) is
+    fetched from CLOB and merged in. Concurrent requests for one token share
+    a single fetch.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = PRICE_HISTORY_DIR,
+        refresh_seconds: float = PRICE_HISTORY_REFRESH_SECONDS,
+        retention_days: int = PRICE_HISTORY_RETENTION_DAYS,
+    ):
+        self.path = path or None
+        self.refresh_seconds = refresh_seconds
+        self.retention_days = retention_days
+        self._memory: Dict[str, Tuple[np.ndarray, Dict[str, float]]] = {}
+        # Per-token locks, dropped once no request holds or waits on them
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+        self.local_hits = 0
+        self.delta_fetches = 0
+        self.full_fetches = 0
+        self.fetch_errors = 0
+        if self.path:
+            try:
+                os.makedirs(self.path, exist_ok=True)
+            except OSError as e:
+                print(f"[PriceHistoryStore] Persistence disabled ({self.path}): {e}")
+                self.path = None
+
+    def _file(self, token_id: str) -> str:
+        name = hashlib.sha1(str(token_id).encode("utf-8")).hexdigest()
+        return os.path.join(self.path, f"{name}.history.npy")
+
+    def read(self, token_id: str) -> Tuple[np.ndarray, Optional[Dict[str, float]]]:
+        """Stored points (memory-mapped, read-only) and metadata; (EMPTY, None) if unknown"""
+        if not self.path:
+            return self._memory.get(token_id, (EMPTY, None))
+        try:
+            stored = np.load(self._file(token_id), mmap_mode="r")
+            if stored.ndim != 2 or stored.shape[1] != 2 or len(stored) == 0:
+                raise ValueError(f"unexpected shape {stored.shape}")
+            meta = {
+                "token_id": str(token_id),
+                "covered_from": float(stored[0, 0]),
+                "fetched_at": float(stored[0, 1]),
+            }
+            return stored[1:], meta
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"[PriceHistoryStore] Ignoring unreadable history for {token_id}: {e}")
+            return EMPTY, None
+
+    def _replace(self, target: str, mode: str, dump: Callable[[Any], None]) -> None:
+        """Write via a uniquely named temp file in the store dir, then rename over target"""
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, mode) as f:
+                dump(f)
+            os.replace(tmp, target)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def write(self, token_id: str, points: np.ndarray, meta: Dict[str, float]) -> None:
+        """Replace a token's points and metadata together (one atomic rename, safe across processes)"""
+        if not self.path:
+            self._memory[token_id] = (points, meta)
+            return
+        header = np.array([[meta["covered_from"], meta["fetched_at"]]], dtype=np.float64)
+        stored = np.concatenate([header, np.asarray(points, dtype=np.float64).reshape(-1, 2)])
+        try:
+            self._replace(self._file(token_id), "wb", lambda f: np.save(f, stored))
+        except OSError as e:
+            print(f"[PriceHistoryStore] Write failed for {token_id}: {e}")
+
+    def _update(
+        self,
+        token_id: str,
+        points: np.ndarray,
+        meta: Optional[Dict[str, float]],
+        new_points: np.ndarray,
+        start: float,
+        now: float,
+    ) -> np.ndarray:
+        merged = merge_points(np.asarray(points), new_points)
+        cutoff = now - self.retention_days * 86400
+        merged = merged[merged[:, 0] >= cutoff]
+        covered_from = min(start, meta["covered_from"]) if meta else start
+        self.write(token_id, merged, {
+            "token_id": str(token_id),
+            "covered_from": max(covered_from, cutoff),
+            "fetched_at": now,
+        })
+        return merged
+
+    def _count(self, counter: str) -> None:
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    async def window(self, token_id: str, start: float, end: float, fetch: Fetcher) -> np.ndarray:
+        """
+        Points with start <= timestamp <= end
+
+        Args:
+            token_id: CLOB token ID
+            start, end: Unix seconds
+            fetch: Upstream fetcher used for whatever is not stored yet
+
+        Returns:
+            float64 array of [timestamp, price] rows (a copy)
+        """
+        lock = self._locks.get(token_id)
+        if lock is None:
+            lock = self._locks[token_id] = asyncio.Lock()
+        self._lock_users[token_id] = self._lock_users.get(token_id, 0) + 1
+        try:
+            async with lock:
+                return await self._window(token_id, start, end, fetch)
+        finally:
+            self._lock_users[token_id] -= 1
+            if not self._lock_users[token_id]:
+                del self._lock_users[token_id]
+                del self._locks[token_id]
+
+    async def _window(self, token_id: str, start: float, end: float, fetch: Fetcher) -> np.ndarray:
+        points, meta = await run_blocking(self.read, token_id)
+        now = time.time()
+
+        fetch_from = None
+        if meta is None or start < meta["covered_from"]:
+            # Nothing stored for the start of this window: fetch all of it
+            fetch_from = start
+            counter = "full_fetches"
+        elif end > meta["fetched_at"] and now - meta["fetched_at"] >= self.refresh_seconds:
+            # Only what is newer than the last stored point
+            fetch_from = float(points[-1, 0]) if len(points) else meta["fetched_at"]
+            counter = "delta_fetches"
+        else:
+            self._count("local_hits")
+
+        if fetch_from is not None:
+            entries = await fetch(token_id, fetch_from, now)
+            if entries is None:
+                self._count("fetch_errors")
+            else:
+                self._count(counter)
+                points = await run_blocking(
+                    self._update, token_id, points, meta, history_points(entries), start, now
+                )
+
+        timestamps = np.asarray(points)[:, 0]
+        lo = np.searchsorted(timestamps, start, side="left")
+        hi = np.searchsorted(timestamps, end, side="right")
+        return np.array(points[lo:hi])
+
+    def stats(self) -> Dict[str, object]:
+        with self._stats_lock:
+            return {
+                "tokens_in_flight": len(self._locks),
+                "local_hits": self.local_hits,
+                "delta_fetches": self.delta_fetches,
+                "full_fetches": self.full_fetches,
+                "fetch_errors": self.fetch_errors,
+                "path": self.path,
+            }
+
+
+# Process-wide store shared by every ClobClient
+price_history_store = PriceHistoryStore()
@@ -0,0 +1,41 @@
+"""
+Bounded executor for blocking work on the request path.
+
+Async endpoints hand synchronous Supabase/psycopg2/requests/Gemini calls to
+run_blocking() so they never run on the event loop. The pool size caps how
+many blocking calls run at once (BLOCKING_WORKERS); extra calls queue rather
+than spawning threads.
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+BLOCKING_WORKERS = int(os.getenv("BLOCKING_WORKERS", "32"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="blocking")
+    return _executor
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run fn(*args, **kwargs) on the bounded executor and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(fn, *args, **kwargs))
+
+
+def shutdown_executor() -> None:
+    """Stop accepting work and release idle threads (app shutdown)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -16,6 +16,10 @@ else:
     # Fallback: load from current directory or environment
     load_dotenv()
 
+import asyncio
+import time
+from datetime import datetime, timezone
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
@@ -23,22 +27,87 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from typing import Optional
 
 from polymarket.get_markets_data import ui
-from polymarket.get_similar_markets import get_similar_by_event_title
+from polymarket.midpoint_cache import midpoint_cache
+from polymarket.get_similar_markets import (
+    get_similar_by_event_title,
+    fetch_markets_by_token_ids,
+    fetch_precomputed_neighbors,
+    match_similar_markets,
+)
 from polymarket.get_related_traded import get_related_traded
-from polymarket.news import fetch_news
-from polymarket.get_whales_data import top5_latest_trade_cards
-from services.trending import TrendingService
+from api.executor import run_blocking, shutdown_executor
+from database.supabase_connection import close_connection_manager, get_connection_manager, init_connection_manager
+from polymarket.transport import aclose_async_client
+from polymarket.news_cache import fetch_news_cached, news_cache
+from polymarket.whale_snapshots import WHALES_REFRESH_SECONDS, whale_snapshots
+from services.trending import LEADERBOARD_MAX_AGE, TrendingService
 from services.polymarket_api import PolymarketAPIService
+from services.vector_index import VectorIndex
 
 # Import advanced API clients
 from api.clients.gamma_client import GammaClient
 from api.clients.clob_client import ClobClient
 from api.clients.gemini_client import GeminiClient
+from api.clients.embedding_cache import embedding_cache
+from api.clients.price_history_store import price_history_store
+
+# How often the resident vector index pulls newly embedded/updated markets
+VECTOR_INDEX_REFRESH_SECONDS = float(os.getenv("VECTOR_INDEX_REFRESH_SECONDS", "300"))
+# Most token IDs accepted by one /clob/prices call
+MAX_PRICE_BATCH = 200
+
+
+async def _maintain_vector_index():
+    """Load the vector index once, then refresh it incrementally in the background"""
+    index = get_vector_index()
+    while True:
+        try:
+            await asyncio.to_thread(index.refresh)
+        except Exception as e:
+            print(f"[VectorIndex] Refresh failed: {e}")
+        await asyncio.sleep(VECTOR_INDEX_REFRESH_SECONDS)
+
+
+async def _maintain_whale_snapshots():
+    """Rebuild the per-category whale card snapshots on an interval"""
+    while True:
+        await asyncio.to_thread(whale_snapshots.refresh_all)
+        await asyncio.sleep(WHALES_REFRESH_SECONDS)
+
+
+async def _maintain_trending_leaderboard():
+    """Rebuild the trending leaderboard on an interval, off the request path"""
+    while True:
+        try:
+            await asyncio.to_thread(get_trending_service().refresh_leaderboard)
+        except Exception as e:
+            print(f"[Trending] Leaderboard rebuild failed: {e}")
+        await asyncio.sleep(LEADERBOARD_MAX_AGE)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: open the shared database client/pool once for the process
+    await asyncio.to_thread(init_connection_manager)
+    # Warm the vector index, whale snapshots and trending leaderboard without delaying the first requests
+    index_task = asyncio.create_task(_maintain_vector_index())
+    whales_task = asyncio.create_task(_maintain_whale_snapshots())
+    leaderboard_task = asyncio.create_task(_maintain_trending_leaderboard())
+    yield
+    # Shutdown
+    index_task.cancel()
+    whales_task.cancel()
+    leaderboard_task.cancel()
+    await aclose_async_client()
+    shutdown_executor()
+    close_connection_manager()
+
 
 app = FastAPI(
     title="NexHacks Polymarket Correlation Tool",
     version="1.0.0",
     description="API for Polymarket correlation, trending, and parlay suggestions",
+    lifespan=lifespan,
 )
 
 # Request logging middleware to add PNA header for Chrome Private Network Access
@@ -101,6 +170,9 @@ _gamma_client: Optional[GammaClient] = None
 _clob_client: Optional[ClobClient] = None
 _gemini_client: Optional[GeminiClient] = None
 
+# Resident embedding index for /similar (loaded at startup)
+_vector_index: Optional[VectorIndex] = None
+
 def get_trending_service() -> TrendingService:
     """Get or create TrendingService instance"""
     global _trending_service
@@ -112,7 +184,7 @@ def get_polymarket_api() -> PolymarketAPIService:
     """Get or create PolymarketAPIService instance"""
     global _polymarket_api
     if _polymarket_api is None:
-        _polymarket_api = PolymarketAPIService()
+        _polymarket_api = PolymarketAPIService(trending_service=get_trending_service())
     return _polymarket_api
 
 def get_gamma_client() -> GammaClient:
@@ -136,6 +208,13 @@ def get_gemini_client() -> GeminiClient:
         _gemini_client = GeminiClient()
     return _gemini_client
 
+def get_vector_index() -> VectorIndex:
+    """Get or create the in-process vector index"""
+    global _vector_index
+    if _vector_index is None:
+        _vector_index = VectorIndex()
+    return _vector_index
+
 
 @app.get("/")
 def root():
@@ -174,6 +253,23 @@ def test_cors():
     # #endregion
     return {"status": "ok", "cors": "enabled", "message": "CORS test successful"}
 
+@app.get("/cache/stats")
+def cache_stats():
+    """Hit/miss counters for the in-process caches"""
+    return {
+        "midpoints": midpoint_cache.stats(),
+        "vector_index": get_vector_index().stats(),
+        "news": news_cache.stats(),
+        "whales": whale_snapshots.stats(),
+        "embeddings": embedding_cache.stats(),
+        "price_history": price_history_store.stats(),
+    }
+
+@app.get("/health/db")
+async def database_health():
+    """Shared PostgREST client and psycopg2 pool status (runs SELECT 1 through the pool)"""
+    return await run_blocking(get_connection_manager().health)
+
 @app.get("/favicon.ico")
 @app.get("/favicon.png")
 @app.head("/favicon.ico")
@@ -184,7 +280,7 @@ def favicon():
     return Response(status_code=204)
 
 @app.get("/markets/trending")
-def get_trending_markets(
+async def get_trending_markets(
     category: Optional[str] = Query(None, description="Filter by category (e.g., politics, sports, tech)"),
     limit: int = Query(20, ge=1, le=100, description="Maximum number of results"),
     min_score: float = Query(0.0, ge=0.0, le=1.0, description="Minimum trending score"),
@@ -199,7 +295,8 @@ def get_trending_markets(
     """
     try:
         service = get_trending_service()
-        markets = service.get_trending_markets(
+        markets = await run_blocking(
+            service.get_trending_markets,
             category=category,
             limit=limit,
             min_score=min_score,
@@ -225,7 +322,7 @@ def get_trending_markets(
 
 
 @app.get("/markets/trending/refresh")
-def refresh_trending_data(
+async def refresh_trending_data(
     limit: int = Query(100, ge=1, le=500, description="Number of markets to fetch from Polymarket"),
 ):
     """
@@ -236,7 +333,7 @@ def refresh_trending_data(
     """
     try:
         api_service = get_polymarket_api()
-        updated = api_service.fetch_and_update_metrics(limit=limit)
+        updated = await run_blocking(api_service.fetch_and_update_metrics, limit=limit)
         return {
             "success": True,
             "markets_updated": updated,
@@ -248,10 +345,10 @@ def refresh_trending_data(
 
 
 @app.get("/ui")
-def get_ui(token_id: str = Query(..., description="CLOB token id")):
+async def get_ui(token_id: str = Query(..., description="CLOB token id")):
     """Get market UI data by CLOB token ID (existing endpoint)"""
     try:
-        data = ui(token_id.strip())
+        data = await run_blocking(ui, token_id.strip())
         if not data:
             raise HTTPException(status_code=404, detail="Market not found")
         return JSONResponse(content=data)
@@ -261,27 +358,19 @@ def get_ui(token_id: str = Query(..., description="CLOB token id")):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/similar")
-async def get_similar(
-    event_title: str = Query(..., description="Market question to search for"),
-    use_cosine: bool = Query(True, description="Use cosine similarity scores"),
-    min_similarity: float = Query(0.5, description="Minimum cosine similarity threshold"),
-    use_embeddings: bool = Query(True, description="Use embedding-based semantic search (recommended)")
+def _similar_markets(
+    event_title: str,
+    use_cosine: bool = True,
+    min_similarity: float = 0.5,
+    use_embeddings: bool = True,
+    index_only: bool = False,
 ):
-    """
-    Get similar markets using multiple strategies (in priority order):
-    1. Embedding-based semantic search (if use_embeddings=True) - MOST ACCURATE
-    2. Cosine similarity from similarity_scores table
-    3. Tag-based matching (markets with same tag_label)
-    4. Fuzzy text matching on question field
-    
-    Returns markets sorted by similarity score.
-    """
+    """Blocking body of /similar (Supabase); run via run_blocking"""
     import logging
     import json
     import re
     import numpy as np
-    from database.supabase_connection import SupabaseConnection
+    from database.supabase_connection import get_supabase_client
     
     logging.basicConfig(level=logging.INFO)
     logger = logging.getLogger(__name__)
@@ -331,100 +420,108 @@ async def get_similar(
     
     try:
         logger.info(f"[SIMILAR] Starting search for: '{event_title}'")
-        logger.info(f"[SIMILAR] use_embeddings={use_embeddings}, use_cosine={use_cosine}, min_similarity={min_similarity}")
-        
-        conn = SupabaseConnection()
-        client = conn.get_client()
+        logger.info(f"[SIMILAR] use_embeddings={use_embeddings}, use_cosine={use_cosine}, min_similarity={min_similarity}, index_only={index_only}")
         
         similar_markets = []
         source_market = None
+        skip_database = False
+        
+        # Strategy 0a: In-process vector index (exact title match, no database round trip)
+        vector_index = get_vector_index()
+        if use_embeddings and vector_index.is_warm:
+            logger.info("[SIMILAR] Strategy 0: In-process vector index search...")
+            source_market = vector_index.find_by_question(event_title)
+            
+            if source_market:
+                logger.info(f"[SIMILAR] Found source market in index: {source_market['question']}")
+                for hit in vector_index.search(source_market["market_id"], k=20, min_similarity=min_similarity):
+                    similar_markets.append({
+                        "market_id": hit["market_id"],
+                        "question": hit["question"],
+                        "market_slug": hit.get("market_slug"),
+                        "tag_label": hit.get("tag_label"),
+                        "cosine_similarity": hit["similarity"],
+                        "match_type": "embedding_similarity"
+                    })
+                logger.info(f"[SIMILAR] Found {len(similar_markets)} similar markets via vector index")
+                skip_database = index_only
+            else:
+                logger.info("[SIMILAR] Source market not in vector index, falling back to database")
+        
+        client = None
+        if not skip_database:
+            client = get_supabase_client()
         
-        # Strategy 0: Embedding-based semantic search (MOST ACCURATE)
-        if use_embeddings:
+        # Strategy 0b: Source found by substring in the database; neighbours from the index if it
+        # holds the market, otherwise embedding search in pgvector
+        if use_embeddings and not source_market and not skip_database:
             logger.info("[SIMILAR] Strategy 0: Embedding-based semantic search...")
             
             # Find source market by matching the scraped title
             source_search = f"%{event_title}%"
             source_markets = client.table("markets").select(
-                "market_id, question, market_slug, tag_label, clob_token_ids, embedding"
+                "market_id, question, market_slug, tag_label, clob_token_ids"
             ).ilike("question", source_search).limit(1).execute()
             
             if source_markets.data:
                 source_market = source_markets.data[0]
-                source_embedding = source_market.get('embedding')
-                
                 logger.info(f"[SIMILAR] Found source market: {source_market['question']}")
-                logger.info(f"[SIMILAR] Source has embedding: {source_embedding is not None}")
                 
-                if source_embedding:
-                    # Use pgvector cosine distance to find similar markets
-                    # Supabase/PostgreSQL pgvector uses <=> operator for cosine distance
-                    # We'll use RPC function or raw SQL for vector similarity search
-                    try:
-                        # Query using pgvector cosine distance
-                        # Note: Supabase Python client doesn't directly support vector operators,
-                        # so we'll use a raw SQL query via RPC or execute raw SQL
-                        from database.supabase_connection import get_connection
-                        db_conn = get_connection()
+                try:
+                    # Resident index when it holds the source; otherwise precomputed neighbour
+                    # lists (one indexed lookup), then a live search inside Postgres (HNSW
+                    # index) for markets the batch job has not covered yet
+                    embedding_results = []
+                    if vector_index.is_warm and vector_index.get(source_market['market_id']):
+                        # Title only partially matched the question, but the market is indexed
+                        embedding_results = vector_index.search(
+                            source_market['market_id'], k=20, min_similarity=min_similarity
+                        )
+                        logger.info(f"[SIMILAR] Found {len(embedding_results)} similar markets via vector index")
+                    else:
+                        try:
+                            embedding_results = [
+                                {**row, "market_id": row["neighbor_market_id"]}
+                                for row in fetch_precomputed_neighbors(
+                                    client, source_market['market_id'], limit=20, min_similarity=min_similarity
+                                )
+                            ]
+                        except Exception as e:
+                            # e.g. migration 008 not applied yet; the live search still works
+                            logger.warning(f"[SIMILAR] Precomputed neighbour lookup failed, using live search: {e}")
                         
-                        if db_conn:
-                            # Convert embedding to string format for SQL
-                            if isinstance(source_embedding, list):
-                                embedding_str = '[' + ','.join(map(str, source_embedding)) + ']'
-                            else:
-                                embedding_str = str(source_embedding)
-                            
-                            # Use pgvector cosine distance operator (<=>)
-                            # 1 - (embedding <=> query_embedding) gives cosine similarity
-                            query = f"""
-                            SELECT 
-                                market_id,
-                                question,
-                                market_slug,
-                                tag_label,
-                                clob_token_ids,
-                                1 - (embedding <=> '{embedding_str}'::vector) as similarity
-                            FROM markets
-                            WHERE embedding IS NOT NULL
-                                AND market_id != %s
-                            ORDER BY embedding <=> '{embedding_str}'::vector
-                            LIMIT 20
-                            """
-                            
-                            import psycopg2.extras
-                            cursor = db_conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-                            cursor.execute(query, (source_market['market_id'],))
-                            embedding_results = cursor.fetchall()
-                            cursor.close()
-                            
-                            logger.info(f"[SIMILAR] Found {len(embedding_results)} similar markets via embeddings")
-                            
-                            for row in embedding_results:
-                                similarity = float(row['similarity'])
-                                if similarity >= min_similarity:
-                                    similar_markets.append({
-                                        "market_id": row['market_id'],
-                                        "question": row['question'],
-                                        "market_slug": row.get('market_slug'),
-                                        "tag_label": row.get('tag_label'),
-                                        "cosine_similarity": similarity,
-                                        "match_type": "embedding_similarity"
-                                    })
-                                    
-                                    if len(similar_markets) <= 3:
-                                        logger.info(f"[SIMILAR] Added embedding match: {row['question'][:80]}... (similarity={similarity:.4f})")
+                        if embedding_results:
+                            logger.info(f"[SIMILAR] Found {len(embedding_results)} precomputed neighbours")
                         else:
-                            logger.warning("[SIMILAR] Could not get database connection for vector search")
-                    except Exception as e:
-                        logger.warning(f"[SIMILAR] Error in embedding search: {e}")
-                        logger.info("[SIMILAR] Falling back to other strategies...")
-                else:
-                    logger.info("[SIMILAR] Source market has no embedding, skipping embedding search")
+                            embedding_results = match_similar_markets(
+                                client, source_market['market_id'], match_count=20, min_similarity=min_similarity
+                            )
+                            logger.info(f"[SIMILAR] Found {len(embedding_results)} similar markets via embeddings")
+                    
+                    for row in embedding_results:
+                        similarity = float(row['similarity'])
+                        similar_markets.append({
+                            "market_id": row['market_id'],
+                            "question": row['question'],
+                            "market_slug": row.get('market_slug'),
+                            "tag_label": row.get('tag_label'),
+                            "cosine_similarity": similarity,
+                            "match_type": "embedding_similarity"
+                        })
+                        
+                        if len(similar_markets) <= 3:
+                            logger.info(f"[SIMILAR] Added embedding match: {row['question'][:80]}... (similarity={similarity:.4f})")
+                    
+                    if not embedding_results:
+                        logger.info("[SIMILAR] No embedding matches (source may have no embedding)")
+                except Exception as e:
+                    logger.warning(f"[SIMILAR] Error in embedding search: {e}")
+                    logger.info("[SIMILAR] Falling back to other strategies...")
             else:
                 logger.info("[SIMILAR] Source market not found, skipping embedding search")
         
         # Strategy 1: Find source market and use cosine similarity from similarity_scores table
-        if use_cosine:
+        if use_cosine and not skip_database:
             logger.info("[SIMILAR] Strategy 1: Looking for source market...")
             
             # Find source market by fuzzy matching first
@@ -458,7 +555,14 @@ async def get_similar(
                             
                             logger.info(f"[SIMILAR] Found {len(similarity_results.data)} similarity scores")
                             
-                            # Get market details for similar markets
+                            # Get market details for all similar markets in one batched lookup
+                            # (both normalized and original formats, as stored ids vary)
+                            lookup_ids = []
+                            for sim in similarity_results.data:
+                                lookup_ids.append(normalize_token_ids(sim['neighbor_clob_token_ids']))
+                                lookup_ids.append(sim['neighbor_clob_token_ids'])
+                            market_memo = fetch_markets_by_token_ids(client, lookup_ids, {})
+                            
                             for sim in similarity_results.data:
                                 neighbor_ids = sim['neighbor_clob_token_ids']
                                 cosine_sim = float(sim['cosine_similarity'])
@@ -469,19 +573,11 @@ async def get_similar(
                                 # Find market with these clob_token_ids (try both normalized and original)
                                 neighbor_market = None
                                 if neighbor_ids_normalized:
-                                    neighbor_market_result = client.table("markets").select(
-                                        "market_id, question, market_slug, tag_label"
-                                    ).eq("clob_token_ids", neighbor_ids_normalized).limit(1).execute()
-                                    if neighbor_market_result.data:
-                                        neighbor_market = neighbor_market_result.data[0]
+                                    neighbor_market = market_memo.get(neighbor_ids_normalized)
                                 
                                 # Fallback: try original format
                                 if not neighbor_market:
-                                    neighbor_market_result = client.table("markets").select(
-                                        "market_id, question, market_slug, tag_label"
-                                    ).eq("clob_token_ids", neighbor_ids).limit(1).execute()
-                                    if neighbor_market_result.data:
-                                        neighbor_market = neighbor_market_result.data[0]
+                                    neighbor_market = market_memo.get(neighbor_ids)
                                 
                                 if neighbor_market:
                                     # Skip if it's the same market
@@ -507,7 +603,7 @@ async def get_similar(
         
         # Strategy 2: Tag-based matching (find markets with same tag_label)
         # This is CRITICAL for relevance - prioritize same category
-        if len(similar_markets) < 10 and source_market:
+        if len(similar_markets) < 10 and source_market and not skip_database:
             tag_label = source_market.get('tag_label')
             if tag_label:
                 logger.info(f"[SIMILAR] Strategy 2: Tag-based search (tag: {tag_label})...")
@@ -535,7 +631,7 @@ async def get_similar(
                             logger.info(f"[SIMILAR] Added tag match: {market['question'][:80]}...")
         
         # Strategy 3: Improved fuzzy text search with better keyword filtering
-        if len(similar_markets) < 10:
+        if len(similar_markets) < 10 and not skip_database:
             logger.info("[SIMILAR] Strategy 3: Improved fuzzy text search...")
             
             # Extract meaningful keywords (filter out common/stop words and years)
@@ -690,7 +786,7 @@ async def get_similar(
             "event_title": event_title,
             "similar_markets": similar_markets,
             "count": len(similar_markets),
-            "strategy_used": "cosine_similarity" if any(m.get("match_type") == "cosine_similarity" for m in similar_markets) else ("tag_match" if any(m.get("match_type") == "tag_match" for m in similar_markets) else "text_fuzzy")
+            "strategy_used": "embedding_similarity" if any(m.get("match_type") == "embedding_similarity" for m in similar_markets) else "cosine_similarity" if any(m.get("match_type") == "cosine_similarity" for m in similar_markets) else ("tag_match" if any(m.get("match_type") == "tag_match" for m in similar_markets) else "text_fuzzy")
         })
         
     except Exception as e:
@@ -698,8 +794,39 @@ async def get_similar(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/similar")
+async def get_similar(
+    event_title: str = Query(..., description="Market question to search for"),
+    use_cosine: bool = Query(True, description="Use cosine similarity scores"),
+    min_similarity: float = Query(0.5, description="Minimum cosine similarity threshold"),
+    use_embeddings: bool = Query(True, description="Use embedding-based semantic search (recommended)"),
+    index_only: bool = Query(False, description="Answer from the in-process vector index alone when it is warm (no database round trips)")
+):
+    """
+    Get similar markets using multiple strategies (in priority order):
+    1. Embedding-based semantic search (if use_embeddings=True) - MOST ACCURATE
+       Served from the in-process vector index when warm, pgvector otherwise
+    2. Cosine similarity from similarity_scores table
+    3. Tag-based matching (markets with same tag_label)
+    4. Fuzzy text matching on question field
+    
+    With index_only=True and a warm index, embedding matches are returned
+    without touching the database.
+    
+    Returns markets sorted by similarity score.
+    """
+    return await run_blocking(
+        _similar_markets,
+        event_title,
+        use_cosine=use_cosine,
+        min_similarity=min_similarity,
+        use_embeddings=use_embeddings,
+        index_only=index_only,
+    )
+
+
 @app.get("/markets/{market_id}/related")
-def get_related_markets(
+async def get_related_markets(
     market_id: str,
     limit: int = Query(10, ge=1, le=50, description="Maximum number of related markets"),
     relationship_types: Optional[str] = Query(
@@ -715,14 +842,14 @@ def get_related_markets(
         if relationship_types:
             types_list = [t.strip() for t in relationship_types.split(",")]
 
-        data = get_related_traded(market_id=market_id, limit=limit, relationship_types=types_list)
+        data = await run_blocking(get_related_traded, market_id=market_id, limit=limit, relationship_types=types_list)
         return JSONResponse(content=data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/related")
-def get_related(
+async def get_related(
     market_id: Optional[str] = Query(None, description="Market ID"),
     event_title: Optional[str] = Query(None, description="Event title"),
     limit: int = Query(10, ge=1, le=50, description="Maximum number of related markets"),
@@ -739,7 +866,8 @@ def get_related(
         if relationship_types:
             types_list = [t.strip() for t in relationship_types.split(",")]
 
-        data = get_related_traded(
+        data = await run_blocking(
+            get_related_traded,
             market_id=market_id,
             event_title=event_title,
             limit=limit,
@@ -753,15 +881,17 @@ def get_related(
 
 
 @app.get("/news")
-def get_news(
+async def get_news(
     question: str = Query(..., description="Market question to search for news"),
+    deadline: float = Query(8.0, gt=0, le=60, description="Overall time budget for the search, in seconds"),
 ):
     """
     Get recent news articles related to a market question.
     Uses GNews API to find relevant articles from the past 30 days.
+    Results are cached by the question's core terms (see polymarket/news_cache.py).
     """
     try:
-        articles = fetch_news(question.strip())
+        articles = await run_blocking(fetch_news_cached, question.strip(), deadline=deadline)
         return JSONResponse(
             content={
                 "question": question,
@@ -896,6 +1026,36 @@ async def get_live_price(token_id: str):
         raise HTTPException(status_code=500, detail=f"Error fetching live price: {str(e)}")
 
 
+@app.get("/clob/prices")
+async def get_live_prices(
+    token_ids: str = Query(..., description="Comma-separated CLOB token IDs")
+):
+    """
+    Get current live prices for many CLOB token IDs in one call.
+    
+    Intended for list views: prices come from CLOB midpoints through the
+    shared short-TTL cache, fetched in bulk. Tokens with no price are null.
+    """
+    ids = list(dict.fromkeys(t.strip() for t in token_ids.split(",") if t.strip()))
+    if not ids:
+        raise HTTPException(status_code=400, detail="token_ids is required")
+    if len(ids) > MAX_PRICE_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PRICE_BATCH} token_ids per request")
+    
+    try:
+        clob = get_clob_client()
+        prices = await clob.get_current_prices(ids)
+        
+        return JSONResponse(content={
+            "count": len(ids),
+            "prices": prices,
+            "missing": [t for t in ids if prices.get(t) is None],
+        })
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching live prices: {str(e)}")
+
+
 @app.get("/clob/price-history/{token_id}")
 async def get_price_history(
     token_id: str,
@@ -921,6 +1081,95 @@ async def get_price_history(
         raise HTTPException(status_code=500, detail=f"Error fetching price history: {str(e)}")
 
 
+def _ai_similar_candidates(event_title: str, min_similarity: float, limit: int):
+    """
+    Blocking database half of /ai/similar; run via run_blocking
+
+    Returns:
+        (source_market, similar_markets) before AI ranking
+    """
+    import logging
+    logger = logging.getLogger(__name__)
+    
+    from database.supabase_connection import get_supabase_client
+    client = get_supabase_client()
+    
+    # Step 1: Find source market using fuzzy matching
+    fuzzy_query = f"%{event_title}%"
+    source_result = client.table("markets").select(
+        "question, clob_token_ids, market_slug"
+    ).ilike("question", fuzzy_query).limit(1).execute()
+    
+    if not source_result.data:
+        logger.warning(f"[AI Similar] No source market found for: {event_title}")
+        raise HTTPException(status_code=404, detail="Source market not found")
+    
+    source_market = source_result.data[0]
+    source_token_ids = source_market.get("clob_token_ids")
+    
+    logger.info(f"[AI Similar] Found source: {source_market.get('question')}")
+    logger.info(f"[AI Similar] Token IDs: {source_token_ids}")
+    
+    if not source_token_ids:
+        logger.warning(f"[AI Similar] No token IDs for source market")
+        raise HTTPException(status_code=404, detail="Source market has no token IDs")
+    
+    # Step 2: Get similar markets by cosine similarity
+    similarity_result = client.table("similarity_scores").select(
+        "market_id_1, market_id_2, cosine_similarity"
+    ).or_(
+        f"market_id_1.eq.{source_token_ids},market_id_2.eq.{source_token_ids}"
+    ).gte("cosine_similarity", min_similarity).order(
+        "cosine_similarity", desc=True
+    ).limit(limit * 2).execute()  # Fetch more for AI ranking
+    
+    if not similarity_result.data:
+        logger.warning(f"[AI Similar] No cosine similarity matches found")
+        # Fallback to fuzzy text search
+        fuzzy_result = client.table("markets").select(
+            "question, market_slug, clob_token_ids, tag_label"
+        ).ilike("question", fuzzy_query).neq(
+            "question", source_market.get("question")
+        ).limit(limit).execute()
+    
+        similar_markets = [{
+            **market,
+            "match_type": "fuzzy_text",
+            "cosine_similarity": 0.0
+        } for market in fuzzy_result.data]
+    else:
+        # Extract related market IDs
+        related_ids = []
+        similarity_map = {}
+    
+        for row in similarity_result.data:
+            related_id = row["market_id_2"] if row["market_id_1"] == source_token_ids else row["market_id_1"]
+            if related_id and related_id != source_token_ids:
+                related_ids.append(related_id)
+                similarity_map[related_id] = row["cosine_similarity"]
+    
+        logger.info(f"[AI Similar] Found {len(related_ids)} similar markets")
+    
+        # Fetch market details
+        if related_ids:
+            markets_result = client.table("markets").select(
+                "question, market_slug, clob_token_ids, tag_label"
+            ).in_("clob_token_ids", related_ids).execute()
+    
+            similar_markets = [{
+                **market,
+                "cosine_similarity": similarity_map.get(market.get("clob_token_ids"), 0.0),
+                "match_type": "cosine_similarity"
+            } for market in markets_result.data]
+    
+            # Sort by similarity
+            similar_markets.sort(key=lambda x: x.get("cosine_similarity", 0), reverse=True)
+        else:
+            similar_markets = []
+    
+    return source_market, similar_markets
+
+
 @app.get("/ai/similar")
 async def get_ai_similar_markets(
     event_title: str = Query(..., description="Market question to find similar markets for"),
@@ -948,82 +1197,9 @@ async def get_ai_similar_markets(
     logger.info(f"[AI Similar] ========================================")
     
     try:
-        from database.supabase_connection import SupabaseConnection
-        supabase_conn = SupabaseConnection()
-        client = supabase_conn.get_client()
-        
-        # Step 1: Find source market using fuzzy matching
-        fuzzy_query = f"%{event_title}%"
-        source_result = client.table("markets").select(
-            "question, clob_token_ids, market_slug"
-        ).ilike("question", fuzzy_query).limit(1).execute()
-        
-        if not source_result.data:
-            logger.warning(f"[AI Similar] No source market found for: {event_title}")
-            raise HTTPException(status_code=404, detail="Source market not found")
-        
-        source_market = source_result.data[0]
-        source_token_ids = source_market.get("clob_token_ids")
-        
-        logger.info(f"[AI Similar] Found source: {source_market.get('question')}")
-        logger.info(f"[AI Similar] Token IDs: {source_token_ids}")
-        
-        if not source_token_ids:
-            logger.warning(f"[AI Similar] No token IDs for source market")
-            raise HTTPException(status_code=404, detail="Source market has no token IDs")
-        
-        # Step 2: Get similar markets by cosine similarity
-        similarity_result = client.table("similarity_scores").select(
-            "market_id_1, market_id_2, cosine_similarity"
-        ).or_(
-            f"market_id_1.eq.{source_token_ids},market_id_2.eq.{source_token_ids}"
-        ).gte("cosine_similarity", min_similarity).order(
-            "cosine_similarity", desc=True
-        ).limit(limit * 2).execute()  # Fetch more for AI ranking
-        
-        if not similarity_result.data:
-            logger.warning(f"[AI Similar] No cosine similarity matches found")
-            # Fallback to fuzzy text search
-            fuzzy_result = client.table("markets").select(
-                "question, market_slug, clob_token_ids, tag_label"
-            ).ilike("question", fuzzy_query).neq(
-                "question", source_market.get("question")
-            ).limit(limit).execute()
-            
-            similar_markets = [{
-                **market,
-                "match_type": "fuzzy_text",
-                "cosine_similarity": 0.0
-            } for market in fuzzy_result.data]
-        else:
-            # Extract related market IDs
-            related_ids = []
-            similarity_map = {}
-            
-            for row in similarity_result.data:
-                related_id = row["market_id_2"] if row["market_id_1"] == source_token_ids else row["market_id_1"]
-                if related_id and related_id != source_token_ids:
-                    related_ids.append(related_id)
-                    similarity_map[related_id] = row["cosine_similarity"]
-            
-            logger.info(f"[AI Similar] Found {len(related_ids)} similar markets")
-            
-            # Fetch market details
-            if related_ids:
-                markets_result = client.table("markets").select(
-                    "question, market_slug, clob_token_ids, tag_label"
-                ).in_("clob_token_ids", related_ids).execute()
-                
-                similar_markets = [{
-                    **market,
-                    "cosine_similarity": similarity_map.get(market.get("clob_token_ids"), 0.0),
-                    "match_type": "cosine_similarity"
-                } for market in markets_result.data]
-                
-                # Sort by similarity
-                similar_markets.sort(key=lambda x: x.get("cosine_similarity", 0), reverse=True)
-            else:
-                similar_markets = []
+        source_market, similar_markets = await run_blocking(
+            _ai_similar_candidates, event_title, min_similarity, limit
+        )
         
         # Step 3: Optional AI ranking
         if use_ai_ranking and similar_markets:
@@ -1075,7 +1251,7 @@ async def analyze_market_with_ai(
     
     try:
         gemini = get_gemini_client()
-        analysis = gemini.extract_entities(market_title)
+        analysis = await run_blocking(gemini.extract_entities, market_title)
         
         logger.info(f"[AI Analyze] Analyzed: {market_title}")
         logger.info(f"[AI Analyze] Entities: {analysis.get('entities')}")
@@ -1094,7 +1270,8 @@ async def analyze_market_with_ai(
 @app.get("/ai/semantic-similarity")
 async def compute_semantic_similarity(
     title1: str = Query(..., description="First market title"),
-    title2: str = Query(..., description="Second market title")
+    title2: str = Query(..., description="Second market title"),
+    use_llm: bool = Query(False, description="Rate with the Gemini LLM instead of embedding cosine")
 ):
     """
     Compute semantic similarity between two markets using Gemini AI.
@@ -1104,14 +1281,15 @@ async def compute_semantic_similarity(
     - 0.5 = Somewhat related
     - 1.0 = Highly related/correlated
     
-    Uses AI to understand meaning, not just keyword matching.
+    Uses the cosine of the two titles' Gemini embeddings (cached), or an LLM
+    rating when use_llm=true.
     """
     import logging
     logger = logging.getLogger(__name__)
     
     try:
         gemini = get_gemini_client()
-        similarity = gemini.compute_semantic_similarity(title1, title2)
+        similarity = await run_blocking(gemini.compute_semantic_similarity, title1, title2, use_llm)
         
         logger.info(f"[AI Similarity] '{title1}' <-> '{title2}': {similarity:.3f}")
         
@@ -1133,20 +1311,23 @@ async def compute_semantic_similarity(
 
 
 @app.get("/whales")
-def whales(
+async def whales(
     category: str = Query("overall", description="Category (any case)"),
 ):
     """
     Top 5 whale latest trades.
     Category is case-insensitive.
+    Served from the background-refreshed snapshot; updated_at says when it was built.
     """
     try:
-        data = top5_latest_trade_cards(category)
+        built_at, data = await run_blocking(whale_snapshots.get, category)
         return JSONResponse(
             content={
                 "category": category,
                 "count": len(data),
                 "cards": data,
+                "updated_at": datetime.fromtimestamp(built_at, tz=timezone.utc).isoformat(),
+                "age_seconds": round(time.time() - built_at, 1),
             }
         )
     except ValueError as e:
@@ -1,28 +1,31 @@
 import httpx
+import time
 from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
+from clients.price_history_store import PriceHistoryStore, price_history_store
 
 CLOB_BASE = "https://clob.polymarket.com"
 TIMEOUT = 30
 
 class ClobClient:
-    def __init__(self):
+    def __init__(self, history_store: Optional[PriceHistoryStore] = None):
         self.base_url = CLOB_BASE
         self.client = httpx.AsyncClient(timeout=TIMEOUT)
+        self.history_store = history_store or price_history_store
     
-    async def get_price_history(
+    async def _fetch_history(
         self,
         token_id: str,
-        start_time: Optional[datetime] = None,
-        end_time: Optional[datetime] = None
-    ) -> List[Dict[str, Any]]:
-        """Fetch price history for a token"""
+        start_ts: Optional[float] = None,
+        end_ts: Optional[float] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """GET /prices-history; None when the request fails"""
         params = {"token_id": token_id}
         
-        if start_time:
-            params["start_time"] = int(start_time.timestamp())
-        if end_time:
-            params["end_time"] = int(end_time.timestamp())
+        if start_ts:
+            params["start_time"] = int(start_ts)
+        if end_ts:
+            params["end_time"] = int(end_ts)
         
         try:
             response = await self.client.get(
@@ -31,22 +34,38 @@ class ClobClient:
             )
             response.raise_for_status()
             data = response.json()
+            if isinstance(data, dict):
+                data = data.get("history")
             if isinstance(data, list):
                 return data
             return []
         except Exception as e:
             print(f"Error fetching price history for {token_id}: {e}")
-            return []
+            return None
+    
+    async def get_price_history(
+        self,
+        token_id: str,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """Fetch price history for a token directly from CLOB"""
+        history = await self._fetch_history(
+            token_id,
+            start_time.timestamp() if start_time else None,
+            end_time.timestamp() if end_time else None,
+        )
+        return history or []
     
     async def get_price_history_window(
         self,
         token_id: str,
         days: int = 30
     ) -> List[Dict[str, Any]]:
-        """Get price history for a specific time window"""
-        end_time = datetime.utcnow()
-        start_time = end_time - timedelta(days=days)
-        return await self.get_price_history(token_id, start_time, end_time)
+        """Get price history for a specific time window (local store + delta fetch)"""
+        end = time.time()
+        points = await self.history_store.window(token_id, end - days * 86400, end, self._fetch_history)
+        return [{"timestamp": int(t), "price": float(p)} for t, p in points]
     
     async def close(self):
         await self.client.aclose()
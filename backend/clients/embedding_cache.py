@@ -0,0 +1,147 @@
+"""Content-addressed embedding cache (LRU memory front, SQLite on disk)."""
+
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from config import settings
+
+# SQLite file shared by every worker process on the host ("" disables the disk tier)
+EMBEDDING_CACHE_PATH = settings.embedding_cache_path
+EMBEDDING_CACHE_MEMORY_ENTRIES = settings.embedding_cache_memory_entries
+
+
+def embedding_key(model: str, task_type: str, text: str) -> str:
+    """sha256 of model + task_type + text"""
+    return hashlib.sha256(f"{model}\x00{task_type}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Maps (model, task_type, text) to a float32 vector.
+
+    Lookups hit an in-process LRU first, then the SQLite file (WAL mode, so
+    concurrent readers in other workers are not blocked by writers). Vectors
+    are stored as raw float32 bytes.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = EMBEDDING_CACHE_PATH,
+        max_memory_entries: int = EMBEDDING_CACHE_MEMORY_ENTRIES,
+    ):
+        self.path = path or None
+        self.max_memory_entries = max_memory_entries
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.path:
+            try:
+                conn = self._connect()
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"[EmbeddingCache] Disk tier disabled ({self.path}): {e}")
+                self.path = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def get_many(self, model: str, task_type: str, texts: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Cached vectors for whichever texts are present, keyed by text"""
+        keys = {text: embedding_key(model, task_type, text) for text in dict.fromkeys(texts)}
+        found: Dict[str, np.ndarray] = {}
+        missing: Dict[str, str] = {}
+
+        with self._lock:
+            for text, key in keys.items():
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[text] = vector
+                    self.memory_hits += 1
+                else:
+                    missing[key] = text
+
+        if missing and self.path:
+            rows = []
+            pending = list(missing)
+            try:
+                conn = self._connect()
+                # Stay under SQLite's bound-parameter limit
+                for i in range(0, len(pending), 500):
+                    chunk = pending[i:i + 500]
+                    placeholders = ",".join("?" * len(chunk))
+                    rows.extend(conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                    ).fetchall())
+            except sqlite3.Error as e:
+                print(f"[EmbeddingCache] Read failed: {e}")
+            for key, blob in rows:
+                vector = np.frombuffer(blob, dtype=np.float32)
+                self._remember(key, vector)
+                found[missing.pop(key)] = vector
+                self.disk_hits += 1
+
+        self.misses += len(missing)
+        return found
+
+    def get(self, model: str, task_type: str, text: str) -> Optional[np.ndarray]:
+        return self.get_many(model, task_type, [text]).get(text)
+
+    def put_many(self, model: str, task_type: str, items: Dict[str, List[float]]) -> None:
+        """Store text -> vector pairs (None vectors are skipped)"""
+        rows = []
+        for text, values in items.items():
+            if values is None:
+                continue
+            key = embedding_key(model, task_type, text)
+            vector = np.asarray(values, dtype=np.float32)
+            self._remember(key, vector)
+            rows.append((key, vector.tobytes()))
+
+        if rows and self.path:
+            try:
+                conn = self._connect()
+                conn.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"[EmbeddingCache] Write failed: {e}")
+
+    def put(self, model: str, task_type: str, text: str, values: List[float]) -> None:
+        self.put_many(model, task_type, {text: values})
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "path": self.path,
+            }
+
+
+# Process-wide cache shared by every GeminiClient
+embedding_cache = EmbeddingCache()
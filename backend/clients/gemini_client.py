@@ -4,20 +4,76 @@ except ImportError:
     genai = None
 
 from typing import List, Dict, Any, Optional
+import numpy as np
 from config import settings
+from clients.embedding_cache import EmbeddingCache, embedding_cache
+
+def _word_overlap(text1: str, text2: str) -> float:
+    """Jaccard similarity of the lowercase word sets"""
+    words1 = set(text1.lower().split())
+    words2 = set(text2.lower().split())
+    if not words1 or not words2:
+        return 0.0
+    return len(words1 & words2) / len(words1 | words2)
+
+def _cosine_one_vs_many(primary: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    """Cosine of primary against every row of matrix, clipped to [0, 1]"""
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(primary)
+    cosines = (matrix @ primary) / np.where(norms == 0, 1.0, norms)
+    return np.clip(cosines, 0.0, 1.0)
 
 class GeminiClient:
-    def __init__(self):
+    def __init__(self, cache: Optional[EmbeddingCache] = None):
+        self.embedding_cache = cache or embedding_cache
         if genai is None or not settings.gemini_api_key:
             self.model = None
+            self.embedding_model = None
             return
         try:
             genai.configure(api_key=settings.gemini_api_key)
             self.model = genai.GenerativeModel('gemini-pro')
+            self.embedding_model = 'models/text-embedding-004'
         except Exception as e:
             print(f"⚠️  Gemini client initialization failed: {e}")
             self.model = None
-            self.model = None
+            self.embedding_model = None
+    
+    def get_embeddings(
+        self,
+        texts: List[str],
+        task_type: str = "semantic_similarity"
+    ) -> List[Optional[List[float]]]:
+        """Embed many texts in one request, serving cached texts locally"""
+        if not self.embedding_model or not texts:
+            return [None] * len(texts)
+        
+        cached = self.embedding_cache.get_many(self.embedding_model, task_type, texts)
+        missing = [text for text in dict.fromkeys(texts) if text not in cached]
+        
+        embedded: Dict[str, List[float]] = {}
+        # Gemini accepts up to 100 texts per embed_content call
+        for i in range(0, len(missing), 100):
+            chunk = missing[i:i + 100]
+            try:
+                result = genai.embed_content(
+                    model=self.embedding_model,
+                    content=chunk,
+                    task_type=task_type
+                )
+                embeddings = result['embedding']
+                if len(embeddings) == len(chunk):
+                    batch = dict(zip(chunk, embeddings))
+                    self.embedding_cache.put_many(self.embedding_model, task_type, batch)
+                    embedded.update(batch)
+                else:
+                    print(f"Embedding batch size mismatch: sent {len(chunk)}, got {len(embeddings)}")
+            except Exception as e:
+                print(f"Error generating batch embeddings: {e}")
+        
+        return [
+            cached[text].tolist() if text in cached else embedded.get(text)
+            for text in texts
+        ]
     
     def extract_entities(self, text: str) -> Dict[str, Any]:
         """Extract entities and keywords from text using Gemini"""
@@ -57,18 +113,53 @@ Return only valid JSON."""
     def compute_semantic_similarity(
         self,
         text1: str,
-        text2: str
+        text2: str,
+        use_llm: bool = False
     ) -> float:
-        """Compute semantic similarity between two texts"""
+        """Compute semantic similarity between two texts (embedding cosine, or LLM rating with use_llm)"""
+        if use_llm:
+            return self.llm_similarity(text1, text2)
+        return self.semantic_similarities(text1, [text2])[0]
+    
+    def semantic_similarities(
+        self,
+        primary: str,
+        candidates: List[str],
+        rerank_top: Optional[int] = None
+    ) -> List[float]:
+        """
+        Similarity of one text against many, scored in a single matrix op
+        
+        Cosine over cached embeddings, clipped to [0, 1]; texts without an
+        embedding fall back to word overlap. The best rerank_top candidates
+        (default settings.similarity_llm_rerank_top) are re-scored by the LLM.
+        """
+        if not candidates:
+            return []
+        if rerank_top is None:
+            rerank_top = settings.similarity_llm_rerank_top
+        
+        scores = [_word_overlap(primary, text) for text in candidates]
+        vectors = self.get_embeddings([primary] + list(candidates))
+        if vectors[0] is not None:
+            present = [i for i, vector in enumerate(vectors[1:]) if vector is not None]
+            if present:
+                matrix = np.asarray([vectors[i + 1] for i in present], dtype=np.float32)
+                cosines = _cosine_one_vs_many(np.asarray(vectors[0], dtype=np.float32), matrix)
+                for i, value in zip(present, cosines):
+                    scores[i] = float(value)
+        
+        if rerank_top > 0 and self.model:
+            best = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)[:rerank_top]
+            for i in best:
+                scores[i] = self.llm_similarity(primary, candidates[i])
+        
+        return scores
+    
+    def llm_similarity(self, text1: str, text2: str) -> float:
+        """Ask Gemini to rate the similarity of two titles (one request per pair)"""
         if not self.model:
-            # Fallback: simple word overlap
-            words1 = set(text1.lower().split())
-            words2 = set(text2.lower().split())
-            if not words1 or not words2:
-                return 0.0
-            intersection = words1.intersection(words2)
-            union = words1.union(words2)
-            return len(intersection) / len(union) if union else 0.0
+            return _word_overlap(text1, text2)
         
         try:
             prompt = f"""Rate the semantic similarity between these two market titles on a scale of 0 to 1.
@@ -88,11 +179,4 @@ Similarity score:"""
                 return 0.5
         except Exception as e:
             print(f"Error computing similarity with Gemini: {e}")
-            # Fallback
-            words1 = set(text1.lower().split())
-            words2 = set(text2.lower().split())
-            if not words1 or not words2:
-                return 0.0
-            intersection = words1.intersection(words2)
-            union = words1.union(words2)
-            return len(intersection) / len(union) if union else 0.0
+            return _word_overlap(text1, text2)
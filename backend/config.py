@@ -1,11 +1,23 @@
 from pydantic_settings import BaseSettings
 from typing import List
+import os
+import tempfile
 
 class Settings(BaseSettings):
     mongodb_uri: str = "mongodb://localhost:27017"
     mongodb_db_name: str = "polymarket_assistant"
     gemini_api_key: str = ""
     backend_url: str = "http://localhost:8000"
+    embedding_cache_path: str = os.path.join(tempfile.gettempdir(), "polymarket_embeddings.sqlite3")
+    embedding_cache_memory_entries: int = 4096
+    # Candidates re-scored by the Gemini LLM after embedding similarity (0 = off)
+    similarity_llm_rerank_top: int = 0
+    price_history_dir: str = os.path.join(tempfile.gettempdir(), "polymarket_backend_price_history")
+    price_history_refresh_seconds: float = 60.0
+    price_history_retention_days: int = 400
+    # /recommendations: budget for candidate scoring and max concurrent Gemini/CLOB calls
+    recommendation_deadline_seconds: float = 8.0
+    recommendation_concurrency: int = 8
     cors_origins: List[str] = ["http://localhost:3000", "chrome-extension://*"]
     
     class Config:
@@ -1,108 +1,237 @@
+import asyncio
+import time
 import numpy as np
 import pandas as pd
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from clients.clob_client import ClobClient
 
+# Price histories are bucketed onto this grid before computing returns
+GRID_SECONDS = 3600
+# Minimum overlapping returns for a pair's correlation to count
+MIN_OVERLAP = 5
+
+def _timestamp_seconds(value: Any) -> Optional[float]:
+    """Unix seconds from a numeric (s or ms) or ISO timestamp"""
+    try:
+        ts = float(value)
+        return ts / 1000 if ts > 1e11 else ts
+    except (TypeError, ValueError):
+        try:
+            return pd.Timestamp(value).timestamp()
+        except Exception:
+            return None
+
+class ReturnsStore:
+    """
+    Request-scoped price history.
+
+    Each token's history is fetched once, at the widest window the request
+    needs (max_days), and concurrent loads of the same token share a single
+    fetch. Narrower windows are sliced from it locally.
+    """
+
+    def __init__(
+        self,
+        clob_client: ClobClient,
+        max_days: int = 30,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        grid_seconds: int = GRID_SECONDS
+    ):
+        self.clob = clob_client
+        self.max_days = max_days
+        self.semaphore = semaphore
+        self.grid_seconds = grid_seconds
+        self.now = time.time()
+        self._prices: Dict[str, Optional[pd.Series]] = {}
+        self._loads: Dict[str, asyncio.Task] = {}
+
+    async def _fetch(self, token_id: str) -> Optional[pd.Series]:
+        if self.semaphore is not None:
+            async with self.semaphore:
+                history = await self.clob.get_price_history_window(token_id, days=self.max_days)
+        else:
+            history = await self.clob.get_price_history_window(token_id, days=self.max_days)
+
+        # Parse price history (adjust based on actual CLOB API response format)
+        parsed = []
+        for entry in history or []:
+            price = entry.get("price") or entry.get("lastPrice") or entry.get("midPrice")
+            timestamp = _timestamp_seconds(entry.get("timestamp") or entry.get("time"))
+            if price is not None and timestamp is not None:
+                parsed.append((timestamp, float(price)))
+
+        # Snap onto the shared time grid (last price in each bucket) so every
+        # token's returns line up on the same timestamps
+        points = {}
+        for timestamp, price in sorted(parsed):
+            points[timestamp // self.grid_seconds * self.grid_seconds] = price
+
+        prices = pd.Series(points).sort_index() if len(points) >= 2 else None
+        self._prices[token_id] = prices
+        return prices
+
+    async def load(self, token_id: str) -> Optional[pd.Series]:
+        """Price series for a token (index: unix seconds), fetched at most once"""
+        if token_id in self._prices:
+            return self._prices[token_id]
+        task = self._loads.get(token_id)
+        if task is None or task.cancelled():
+            task = asyncio.ensure_future(self._fetch(token_id))
+            self._loads[token_id] = task
+        return await task
+
+    async def load_many(self, token_ids: List[str]) -> None:
+        await asyncio.gather(*(self.load(t) for t in dict.fromkeys(token_ids)), return_exceptions=True)
+
+    def returns(self, token_id: str, days: int) -> Optional[pd.Series]:
+        """Returns over the last `days` from already-loaded prices (None if not loaded)"""
+        prices = self._prices.get(token_id)
+        if prices is None:
+            return None
+        window = prices[prices.index >= self.now - days * 86400]
+        if len(window) < 2:
+            return None
+        return window.pct_change().dropna()
+
+    def returns_matrix(self, token_ids: List[str], days: int) -> np.ndarray:
+        """
+        T x N float64 returns on the common time grid, one column per token in
+        token_ids order; NaN marks grid points where a token has no return
+        """
+        series = [self.returns(token_id, days) for token_id in token_ids]
+        indexes = [s.index.to_numpy(dtype=np.float64) for s in series if s is not None]
+        grid = np.unique(np.concatenate(indexes)) if indexes else np.empty(0)
+
+        values = np.full((len(grid), len(token_ids)), np.nan)
+        for j, returns in enumerate(series):
+            if returns is not None:
+                rows = np.searchsorted(grid, returns.index.to_numpy(dtype=np.float64))
+                values[rows, j] = returns.to_numpy(dtype=np.float64)
+        return values
+
+def masked_correlation(values: np.ndarray, min_periods: int = MIN_OVERLAP) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pairwise-complete Pearson correlation between the columns of a T x N
+    matrix with NaN for missing observations, computed for all pairs at once.
+
+    Returns (corr, counts): counts[i, j] is the number of rows where both
+    columns are present, and corr[i, j] uses exactly those rows (NaN when
+    counts < min_periods or either side is constant over them).
+    """
+    mask = ~np.isnan(values)
+    present = mask.astype(np.float64)
+    column_counts = present.sum(axis=0)
+    # Correlation is shift-invariant; centring on column means keeps the sums small
+    means = np.where(mask, values, 0.0).sum(axis=0) / np.maximum(column_counts, 1)
+    x = np.where(mask, values - means, 0.0)
+
+    counts = present.T @ present
+    sum_x = x.T @ present          # [i, j]: sum of column i over rows where j is present too
+    sum_xx = (x * x).T @ present
+    sum_xy = x.T @ x
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sum_xy - sum_x * sum_x.T / counts
+        var = sum_xx - sum_x * sum_x / counts    # [i, j]: variance of i over the pair's rows
+        corr = cov / np.sqrt(var * var.T)
+    invalid = (counts < min_periods) | ~(var > 1e-18) | ~(var.T > 1e-18)
+    corr[invalid] = np.nan
+    return np.clip(corr, -1.0, 1.0), counts.astype(np.int64)
+
+def correlation_coverage(corr: np.ndarray) -> float:
+    """Fraction of distinct pairs (i < j) with a defined correlation"""
+    n = corr.shape[0]
+    if n < 2:
+        return 0.0
+    upper = corr[np.triu_indices(n, k=1)]
+    return float(np.count_nonzero(~np.isnan(upper))) / len(upper)
+
 class CorrelationService:
     def __init__(self, clob_client: ClobClient):
         self.clob = clob_client
-    
+
+    def returns_store(
+        self,
+        max_days: int = 30,
+        semaphore: Optional[asyncio.Semaphore] = None
+    ) -> ReturnsStore:
+        """New request-scoped store; pass it to the methods below to share fetches"""
+        return ReturnsStore(self.clob, max_days=max_days, semaphore=semaphore)
+
     async def compute_returns(
         self,
         token_id: str,
-        days: int = 30
+        days: int = 30,
+        store: Optional[ReturnsStore] = None
     ) -> Optional[pd.Series]:
         """Fetch price history and compute returns"""
-        history = await self.clob.get_price_history_window(token_id, days=days)
-        if not history or len(history) < 2:
-            return None
-        
-        # Parse price history (adjust based on actual CLOB API response format)
-        prices = []
-        timestamps = []
-        
-        for entry in history:
-            # Adjust field names based on actual API response
-            price = entry.get("price") or entry.get("lastPrice") or entry.get("midPrice")
-            timestamp = entry.get("timestamp") or entry.get("time")
-            
-            if price is not None and timestamp is not None:
-                prices.append(float(price))
-                timestamps.append(timestamp)
-        
-        if len(prices) < 2:
-            return None
-        
-        # Create DataFrame and compute returns
-        df = pd.DataFrame({"price": prices, "timestamp": timestamps})
-        df = df.sort_values("timestamp")
-        df["returns"] = df["price"].pct_change()
-        
-        return df["returns"].dropna()
-    
-    async def compute_correlation_matrix(
+        store = store or self.returns_store(max_days=days)
+        await store.load(token_id)
+        return store.returns(token_id, days)
+
+    def pairwise_correlations(
         self,
         token_ids: List[str],
+        store: ReturnsStore,
         window_days: int = 30
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        N x N correlations and overlap counts (token_ids order) from what the
+        store has already loaded; NaN where a pair has too little overlap
+        """
+        return masked_correlation(store.returns_matrix(list(token_ids), window_days))
+
+    async def compute_correlation_matrix(
+        self,
+        token_ids: List[str],
+        window_days: int = 30,
+        store: Optional[ReturnsStore] = None
     ) -> Tuple[Optional[np.ndarray], float]:
         """
         Compute correlation matrix for a set of tokens.
-        Returns (matrix, coverage) where coverage is the fraction of pairs with data.
+        Returns (matrix, coverage) where coverage is the fraction of pairs with
+        enough overlapping returns for a correlation (NaN entries otherwise).
         """
         if len(token_ids) < 2:
             return None, 0.0
-        
-        # Fetch returns for all tokens
-        returns_data: Dict[str, pd.Series] = {}
-        for token_id in token_ids:
-            returns = await self.compute_returns(token_id, days=window_days)
-            if returns is not None and len(returns) > 5:  # Minimum data points
-                returns_data[token_id] = returns
-        
-        if len(returns_data) < 2:
-            return None, 0.0
-        
-        # Align time series
-        df = pd.DataFrame(returns_data)
-        df = df.dropna()  # Remove rows with missing data
-        
-        if len(df) < 5:
+
+        store = store or self.returns_store(max_days=window_days)
+        await store.load_many(token_ids)
+
+        corr, _ = self.pairwise_correlations(token_ids, store, window_days)
+        coverage = correlation_coverage(corr)
+        if coverage == 0.0:
             return None, 0.0
-        
-        # Compute correlation matrix
-        corr_matrix = df.corr().values
-        
-        # Compute coverage (fraction of pairs with valid correlation)
-        n_pairs = len(token_ids) * (len(token_ids) - 1) / 2
-        valid_pairs = 0
-        for i in range(len(token_ids)):
-            for j in range(i + 1, len(token_ids)):
-                if token_ids[i] in returns_data and token_ids[j] in returns_data:
-                    valid_pairs += 1
-        
-        coverage = valid_pairs / n_pairs if n_pairs > 0 else 0.0
-        
-        return corr_matrix, coverage
-    
+        return corr, coverage
+
+    def pair_correlations(
+        self,
+        primary_token_id: str,
+        token_ids: List[str],
+        store: ReturnsStore,
+        window_days: int = 30
+    ) -> List[Optional[float]]:
+        """
+        Correlation of the primary token with each of token_ids (the primary's
+        row of one masked correlation pass over what the store has loaded)
+        """
+        if not token_ids:
+            return []
+        corr, _ = self.pairwise_correlations([primary_token_id] + list(token_ids), store, window_days)
+        return [
+            None if token_id == primary_token_id or np.isnan(value) else float(value)
+            for token_id, value in zip(token_ids, corr[0, 1:])
+        ]
+
     async def get_pair_correlation(
         self,
         token_id1: str,
         token_id2: str,
-        window_days: int = 30
+        window_days: int = 30,
+        store: Optional[ReturnsStore] = None
     ) -> Optional[float]:
         """Get correlation between two tokens"""
-        returns1 = await self.compute_returns(token_id1, days=window_days)
-        returns2 = await self.compute_returns(token_id2, days=window_days)
-        
-        if returns1 is None or returns2 is None:
-            return None
-        
-        # Align series
-        aligned = pd.DataFrame({"r1": returns1, "r2": returns2}).dropna()
-        
-        if len(aligned) < 5:
-            return None
-        
-        correlation = aligned["r1"].corr(aligned["r2"])
-        return correlation if not np.isnan(correlation) else None
+        store = store or self.returns_store(max_days=window_days)
+        await store.load_many([token_id1, token_id2])
+        return self.pair_correlations(token_id1, [token_id2], store, window_days)[0]
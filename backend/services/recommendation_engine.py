@@ -1,10 +1,13 @@
-from typing import List, Dict, Any, Optional
+import asyncio
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+from config import settings
 from clients.gamma_client import GammaClient
 from clients.gemini_client import GeminiClient
 from clients.clob_client import ClobClient
 from services.scoring import ScoringService
-from services.correlation import CorrelationService
+from services.correlation import CorrelationService, ReturnsStore, correlation_coverage
 from services.cache import CacheService
 
 LOCKED_TOPICS = ["Finance", "Politics", "Technology", "Elections", "Economy"]
@@ -90,34 +93,133 @@ class RecommendationEngine:
         
         return candidates[:limit]
     
+    async def _run_bounded(self, semaphore: asyncio.Semaphore, func, *args):
+        """Await func(*args) under the semaphore; sync callables run in a worker thread"""
+        async with semaphore:
+            if asyncio.iscoroutinefunction(func):
+                return await func(*args)
+            return await asyncio.to_thread(func, *args)
+    
+    async def _gather_until(self, coros: List[Any], deadline: float) -> Tuple[List[Any], bool]:
+        """
+        Await coroutines until the deadline (event loop time)
+        
+        Returns (results, complete): results are in input order with None for
+        anything that failed or was still running at the deadline (cancelled).
+        """
+        tasks = [asyncio.ensure_future(coro) for coro in coros]
+        if not tasks:
+            return [], True
+        
+        timeout = max(0.0, deadline - asyncio.get_running_loop().time())
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        
+        results = []
+        for task in tasks:
+            if task in done and not task.cancelled() and task.exception() is None:
+                results.append(task.result())
+            else:
+                if task in done and not task.cancelled():
+                    print(f"Recommendation stage task failed: {task.exception()}")
+                results.append(None)
+        return results, not pending
+    
+    async def _entity_stage(
+        self,
+        titles: List[str],
+        semaphore: asyncio.Semaphore,
+        deadline: float
+    ) -> Tuple[List[List[str]], bool]:
+        """Extract entities for every title (sync Gemini calls, bounded, in threads)"""
+        results, complete = await self._gather_until(
+            [self._run_bounded(semaphore, self.gemini.extract_entities, title) for title in titles],
+            deadline
+        )
+        return [(result or {}).get("entities", []) for result in results], complete
+    
+    async def _similarity_stage(
+        self,
+        primary_title: str,
+        titles: List[str],
+        deadline: float
+    ) -> Tuple[List[float], bool]:
+        """Batch semantic similarity; falls back to word overlap if it misses the deadline"""
+        timeout = max(0.0, deadline - asyncio.get_running_loop().time())
+        try:
+            scores = await asyncio.wait_for(
+                asyncio.to_thread(self.scoring.compute_semantic_scores, primary_title, titles),
+                timeout
+            )
+            return scores, True
+        except Exception as e:
+            print(f"Semantic scoring unavailable, using word overlap: {e!r}")
+            return [self.scoring.keyword_similarity(primary_title, title) for title in titles], False
+    
+    async def _correlation_stage(
+        self,
+        primary_token_id: Optional[str],
+        candidate_token_ids: List[Optional[str]],
+        store: ReturnsStore,
+        deadline: float
+    ) -> Tuple[List[Optional[float]], bool]:
+        """
+        Primary-vs-candidate return correlations
+        
+        Each token's history is fetched once into the request's returns store
+        (bounded by its semaphore); correlations come from one aligned matrix
+        over whatever loaded before the deadline.
+        """
+        if not primary_token_id:
+            return [None] * len(candidate_token_ids), True
+        
+        token_ids = [primary_token_id] + [t for t in candidate_token_ids if t]
+        _, complete = await self._gather_until(
+            [store.load(token_id) for token_id in dict.fromkeys(token_ids)],
+            deadline
+        )
+        present = [t for t in candidate_token_ids if t]
+        correlations = dict(zip(
+            present,
+            self.correlation.pair_correlations(primary_token_id, present, store, window_days=30)
+        ))
+        return [correlations.get(t) if t else None for t in candidate_token_ids], complete
+    
     async def build_five_market_set(
         self,
         primary_market: Dict[str, Any],
         local_profile: Dict[str, Any],
-        candidates: List[Dict[str, Any]]
+        candidates: List[Dict[str, Any]],
+        deadline: Optional[float] = None
     ) -> List[Dict[str, Any]]:
         """Build 5-market set: primary + 2 from history + 2 top amplify"""
         five_set = [primary_market]
+        if deadline is None:
+            deadline = asyncio.get_running_loop().time() + settings.recommendation_deadline_seconds
         
-        # Markets 2-3: Most relevant from local history
+        # Markets 2-3: Most relevant from local history (looked up concurrently)
         recent_interactions = local_profile.get("recent_interactions", [])[:20]
-        history_markets = []
-        
-        for interaction in recent_interactions:
-            interaction_url = interaction.get("marketUrl", "")
-            if interaction_url:
-                market = await self.gamma.get_market_by_url(interaction_url)
-                if market and market.get("id") != primary_market.get("market_id"):
-                    history_markets.append(market)
+        urls = list(dict.fromkeys(
+            i.get("marketUrl", "") for i in recent_interactions if i.get("marketUrl")
+        ))
+        semaphore = asyncio.Semaphore(settings.recommendation_concurrency)
+        markets, _ = await self._gather_until(
+            [self._run_bounded(semaphore, self.gamma.get_market_by_url, url) for url in urls],
+            deadline
+        )
+        history_markets = [
+            market for market in markets
+            if market and market.get("id") != primary_market.get("market_id")
+        ]
         
         # Score and select top 2 from history
         primary_title = primary_market.get("title", "")
-        scored_history = []
         
-        for market in history_markets[:10]:  # Limit to avoid too many API calls
-            title = market.get("title") or market.get("question", "")
-            score = self.gemini.compute_semantic_similarity(primary_title, title)
-            scored_history.append((score, market))
+        history_markets = history_markets[:10]  # Limit to avoid too many API calls
+        history_titles = [m.get("title") or m.get("question", "") for m in history_markets]
+        history_scores, _ = await self._similarity_stage(primary_title, history_titles, deadline)
+        scored_history = list(zip(history_scores, history_markets))
         
         scored_history.sort(key=lambda x: x[0], reverse=True)
         for _, market in scored_history[:2]:
@@ -133,12 +235,44 @@ class RecommendationEngine:
         
         return five_set
     
+    async def _five_set_correlation(
+        self,
+        token_ids: List[str],
+        store: Optional[ReturnsStore] = None
+    ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray], float, str]:
+        """
+        Correlation matrix and overlap counts for the five-set: 30d window,
+        falling back to 7d (sliced locally) when no pair has enough overlap
+        """
+        store = store or self.correlation.returns_store(max_days=30)
+        await store.load_many(token_ids)
+        
+        for window_days, window_used in ((30, "30d"), (7, "7d")):
+            matrix, counts = self.correlation.pairwise_correlations(token_ids, store, window_days)
+            coverage = correlation_coverage(matrix)
+            if coverage > 0:
+                return matrix, counts, coverage, window_used
+        return None, None, 0.0, "7d"
+    
     async def generate_recommendations(
         self,
         primary: Dict[str, Any],
         local_profile: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """Generate amplify and hedge recommendations"""
+        """
+        Generate amplify and hedge recommendations
+        
+        Candidate scoring runs as concurrent stages (entity extraction,
+        batched semantic similarity, price correlations) under a per-request
+        deadline. Work unfinished at the deadline is dropped and the response
+        is built from what completed, with "partial": true.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.recommendation_deadline_seconds
+        semaphore = asyncio.Semaphore(settings.recommendation_concurrency)
+        # Price histories for this request: one 30d fetch per token, shared by all stages
+        store = self.correlation.returns_store(max_days=30, semaphore=semaphore)
+        
         # Resolve primary market
         primary_resolved = await self.resolve_primary_market(primary["url"])
         if not primary_resolved:
@@ -146,46 +280,53 @@ class RecommendationEngine:
         
         # Discover candidates
         candidates = await self.discover_candidate_markets(primary_resolved, local_profile)
+        candidates_to_score = candidates[:50]  # Limit for performance
         
-        # Extract entities from primary
         primary_title = primary_resolved.get("title", "")
-        primary_entities_data = self.gemini.extract_entities(primary_title)
-        primary_entities = primary_entities_data.get("entities", [])
+        candidate_titles = [c.get("title", "") for c in candidates_to_score]
+        candidate_token_ids = []
+        for candidate in candidates_to_score:
+            token_ids = self._extract_token_ids(candidate)
+            candidate_token_ids.append(token_ids[0] if token_ids else None)
+        
+        primary_token_ids = primary_resolved.get("token_ids", [])
+        primary_token_id = primary_token_ids[0] if primary_token_ids else None
+        
+        # Run the scoring stages and the history half of the five-set together
+        (
+            (entities, entities_complete),
+            (semantic_scores, similarity_complete),
+            (correlations, correlation_complete),
+            five_set,
+        ) = await asyncio.gather(
+            self._entity_stage([primary_title] + candidate_titles, semaphore, deadline),
+            self._similarity_stage(primary_title, candidate_titles, deadline),
+            self._correlation_stage(primary_token_id, candidate_token_ids, store, deadline),
+            self.build_five_market_set(primary_resolved, local_profile, candidates, deadline),
+        )
+        partial = not (entities_complete and similarity_complete and correlation_complete)
+        primary_entities, candidate_entities_list = entities[0], entities[1:]
         
         # Score all candidates
         scored_amplify = []
         scored_hedge = []
+        now = datetime.utcnow()
         
-        primary_token_ids = primary_resolved.get("token_ids", [])
-        primary_token_id = primary_token_ids[0] if primary_token_ids else None
-        
-        for candidate in candidates[:50]:  # Limit for performance
+        for candidate, candidate_entities, semantic_score, correlation in zip(
+            candidates_to_score, candidate_entities_list, semantic_scores, correlations
+        ):
             candidate_title = candidate.get("title", "")
             candidate_id = candidate.get("id")
-            candidate_token_ids = self._extract_token_ids(candidate)
-            candidate_token_id = candidate_token_ids[0] if candidate_token_ids else None
-            
-            # Extract entities
-            candidate_entities_data = self.gemini.extract_entities(candidate_title)
-            candidate_entities = candidate_entities_data.get("entities", [])
             
             # Compute similarity score
             similarity = self.scoring.compute_similarity_score(
                 primary_title,
                 candidate_title,
                 primary_entities,
-                candidate_entities
+                candidate_entities,
+                semantic_score=semantic_score
             )
             
-            # Get correlation if available
-            correlation = None
-            if primary_token_id and candidate_token_id:
-                correlation = await self.correlation.get_pair_correlation(
-                    primary_token_id,
-                    candidate_token_id,
-                    window_days=30
-                )
-            
             # Amplify score
             amplify_score = similarity
             if local_profile.get("recent_interactions"):
@@ -194,7 +335,7 @@ class RecommendationEngine:
                     amplify_score = self.scoring.apply_recency_weight(
                         amplify_score,
                         interaction,
-                        datetime.utcnow()
+                        now
                     )
             
             # Hedge score
@@ -202,7 +343,8 @@ class RecommendationEngine:
                 primary_title,
                 candidate_title,
                 primary.get("side", "YES"),
-                correlation
+                correlation,
+                semantic_score=semantic_score
             )
             
             # Get topic label
@@ -241,9 +383,6 @@ class RecommendationEngine:
         amplify = scored_amplify[:5]
         hedge = scored_hedge[:5]
         
-        # Build 5-market set
-        five_set = await self.build_five_market_set(primary_resolved, local_profile, candidates)
-        
         # Fill markets 4-5 from top amplify
         for rec in amplify[:2]:
             if len(five_set) < 5:
@@ -256,30 +395,33 @@ class RecommendationEngine:
                     "token_id": token_ids[0] if token_ids else "",
                 })
         
-        # Compute correlation matrix for 5-market set
+        # Compute correlation matrix for 5-market set with whatever time is left
         token_ids = [m.get("token_id") for m in five_set if m.get("token_id")]
         corr_matrix = None
+        corr_overlap = None
         corr_coverage = 0.0
         window_used = "30d"
         
         if len(token_ids) >= 2:
-            matrix, coverage = await self.correlation.compute_correlation_matrix(
-                token_ids,
-                window_days=30
-            )
-            if matrix is not None:
-                corr_matrix = matrix.tolist()
-                corr_coverage = coverage
-            else:
-                # Try 7d window
-                matrix, coverage = await self.correlation.compute_correlation_matrix(
-                    token_ids,
-                    window_days=7
+            remaining = deadline - loop.time()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                matrix, counts, coverage, window_used = await asyncio.wait_for(
+                    self._five_set_correlation(token_ids, store),
+                    remaining
                 )
                 if matrix is not None:
-                    corr_matrix = matrix.tolist()
+                    # Pairs without enough overlapping data are null
+                    corr_matrix = [
+                        [None if np.isnan(value) else value for value in row]
+                        for row in matrix.tolist()
+                    ]
+                    corr_overlap = counts.tolist()
                     corr_coverage = coverage
-                    window_used = "7d"
+            except asyncio.TimeoutError:
+                print("Five-set correlation skipped: request deadline reached")
+                partial = True
         
         return {
             "primary_resolved": primary_resolved,
@@ -289,6 +431,8 @@ class RecommendationEngine:
             "corr": {
                 "window_used": window_used,
                 "matrix": corr_matrix,
+                "overlap": corr_overlap,
                 "coverage": corr_coverage,
             } if corr_matrix else None,
+            "partial": partial,
         }
@@ -11,33 +11,50 @@ class ScoringService:
         primary_title: str,
         candidate_title: str,
         primary_entities: List[str],
-        candidate_entities: List[str]
+        candidate_entities: List[str],
+        semantic_score: Optional[float] = None
     ) -> float:
         """Compute similarity score between primary and candidate market"""
-        # Semantic similarity (0.6 weight) - Gemini client is synchronous
-        semantic_score = self.gemini.compute_semantic_similarity(
-            primary_title,
-            candidate_title
-        )
+        # Semantic similarity (0.6 weight) - pass a precomputed score from
+        # compute_semantic_scores to avoid a per-pair embedding lookup
+        if semantic_score is None:
+            semantic_score = self.gemini.compute_semantic_similarity(
+                primary_title,
+                candidate_title
+            )
         
         # Entity overlap (0.4 weight)
-        entity_overlap = 0.0
-        if primary_entities and candidate_entities:
-            primary_set = set(primary_entities)
-            candidate_set = set(candidate_entities)
-            if primary_set or candidate_set:
-                intersection = primary_set.intersection(candidate_set)
-                union = primary_set.union(candidate_set)
-                entity_overlap = len(intersection) / len(union) if union else 0.0
+        entity_overlap = self._jaccard(primary_entities, candidate_entities)
         
         return 0.6 * semantic_score + 0.4 * entity_overlap
     
+    @staticmethod
+    def _jaccard(a: List[str], b: List[str]) -> float:
+        """Intersection over union of two collections (0 if either is empty)"""
+        if not a or not b:
+            return 0.0
+        a_set, b_set = set(a), set(b)
+        return len(a_set & b_set) / len(a_set | b_set)
+    
+    def keyword_similarity(self, primary_title: str, candidate_title: str) -> float:
+        """Word-overlap similarity (no API calls) for when semantic scoring is unavailable"""
+        return self._jaccard(primary_title.lower().split(), candidate_title.lower().split())
+    
+    def compute_semantic_scores(
+        self,
+        primary_title: str,
+        candidate_titles: List[str]
+    ) -> List[float]:
+        """Semantic similarity of the primary title to every candidate in one batch"""
+        return self.gemini.semantic_similarities(primary_title, candidate_titles)
+    
     def compute_hedge_score(
         self,
         primary_title: str,
         candidate_title: str,
         primary_side: str,
-        correlation: Optional[float] = None
+        correlation: Optional[float] = None,
+        semantic_score: Optional[float] = None
     ) -> Dict[str, Any]:
         """Compute hedging score and type"""
         # Negative correlation indicates hedging potential
@@ -45,8 +62,10 @@ class ScoringService:
             hedge_score = abs(correlation) if correlation < 0 else (1 - correlation) / 2
             hedge_type = "inverse" if correlation < -0.3 else "diversification"
         else:
-            # Fallback: semantic dissimilarity - Gemini client is synchronous
-            similarity = self.gemini.compute_semantic_similarity(primary_title, candidate_title)
+            # Fallback: semantic dissimilarity
+            similarity = semantic_score
+            if similarity is None:
+                similarity = self.gemini.compute_semantic_similarity(primary_title, candidate_title)
             hedge_score = 1 - similarity
             hedge_type = "diversification"
         
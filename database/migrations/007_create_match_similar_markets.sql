@@ -0,0 +1,67 @@
+-- Migration: Server-side Embedding Similarity Search
+-- Adds match_similar_markets(), which reads the source market's embedding inside
+-- the database and returns its nearest neighbours, so /similar no longer ships a
+-- 768-float vector literal (twice) in every query. Replaces the IVFFlat index
+-- with HNSW, which needs no training lists and gives better recall at low latency.
+-- Requires pgvector >= 0.5.0 (HNSW). Run this in Supabase SQL Editor
+
+-- HNSW index for cosine distance (replaces idx_markets_embedding_cosine)
+CREATE INDEX IF NOT EXISTS idx_markets_embedding_hnsw
+ON markets
+USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
+
+DROP INDEX IF EXISTS idx_markets_embedding_cosine;
+
+-- Nearest neighbours of one market by embedding cosine similarity
+-- Callable via PostgREST: POST /rest/v1/rpc/match_similar_markets
+CREATE OR REPLACE FUNCTION match_similar_markets(
+    source_market_id TEXT,
+    match_count INTEGER DEFAULT 20,
+    min_similarity DOUBLE PRECISION DEFAULT 0.0
+)
+RETURNS TABLE (
+    market_id TEXT,
+    question TEXT,
+    market_slug TEXT,
+    tag_label TEXT,
+    clob_token_ids TEXT,
+    similarity DOUBLE PRECISION
+)
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+    source_embedding vector(768);
+BEGIN
+    SELECT m.embedding INTO source_embedding
+    FROM markets m
+    WHERE m.market_id = source_market_id;
+
+    IF source_embedding IS NULL THEN
+        RETURN;
+    END IF;
+
+    -- ORDER BY distance to a single vector value so the HNSW index is used;
+    -- the similarity threshold is applied to the index-ordered candidates
+    RETURN QUERY
+    SELECT *
+    FROM (
+        SELECT
+            m.market_id,
+            m.question,
+            m.market_slug,
+            m.tag_label,
+            m.clob_token_ids,
+            1 - (m.embedding <=> source_embedding) AS similarity
+        FROM markets m
+        WHERE m.embedding IS NOT NULL
+            AND m.market_id <> source_market_id
+        ORDER BY m.embedding <=> source_embedding
+        LIMIT match_count
+    ) neighbours
+    WHERE neighbours.similarity >= min_similarity;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION match_similar_markets(TEXT, INTEGER, DOUBLE PRECISION) TO anon, authenticated;
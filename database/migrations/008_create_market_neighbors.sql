@@ -0,0 +1,38 @@
+-- Migration: Create Market Neighbors Table
+-- Precomputed top-K embedding neighbours per market, written by
+-- scripts/compute_market_neighbors.py (services/neighbors.py)
+-- Run this in Supabase SQL Editor
+
+CREATE TABLE IF NOT EXISTS market_neighbors (
+    market_id TEXT NOT NULL REFERENCES markets(market_id) ON DELETE CASCADE,
+    rank SMALLINT NOT NULL CHECK (rank >= 1),
+    neighbor_market_id TEXT NOT NULL REFERENCES markets(market_id) ON DELETE CASCADE,
+    similarity REAL NOT NULL,
+    -- markets.updated_at of the source market when its list was computed;
+    -- max() over the table is the watermark for incremental runs
+    source_updated_at TIMESTAMP WITH TIME ZONE,
+    computed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (market_id, rank)
+);
+
+-- Reverse lookup: which lists contain a market (incremental recomputation)
+CREATE INDEX IF NOT EXISTS idx_market_neighbors_neighbor ON market_neighbors(neighbor_market_id);
+-- K-th similarity per market (incremental recomputation)
+CREATE INDEX IF NOT EXISTS idx_market_neighbors_rank ON market_neighbors(rank);
+CREATE INDEX IF NOT EXISTS idx_market_neighbors_source_updated_at ON market_neighbors(source_updated_at);
+
+-- Neighbour lists with market metadata, so /similar answers with one indexed lookup
+CREATE OR REPLACE VIEW market_neighbor_details AS
+SELECT
+    n.market_id,
+    n.rank,
+    n.similarity,
+    m.market_id AS neighbor_market_id,
+    m.question,
+    m.market_slug,
+    m.tag_label,
+    m.clob_token_ids
+FROM market_neighbors n
+JOIN markets m ON m.market_id = n.neighbor_market_id;
+
+GRANT SELECT ON market_neighbor_details TO anon, authenticated;
@@ -0,0 +1,17 @@
+-- Migration: Track What Each Embedding Was Computed From
+-- embedding_source_hash = sha256 hex of '<model>\n<question>' for the text that
+-- produced markets.embedding. The batch pipeline (scripts/generate_embeddings.py)
+-- re-embeds a market when the hash is missing or no longer matches its question
+-- Run this in Supabase SQL Editor
+
+ALTER TABLE markets ADD COLUMN IF NOT EXISTS embedding_source_hash TEXT;
+
+-- Existing embeddings were produced by Gemini text-embedding-004 from the
+-- current question; record that so they are not recomputed
+UPDATE markets
+SET embedding_source_hash = encode(
+    sha256(convert_to('models/text-embedding-004' || E'\n' || question, 'UTF8')),
+    'hex'
+)
+WHERE embedding IS NOT NULL
+    AND embedding_source_hash IS NULL;
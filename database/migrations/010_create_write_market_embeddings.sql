@@ -0,0 +1,33 @@
+-- Migration: Bulk Embedding Write-Back
+-- write_market_embeddings() applies one chunk of the batch pipeline's vectors
+-- (scripts/generate_embeddings.py) in a single UPDATE. Only embedding and
+-- embedding_source_hash are written, and only to rows whose question still
+-- matches the text that was embedded, so markets deleted or reworded since the
+-- work list was built are skipped (the next run picks up the new text).
+-- Requires migrations 006 and 009. Run this in Supabase SQL Editor
+
+-- rows: [{"market_id", "question", "embedding" (pgvector text), "embedding_source_hash"}, ...]
+-- Callable via PostgREST: POST /rest/v1/rpc/write_market_embeddings
+CREATE OR REPLACE FUNCTION write_market_embeddings(rows JSONB)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH updated AS (
+        UPDATE markets m
+        SET embedding = v.embedding::vector,
+            embedding_source_hash = v.embedding_source_hash
+        FROM jsonb_to_recordset(rows) AS v(
+            market_id TEXT,
+            question TEXT,
+            embedding TEXT,
+            embedding_source_hash TEXT
+        )
+        WHERE m.market_id = v.market_id
+            AND m.question = v.question
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM updated;
+$$;
+
+-- The pipeline writes with the same key as the API (see database/supabase_connection.py)
+GRANT EXECUTE ON FUNCTION write_market_embeddings(JSONB) TO anon, authenticated;
@@ -0,0 +1,13 @@
+-- Migration: Detect Neighbour List Changes by Embedding, Not Row Timestamp
+-- Incremental runs of scripts/compute_market_neighbors.py compared
+-- markets.updated_at with the newest source_updated_at, but every write to a
+-- market row (metadata, prices) bumps updated_at. Each list now records the
+-- embedding it was computed from (markets.embedding_source_hash, migration 009)
+-- and is recomputed only when that changes.
+-- Existing lists have no hash, so the first run after this migration rebuilds
+-- them all. Run this in Supabase SQL Editor
+
+ALTER TABLE market_neighbors ADD COLUMN IF NOT EXISTS source_embedding_hash TEXT;
+
+DROP INDEX IF EXISTS idx_market_neighbors_source_updated_at;
+ALTER TABLE market_neighbors DROP COLUMN IF EXISTS source_updated_at;
@@ -4,9 +4,22 @@ Handles connection to Supabase PostgreSQL database
 """
 
 import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+from urllib.parse import quote, urlparse
+
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
+try:
+    import psycopg2
+    from psycopg2.pool import ThreadedConnectionPool
+except ImportError:
+    psycopg2 = None
+    ThreadedConnectionPool = None
+
 load_dotenv()
 
 
@@ -35,3 +48,261 @@ class SupabaseConnection:
         except Exception as e:
             print(f"[ERROR] Connection test failed: {e}")
             return False
+
+
+# ============================================================================
+# Process-wide connection manager
+# ============================================================================
+
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+# Seconds a caller waits for a free pooled connection before giving up
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+# After a failed pool open, wait this long before trying again
+DB_POOL_RETRY_SECONDS = 30.0
+# Borrowed connections idle longer than this are checked with SELECT 1 first
+DB_POOL_VALIDATE_IDLE_SECONDS = float(os.getenv("DB_POOL_VALIDATE_IDLE_SECONDS", "30"))
+
+
+def database_dsn() -> Optional[str]:
+    """
+    Postgres DSN for direct (psycopg2) access
+
+    Uses DATABASE_URL when set, otherwise derives the Supabase direct
+    connection from SUPABASE_URL and SUPABASE_PASSWORD.
+    """
+    dsn = os.getenv("DATABASE_URL")
+    if dsn:
+        return dsn
+
+    supabase_url = os.getenv("SUPABASE_URL")
+    password = os.getenv("SUPABASE_PASSWORD")
+    if not supabase_url or not password:
+        return None
+
+    host = urlparse(supabase_url).hostname or ""
+    project_ref = host.split(".")[0]
+    if not project_ref:
+        return None
+    return f"postgresql://postgres:{quote(password, safe='')}@db.{project_ref}.supabase.co:5432/postgres"
+
+
+class ConnectionManager:
+    """
+    Shared PostgREST client plus a bounded psycopg2 connection pool.
+
+    Created once per process; request handlers borrow from it instead of
+    calling create_client() or opening Postgres connections themselves.
+    """
+
+    def __init__(
+        self,
+        dsn: Optional[str] = None,
+        minconn: int = DB_POOL_MIN,
+        maxconn: int = DB_POOL_MAX,
+    ):
+        self.dsn = dsn if dsn is not None else database_dsn()
+        self.minconn = max(0, minconn)
+        self.maxconn = max(1, maxconn, self.minconn)
+        self._lock = threading.Lock()
+        self._client: Optional[Client] = None
+        self._pool = None
+        # ThreadedConnectionPool raises when exhausted; this makes callers wait instead
+        self._slots = threading.BoundedSemaphore(self.maxconn)
+        self._pool_error: Optional[str] = None
+        self._pool_failed_at: Optional[float] = None
+        # id(conn) -> time.monotonic() when it went back to the pool
+        self._returned_at: Dict[int, float] = {}
+        self.discarded = 0
+
+    # ------------------------------------------------------------------
+    # PostgREST
+    # ------------------------------------------------------------------
+
+    def get_client(self) -> Client:
+        """Shared Supabase client (created on first use)"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = SupabaseConnection().get_client()
+        return self._client
+
+    # ------------------------------------------------------------------
+    # psycopg2 pool
+    # ------------------------------------------------------------------
+
+    @property
+    def pool_available(self) -> bool:
+        return ThreadedConnectionPool is not None and bool(self.dsn)
+
+    def _get_pool(self):
+        if self._pool is None and self.pool_available:
+            if self._pool_failed_at is not None and time.monotonic() - self._pool_failed_at < DB_POOL_RETRY_SECONDS:
+                return None
+            with self._lock:
+                if self._pool is None:
+                    try:
+                        self._pool = ThreadedConnectionPool(
+                            self.minconn,
+                            self.maxconn,
+                            self.dsn,
+                            connect_timeout=DB_CONNECT_TIMEOUT,
+                        )
+                        self._pool_error = None
+                    except Exception as e:
+                        self._pool_error = str(e)
+                        self._pool_failed_at = time.monotonic()
+                        print(f"[ConnectionManager] Could not open connection pool: {e}")
+        return self._pool
+
+    def _alive(self, conn) -> bool:
+        """
+        Whether a borrowed connection is usable
+
+        Connections back in the pool for longer than DB_POOL_VALIDATE_IDLE_SECONDS
+        (which a server or proxy may have dropped) get a SELECT 1 round trip;
+        recently used ones are trusted, so hot paths pay nothing.
+        """
+        if conn.closed:
+            return False
+        returned_at = self._returned_at.get(id(conn))
+        if returned_at is None or time.monotonic() - returned_at < DB_POOL_VALIDATE_IDLE_SECONDS:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @contextmanager
+    def connection(self) -> Iterator[Optional["psycopg2.extensions.connection"]]:
+        """
+        Borrow a pooled Postgres connection
+
+        Yields None when no DSN is configured or the pool cannot be opened,
+        so callers can fall back to PostgREST. Long-idle connections are
+        checked with SELECT 1 when borrowed (see _alive); dead ones are closed
+        and replaced (after maxconn failures the pool has no idle connections
+        left, so the next one is freshly opened). Broken connections are
+        discarded instead of being returned to the pool.
+        """
+        pool = self._get_pool()
+        if pool is None:
+            yield None
+            return
+
+        if not self._slots.acquire(timeout=DB_POOL_TIMEOUT):
+            raise TimeoutError(f"No database connection free after {DB_POOL_TIMEOUT}s")
+        conn = None
+        broken = False
+        try:
+            for _ in range(self.maxconn):
+                conn = pool.getconn()
+                if self._alive(conn):
+                    break
+                self._returned_at.pop(id(conn), None)
+                pool.putconn(conn, close=True)
+                self.discarded += 1
+                conn = None
+            if conn is None:
+                conn = pool.getconn()
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            if conn is not None:
+                if not broken and not conn.closed:
+                    try:
+                        conn.rollback()  # leave no open transaction behind
+                    except psycopg2.Error:
+                        broken = True
+                if broken or conn.closed:
+                    self.discarded += 1
+                    self._returned_at.pop(id(conn), None)
+                else:
+                    self._returned_at[id(conn)] = time.monotonic()
+                pool.putconn(conn, close=broken or bool(conn.closed))
+            self._slots.release()
+
+    def health(self) -> dict:
+        """Round-trip SELECT 1 through the pool and report pool state"""
+        status = {
+            "postgrest_client": self._client is not None,
+            "pool_configured": self.pool_available,
+            "pool_min": self.minconn,
+            "pool_max": self.maxconn,
+            "discarded_connections": self.discarded,
+        }
+        if not self.pool_available:
+            return status
+
+        start = time.perf_counter()
+        try:
+            with self.connection() as conn:
+                if conn is None:
+                    status["pool_ok"] = False
+                    status["error"] = self._pool_error
+                    return status
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+            status["pool_ok"] = True
+            status["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        except Exception as e:
+            status["pool_ok"] = False
+            status["error"] = str(e)
+        return status
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+
+
+_manager: Optional[ConnectionManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_connection_manager() -> ConnectionManager:
+    """Process-wide connection manager (created on first use)"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = ConnectionManager()
+    return _manager
+
+
+def init_connection_manager() -> ConnectionManager:
+    """Create the manager and open the pool's minimum connections (app startup)"""
+    manager = get_connection_manager()
+    manager._get_pool()
+    try:
+        manager.get_client()
+    except ValueError as e:
+        print(f"[ConnectionManager] {e}")
+    return manager
+
+
+def close_connection_manager() -> None:
+    global _manager
+    with _manager_lock:
+        if _manager is not None:
+            _manager.close()
+            _manager = None
+
+
+def get_supabase_client() -> Client:
+    """Shared Supabase client for request handlers and services"""
+    return get_connection_manager().get_client()
+
+
+def pooled_connection():
+    """Context manager borrowing a pooled psycopg2 connection (None if unavailable)"""
+    return get_connection_manager().connection()
@@ -1,15 +1,22 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Any, Dict, List, Optional
-import requests
+from polymarket.midpoint_cache import midpoint_cache
+from polymarket.rate_limit import HostLimiter
+from polymarket.transport import get_json, post_json
 
 GAMMA = "https://gamma-api.polymarket.com"
 CLOB = "https://clob.polymarket.com"
 TIMEOUT = 15
+MAX_WORKERS = 8
 
-def _get(url: str, params: Optional[Dict[str, Any]] = None) -> Any:
-    r = requests.get(url, params=params or {}, timeout=TIMEOUT)
-    r.raise_for_status()
-    return r.json()
+# Pooled, retrying calls via the shared transport (rate limited only when a limiter is passed)
+def _get(url: str, params: Optional[Dict[str, Any]] = None, limiter: Optional[HostLimiter] = None) -> Any:
+    return get_json(url, params, timeout=TIMEOUT, limiter=limiter)
+
+def _post(url: str, body: Any, limiter: Optional[HostLimiter] = None) -> Any:
+    return post_json(url, body, timeout=TIMEOUT, limiter=limiter)
 
 def _to_list(x: Any) -> List[str]:
     if x is None: return []
@@ -25,11 +32,37 @@ def _to_list(x: Any) -> List[str]:
         return [s]
     return [str(x)]
 
-def mid(token_id: str) -> Optional[str]:
-    d = _get(f"{CLOB}/midpoint", {"token_id": str(token_id).strip()})
+def _fetch_mid(token_id: str, limiter: Optional[HostLimiter] = None) -> Optional[str]:
+    d = _get(f"{CLOB}/midpoint", {"token_id": str(token_id).strip()}, limiter)
     v = d.get("mid") or d.get("midpoint") or d.get("price")
     return str(v) if v is not None else None
 
+def _fetch_mids(ids: List[str], limiter: Optional[HostLimiter] = None) -> Dict[str, Optional[str]]:
+    """One bulk /midpoints call, per-token fallback in parallel."""
+    out: Dict[str, Optional[str]] = {}
+    if len(ids) > 1:
+        try:
+            d = _post(f"{CLOB}/midpoints", [{"token_id": t} for t in ids], limiter)
+            if isinstance(d, dict):
+                out = {t: str(d[t]) for t in ids if d.get(t) is not None}
+        except Exception:
+            pass
+    rest = [t for t in ids if t not in out]
+    if rest:
+        with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(rest))) as ex:
+            out.update(zip(rest, ex.map(partial(_fetch_mid, limiter=limiter), rest)))
+    return out
+
+def mids(token_ids: List[str], limiter: Optional[HostLimiter] = None) -> Dict[str, Optional[str]]:
+    """Midpoints for many tokens through the shared short-TTL cache (misses fetched under `limiter`)."""
+    ids = list(dict.fromkeys(str(t).strip() for t in token_ids if str(t).strip()))
+    if not ids: return {}
+    # Flights are grouped by limiter so unthrottled callers never wait on a rate-limited fetch
+    return midpoint_cache.get_many(ids, partial(_fetch_mids, limiter=limiter), group=limiter)
+
+def mid(token_id: str) -> Optional[str]:
+    return mids([token_id]).get(str(token_id).strip())
+
 def ui(token_id: str) -> Dict[str, Any]:
     ms = _get(f"{GAMMA}/markets", {"clob_token_ids": [str(token_id).strip()], "limit": 1})
     if not ms:
@@ -38,8 +71,9 @@ def ui(token_id: str) -> Dict[str, Any]:
     tokens = _to_list(m.get("clobTokenIds"))
     outs = _to_list(m.get("outcomes"))
     n = min(len(tokens), len(outs))
+    prices = mids(tokens[:n])
     return {
         "q": m.get("question"),
         "img": m.get("image"),
-        "p": {outs[i]: mid(tokens[i]) for i in range(n)},
+        "p": {outs[i]: prices.get(tokens[i].strip()) for i in range(n)},
     }
@@ -6,7 +6,7 @@ Relationships include: same event, same company/entity, same sector, geographic
 
 import json
 from typing import List, Dict, Optional
-from database.supabase_connection import SupabaseConnection
+from database.supabase_connection import get_supabase_client
 
 
 def normalize_token_ids(token_ids_str: str) -> str:
@@ -83,8 +83,7 @@ def get_related_traded(
         - count: Number of related markets found
     """
     try:
-        conn = SupabaseConnection()
-        client = conn.get_client()
+        client = get_supabase_client()
         
         # Step 1: Get source market information
         source_market = None
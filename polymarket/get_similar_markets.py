@@ -4,8 +4,10 @@ Given an exact event_title, finds the top 5 most similar markets ordered by cosi
 """
 
 import json
-from typing import List, Dict, Optional
-from database.supabase_connection import SupabaseConnection
+from typing import Iterable, List, Dict, Optional
+from database.supabase_connection import get_supabase_client, pooled_connection
+
+MARKET_METADATA_COLUMNS = "market_id, question, market_slug, event_title, tag_label, clob_token_ids"
 
 
 def normalize_token_ids(token_ids_str: str) -> str:
@@ -27,6 +29,103 @@ def normalize_token_ids(token_ids_str: str) -> str:
         return token_ids_str.strip()
 
 
+def in_list(values: Iterable[str]) -> str:
+    """
+    Build a PostgREST `in.(...)` list for use with `.filter(column, "in", ...)`.
+
+    clob_token_ids are JSON strings containing double quotes and commas, so
+    every value is quoted and inner quotes/backslashes are escaped (postgrest-py's
+    own `in_()` only wraps values and would send the inner quotes raw).
+    """
+    quoted = ['"' + v.replace("\\", "\\\\").replace('"', '\\"') + '"' for v in values]
+    return "(" + ",".join(quoted) + ")"
+
+
+def fetch_markets_by_token_ids(client, token_ids: Iterable[str], memo: Dict[str, Optional[dict]]) -> Dict[str, Optional[dict]]:
+    """
+    Fetch market metadata for many clob_token_ids in one round trip.
+
+    Args:
+        client: Supabase client
+        token_ids: Normalized clob_token_ids strings
+        memo: Request-scoped cache (token_ids -> market row or None); only
+              ids not already in it are queried, and results are added to it
+
+    Returns:
+        The memo, covering every requested id (None for unknown markets)
+    """
+    missing = [tid for tid in dict.fromkeys(token_ids) if tid and tid not in memo]
+    if missing:
+        response = client.table("markets").select(
+            MARKET_METADATA_COLUMNS
+        ).filter("clob_token_ids", "in", in_list(missing)).execute()
+
+        for market in response.data or []:
+            # Keep the first market per token set, matching the old .limit(1)
+            memo.setdefault(market.get("clob_token_ids"), market)
+
+        for tid in missing:
+            memo.setdefault(tid, None)
+
+    return memo
+
+
+def match_similar_markets(
+    client,
+    market_id: str,
+    match_count: int = 20,
+    min_similarity: float = 0.0,
+    use_pool: bool = True,
+) -> List[dict]:
+    """
+    Embedding nearest neighbours of a market, computed inside Postgres.
+
+    Calls the match_similar_markets() function (migration 007), which reads the
+    source embedding server-side and uses the HNSW index, so no vector is sent
+    over the wire and the query plan is reused. The function is called over a
+    pooled direct connection when one is configured (no PostgREST hop), and
+    through PostgREST rpc otherwise or if the direct call fails.
+
+    Returns:
+        Rows with market_id, question, market_slug, tag_label, clob_token_ids
+        and similarity, most similar first ([] if the market has no embedding)
+    """
+    params = {
+        "source_market_id": market_id,
+        "match_count": match_count,
+        "min_similarity": min_similarity,
+    }
+    if use_pool:
+        try:
+            with pooled_connection() as conn:
+                if conn is not None:
+                    with conn.cursor() as cursor:
+                        cursor.execute(
+                            "SELECT * FROM match_similar_markets(%(source_market_id)s, %(match_count)s, %(min_similarity)s)",
+                            params,
+                        )
+                        columns = [column[0] for column in cursor.description]
+                        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"[match_similar_markets] Pooled query failed, using PostgREST: {e}")
+
+    response = client.rpc("match_similar_markets", params).execute()
+    return response.data or []
+
+
+def fetch_precomputed_neighbors(client, market_id: str, limit: int = 20, min_similarity: float = 0.0) -> List[dict]:
+    """
+    Stored top-K embedding neighbours of a market (market_neighbors, migration 008).
+
+    One indexed lookup on the market_neighbor_details view; [] when the batch
+    job has not covered this market yet.
+    """
+    response = client.table("market_neighbor_details").select(
+        "neighbor_market_id, question, market_slug, tag_label, clob_token_ids, similarity"
+    ).eq("market_id", market_id).gte("similarity", min_similarity).order("rank").limit(limit).execute()
+    return response.data or []
+
+
 def get_similar_by_event_title(event_title: str, limit: int = 5) -> dict:
     """
     Given an exact event_title, this method:
@@ -47,9 +146,8 @@ def get_similar_by_event_title(event_title: str, limit: int = 5) -> dict:
         - similar_markets: List of similar markets with metadata
     """
     try:
-        # Connect to Supabase
-        conn = SupabaseConnection()
-        client = conn.get_client()
+        # Shared Supabase client
+        client = get_supabase_client()
         
         # Step 1: Find markets with this event_title and get their clob_token_ids
         markets_response = client.table("markets").select(
@@ -90,21 +188,21 @@ def get_similar_by_event_title(event_title: str, limit: int = 5) -> dict:
             }
         
         # Step 2: Query similarity_scores table for similar markets
-        # Get all similarity records where source matches any of our token IDs
-        all_similarities = []
+        # One round trip for every source token set of this event
+        sources = sorted(source_token_ids_set)
+        similarities_response = client.table("similarity_scores").select(
+            "source_clob_token_ids, neighbor_clob_token_ids, cosine_similarity"
+        ).filter("source_clob_token_ids", "in", in_list(sources)).order(
+            "cosine_similarity", desc=True
+        ).limit(limit * 2 * len(sources)).execute()  # Get more than needed to account for duplicates
         
-        for source_token_ids in source_token_ids_set:
-            similarities_response = client.table("similarity_scores").select(
-                "neighbor_clob_token_ids, cosine_similarity"
-            ).eq("source_clob_token_ids", source_token_ids).order(
-                "cosine_similarity", desc=True
-            ).limit(limit * 2).execute()  # Get more than needed to account for duplicates
-            
-            for sim in similarities_response.data:
-                all_similarities.append({
-                    "neighbor_clob_token_ids": sim.get("neighbor_clob_token_ids"),
-                    "cosine_similarity": float(sim.get("cosine_similarity", 0))
-                })
+        all_similarities = [
+            {
+                "neighbor_clob_token_ids": sim.get("neighbor_clob_token_ids"),
+                "cosine_similarity": float(sim.get("cosine_similarity", 0))
+            }
+            for sim in similarities_response.data or []
+        ]
         
         # Sort by similarity and get top results
         all_similarities.sort(key=lambda x: x["cosine_similarity"], reverse=True)
@@ -121,19 +219,19 @@ def get_similar_by_event_title(event_title: str, limit: int = 5) -> dict:
                 if len(top_similarities) >= limit:
                     break
         
-        # Step 3: Enrich with market metadata
+        # Step 3: Enrich with market metadata (one batched lookup for all neighbors)
+        market_memo: Dict[str, Optional[dict]] = {}
+        fetch_markets_by_token_ids(
+            client, [sim["neighbor_clob_token_ids"] for sim in top_similarities], market_memo
+        )
+        
         similar_markets = []
         
         for sim in top_similarities:
             neighbor_ids = sim["neighbor_clob_token_ids"]
+            market = market_memo.get(neighbor_ids)
             
-            # Find markets with matching clob_token_ids
-            neighbor_markets_response = client.table("markets").select(
-                "market_id, question, market_slug, event_title, tag_label"
-            ).eq("clob_token_ids", neighbor_ids).limit(1).execute()
-            
-            if neighbor_markets_response.data:
-                market = neighbor_markets_response.data[0]
+            if market:
                 similar_markets.append({
                     "market_id": market.get("market_id"),
                     "question": market.get("question"),
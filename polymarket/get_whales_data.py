@@ -1,8 +1,9 @@
 # polymarket/get_whales_data.py
-import time
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from typing import Literal, List, Dict, Any, Optional
 
+from polymarket.transport import get_json
+
 LEADERBOARD_URL = "https://data-api.polymarket.com/v1/leaderboard"
 TRADES_URL = "https://data-api.polymarket.com/trades"
 EVENT_BY_SLUG_URL = "https://gamma-api.polymarket.com/events/slug"
@@ -36,7 +37,9 @@ _ALLOWED_CATEGORIES = {
 }
 
 
-RETRY_STATUSES = {429, 502, 503, 504}
+# Wallet trades and event lookups run in parallel; each retry backoff only
+# stalls its own worker thread
+MAX_WORKERS = 5
 
 
 def _normalize_category(category: str) -> Category:
@@ -61,28 +64,13 @@ def _get_json_with_retries(
     max_retries: int = 4,
     backoff_seconds: float = 0.6,
 ) -> Any:
-    last_err: Optional[Exception] = None
-
-    for attempt in range(max_retries + 1):
-        try:
-            r = requests.get(url, params=params or {}, timeout=timeout)
-            if r.status_code in RETRY_STATUSES:
-                raise requests.HTTPError(f"{r.status_code} retryable", response=r)
-            r.raise_for_status()
-            return r.json()
-        except (requests.Timeout, requests.ConnectionError, requests.HTTPError) as e:
-            last_err = e
-            status = getattr(getattr(e, "response", None), "status_code", None)
-
-            if status is not None and status not in RETRY_STATUSES:
-                raise
-
-            if attempt >= max_retries:
-                break
-
-            time.sleep(backoff_seconds * (2 ** attempt))
-
-    raise last_err if last_err else RuntimeError("Request failed")
+    return get_json(
+        url,
+        params,
+        timeout=timeout,
+        max_retries=max_retries,
+        backoff_seconds=backoff_seconds,
+    )
 
 
 def _leaderboard_proxy_wallets(category: str) -> List[str]:
@@ -222,15 +210,24 @@ def _extract_side(trade: Optional[Dict[str, Any]]) -> Optional[str]:
 def top5_latest_trade_cards(category: str) -> List[Dict[str, Any]]:
     """
     category can be lowercase, uppercase, or title case.
+
+    Latest trades for all wallets are fetched concurrently, then each distinct
+    event slug is fetched once, concurrently.
     """
     wallets = _leaderboard_proxy_wallets(category)
-    out: List[Dict[str, Any]] = []
+    if not wallets:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(wallets))) as executor:
+        trades = list(executor.map(_get_user_latest_trade, wallets))
+        slugs = [_extract_slug_from_trade(t) for t in trades]
 
-    for w in wallets:
-        trade = _get_user_latest_trade(w)
-        slug = _extract_slug_from_trade(trade)
-        event = _get_event_by_slug(slug) if slug else None
+        distinct_slugs = list(dict.fromkeys(s for s in slugs if s))
+        events = dict(zip(distinct_slugs, executor.map(_get_event_by_slug, distinct_slugs)))
 
+    out: List[Dict[str, Any]] = []
+    for w, trade, slug in zip(wallets, trades, slugs):
+        event = events.get(slug) if slug else None
         out.append(
             {
                 "proxyWallet": w,
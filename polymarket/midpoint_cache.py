@@ -0,0 +1,155 @@
+"""
+Midpoint Cache
+Short-TTL, process-wide cache of CLOB midpoints with single-flight coalescing.
+
+/ui, the trending refresh and the CLOB price endpoint all read midpoints for
+the same popular tokens. Entries live for MIDPOINT_CACHE_TTL seconds (clamped
+to 1-5s) and concurrent misses for one token share a single upstream call.
+Flights are grouped by the caller's rate limiter, so an interactive caller
+never waits on a fetch queued behind the metric refresh's token bucket.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+MIN_TTL = 1.0
+MAX_TTL = 5.0
+DEFAULT_TTL = 2.0
+
+Loader = Callable[[List[str]], Dict[str, Optional[str]]]
+
+
+class _Flight:
+    """One in-progress upstream fetch that other callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class MidpointCache:
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        self.ttl = min(max(float(ttl), MIN_TTL), MAX_TTL)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[float, Optional[str]]] = {}
+        # (expires, token_id) in insertion order; the TTL is fixed, so also expiry order
+        self._expiry: Deque[Tuple[float, str]] = deque()
+        self._inflight: Dict[Tuple[Hashable, str], _Flight] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def peek(self, token_id: str) -> Tuple[bool, Optional[str]]:
+        """
+        Return (found, midpoint) for a fresh entry without loading anything
+
+        Counts as a hit when found; a miss is left to the caller's own path.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token_id)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return True, entry[1]
+        return False, None
+
+    def get(self, token_id: str, loader: Loader, group: Hashable = None) -> Optional[str]:
+        """Cached midpoint for one token"""
+        return self.get_many([token_id], loader, group).get(token_id)
+
+    def get_many(self, token_ids: List[str], loader: Loader, group: Hashable = None) -> Dict[str, Optional[str]]:
+        """
+        Cached midpoints for many tokens
+
+        Fresh entries are served from memory, tokens already being fetched by
+        another caller in the same group are awaited, and only the remainder
+        is passed to `loader` (in a single call, so bulk endpoints stay bulk).
+
+        Args:
+            token_ids: CLOB token IDs
+            loader: Fetches {token_id: midpoint} for a list of token IDs
+            group: Flight group, e.g. the loader's rate limiter (None for unthrottled callers)
+
+        Returns:
+            Dictionary of token_id -> midpoint string (None if unavailable)
+        """
+        now = time.monotonic()
+        out: Dict[str, Optional[str]] = {}
+        waiting: Dict[str, _Flight] = {}
+        mine: Dict[str, _Flight] = {}
+
+        with self._lock:
+            for token_id in dict.fromkeys(token_ids):
+                entry = self._entries.get(token_id)
+                if entry and entry[0] > now:
+                    self.hits += 1
+                    out[token_id] = entry[1]
+                elif (group, token_id) in self._inflight:
+                    self.coalesced += 1
+                    waiting[token_id] = self._inflight[(group, token_id)]
+                else:
+                    self.misses += 1
+                    mine[token_id] = self._inflight[(group, token_id)] = _Flight()
+
+        if mine:
+            try:
+                loaded = loader(list(mine))
+            except BaseException as e:
+                with self._lock:
+                    for token_id, flight in mine.items():
+                        self._inflight.pop((group, token_id), None)
+                        flight.error = e
+                        flight.done.set()
+                raise
+
+            with self._lock:
+                # Taken under the lock so _expiry stays sorted
+                now = time.monotonic()
+                expires = now + self.ttl
+                self._evict_expired(now)
+                for token_id, flight in mine.items():
+                    value = loaded.get(token_id)
+                    self._entries[token_id] = (expires, value)
+                    self._expiry.append((expires, token_id))
+                    self._inflight.pop((group, token_id), None)
+                    flight.value = value
+                    flight.done.set()
+                    out[token_id] = value
+
+        for token_id, flight in waiting.items():
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            out[token_id] = flight.value
+
+        return out
+
+    def _evict_expired(self, now: float) -> None:
+        """Drop entries whose TTL has passed (caller holds the lock); amortized O(1) per insert"""
+        while self._expiry and self._expiry[0][0] <= now:
+            expires, token_id = self._expiry.popleft()
+            entry = self._entries.get(token_id)
+            # A newer insert for the token has its own, later queue entry
+            if entry is not None and entry[0] <= expires:
+                del self._entries[token_id]
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss/coalesce counters"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "ttl_seconds": self.ttl,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Process-wide instance shared by /ui, the trending refresh and the CLOB client
+midpoint_cache = MidpointCache(float(os.getenv("MIDPOINT_CACHE_TTL", DEFAULT_TTL)))
@@ -1,15 +1,22 @@
 import os
 import re
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime, timedelta, timezone
+from typing import Optional
 from dotenv import load_dotenv
 
+from polymarket.transport import request
+
 load_dotenv()
 
 GNEWS_URL = "https://gnews.io/api/v4/search"
 GNEWS_API_KEY = os.getenv("GNEWS_API_KEY") or os.getenv("GNEWS")
 TIMEOUT = 20
 MAX_ARTICLES = 5
+MAX_WORKERS = 6
+WESTERN_COUNTRIES = ["us", "gb", "ca", "au", "ie", "fr", "de", "nl", "ch"]
 
 
 def _iso_z(dt: datetime) -> str:
@@ -75,7 +82,39 @@ def _build_query_variants(question: str) -> list[str]:
     return uniq
 
 
-def fetch_news(question: str) -> list[dict]:
+def _search(params: dict, timeout: float) -> list[dict]:
+    """One GNews query; [] on HTTP errors or no articles."""
+    # No retries: the fan-out already tries other variants within the deadline
+    try:
+        r = request("GET", GNEWS_URL, params=params, timeout=timeout, max_retries=0)
+    except requests.HTTPError:
+        return []
+
+    articles = (r.json() or {}).get("articles") or []
+
+    out = []
+    for a in articles[:MAX_ARTICLES]:  # defensive cap
+        out.append(
+            {
+                "title": a.get("title"),
+                "image": a.get("image"),
+                "name": (a.get("source") or {}).get("name"),
+                "url": a.get("url"),
+            }
+        )
+    return out
+
+
+def fetch_news(question: str, deadline: Optional[float] = None) -> list[dict]:
+    """
+    Search GNews across country x query-variant combinations concurrently.
+
+    Combinations keep their sequential priority (country first, then variant):
+    the highest-priority non-empty result is returned as soon as every
+    combination ahead of it has come back empty, and the remaining requests
+    are cancelled. `deadline` bounds the whole search in seconds; whatever
+    is known by then is used and [] is returned if nothing has won yet.
+    """
     if not GNEWS_API_KEY:
         raise RuntimeError("Missing GNEWS_API_KEY")
 
@@ -86,8 +125,6 @@ def fetch_news(question: str) -> list[dict]:
     now = datetime.now(timezone.utc)
     from_dt = now - timedelta(days=30)
 
-    western_countries = ["us", "gb", "ca", "au", "ie", "fr", "de", "nl", "ch"]
-
     base_params = {
         "apikey": GNEWS_API_KEY,
         "lang": "en",
@@ -99,31 +136,29 @@ def fetch_news(question: str) -> list[dict]:
         "to": _iso_z(now),
     }
 
-    for country in western_countries:
-        for q in queries:
-            params = dict(base_params, country=country, q=q)
-
-            r = requests.get(GNEWS_URL, params=params, timeout=TIMEOUT)
-            if not r.ok:
+    attempts = [dict(base_params, country=country, q=q) for country in WESTERN_COUNTRIES for q in queries]
+    timeout = min(TIMEOUT, deadline) if deadline else TIMEOUT
+    end = time.monotonic() + deadline if deadline else None
+
+    executor = ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(attempts)))
+    try:
+        futures = [executor.submit(_search, params, timeout) for params in attempts]
+        for future in futures:  # priority order
+            remaining = None if end is None else end - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            try:
+                articles = future.result(timeout=remaining)
+            except FutureTimeout:
+                break
+            except requests.RequestException:
                 continue
-
-            articles = (r.json() or {}).get("articles") or []
-            if not articles:
-                continue
-
-            out = []
-            for a in articles[:MAX_ARTICLES]:  # defensive cap
-                out.append(
-                    {
-                        "title": a.get("title"),
-                        "image": a.get("image"),
-                        "name": (a.get("source") or {}).get("name"),
-                        "url": a.get("url"),
-                    }
-                )
-            return out
-
-    return []
+            if articles:
+                return articles
+        return []
+    finally:
+        # Drop queued requests; in-flight ones finish in the background and are ignored
+        executor.shutdown(wait=False, cancel_futures=True)
 
 
 if __name__ == "__main__":
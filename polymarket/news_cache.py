@@ -0,0 +1,228 @@
+"""
+News result cache in front of fetch_news.
+
+Keys are the question's normalized core terms (see news._extract_core_terms),
+so rephrasings of the same market share one entry. Entries live in an LRU
+memory tier and, when NEWS_CACHE_DB is set, in a SQLite file that survives
+restarts. Within NEWS_CACHE_TTL an entry is served as-is; after that and for
+up to NEWS_CACHE_STALE_TTL more it is still served immediately while a
+background refresh replaces it (stale-while-revalidate). Concurrent misses
+for one key share a single fetch.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from polymarket.midpoint_cache import _Flight
+from polymarket.news import _extract_core_terms, _normalize_for_keywords, fetch_news
+
+NEWS_CACHE_TTL = float(os.getenv("NEWS_CACHE_TTL", "900"))
+NEWS_CACHE_STALE_TTL = float(os.getenv("NEWS_CACHE_STALE_TTL", "3600"))
+# Empty results are often a truncated (deadline) search; keep them briefly
+NEWS_CACHE_EMPTY_TTL = float(os.getenv("NEWS_CACHE_EMPTY_TTL", "60"))
+NEWS_CACHE_SIZE = int(os.getenv("NEWS_CACHE_SIZE", "512"))
+NEWS_CACHE_DB = os.getenv("NEWS_CACHE_DB")
+
+Entry = Tuple[float, List[dict]]  # (fetched_at, articles)
+
+
+def news_cache_key(question: str) -> str:
+    """Order-insensitive key from the question's core terms"""
+    terms = _extract_core_terms(question)
+    if not terms:
+        return _normalize_for_keywords(question).lower()
+    return " ".join(sorted(terms))
+
+
+class NewsCache:
+    def __init__(
+        self,
+        fetch: Callable[..., List[dict]] = fetch_news,
+        ttl: float = NEWS_CACHE_TTL,
+        stale_ttl: float = NEWS_CACHE_STALE_TTL,
+        empty_ttl: float = NEWS_CACHE_EMPTY_TTL,
+        max_entries: int = NEWS_CACHE_SIZE,
+        db_path: Optional[str] = NEWS_CACHE_DB,
+    ):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.empty_ttl = empty_ttl
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._memory: "OrderedDict[str, Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing: set = set()
+        self._inflight: Dict[str, _Flight] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        if db_path:
+            self._init_db()
+
+    # ------------------------------------------------------------------
+    # SQLite tier
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def _init_db(self) -> None:
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS news_cache ("
+                "key TEXT PRIMARY KEY, articles TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+
+    def _db_get(self, key: str) -> Optional[Entry]:
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT fetched_at, articles FROM news_cache WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"[NewsCache] SQLite read failed: {e}")
+            return None
+        return (row[0], json.loads(row[1])) if row else None
+
+    def _db_put(self, key: str, entry: Entry) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO news_cache (key, articles, fetched_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(entry[1]), entry[0]),
+                )
+        except sqlite3.Error as e:
+            print(f"[NewsCache] SQLite write failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def _lookup(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+        if self.db_path:
+            entry = self._db_get(key)
+            if entry is not None:
+                self._remember(key, entry)
+            return entry
+        return None
+
+    def _remember(self, key: str, entry: Entry) -> None:
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _store(self, key: str, articles: List[dict]) -> List[dict]:
+        entry = (time.time(), articles)
+        self._remember(key, entry)
+        if self.db_path:
+            self._db_put(key, entry)
+        return articles
+
+    def _fresh_for(self, articles: List[dict]) -> float:
+        return self.ttl if articles else self.empty_ttl
+
+    def _refresh_in_background(self, key: str, question: str) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self._store(key, self.fetch(question))
+            except Exception as e:
+                print(f"[NewsCache] Background refresh failed for '{key}': {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def get(self, question: str, deadline: Optional[float] = None) -> List[dict]:
+        """
+        Cached fetch_news(question)
+
+        Args:
+            question: Market question
+            deadline: Passed to fetch_news on a miss (background refreshes run unbounded)
+        """
+        key = news_cache_key(question)
+        entry = self._lookup(key)
+
+        if entry is not None:
+            fetched_at, articles = entry
+            age = time.time() - fetched_at
+            fresh_for = self._fresh_for(articles)
+            if age < fresh_for:
+                with self._lock:
+                    self.hits += 1
+                return articles
+            if articles and age < fresh_for + self.stale_ttl:
+                with self._lock:
+                    self.stale_hits += 1
+                self._refresh_in_background(key, question)
+                return articles
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is None:
+                self.misses += 1
+                flight = self._inflight[key] = _Flight()
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            # Another request is already searching for this key; wait for its result
+            if not flight.done.wait(timeout=deadline):
+                return []
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = self._store(key, self.fetch(question, deadline=deadline))
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._memory),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "refreshing": len(self._refreshing),
+                "persistent": bool(self.db_path),
+            }
+
+
+# Process-wide cache used by /news
+news_cache = NewsCache()
+
+
+def fetch_news_cached(question: str, deadline: Optional[float] = None) -> List[dict]:
+    return news_cache.get(question, deadline=deadline)
@@ -0,0 +1,77 @@
+"""
+Per-host rate limiting for upstream Polymarket APIs.
+
+Bulk jobs (the parallel metric refresh) pass a HostLimiter into their
+upstream calls so their fan-out cannot exceed a per-host request budget.
+Interactive calls pass no limiter and are never queued behind a refresh.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+# Requests per second and burst size allowed per upstream host
+DEFAULT_RATE = float(os.getenv("UPSTREAM_RATE_PER_HOST", "20"))
+DEFAULT_BURST = int(os.getenv("UPSTREAM_BURST_PER_HOST", "40"))
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available"""
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST):
+        self.rate = float(rate)
+        self.capacity = float(max(1, burst))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        """Take tokens now (possibly going negative); return seconds to wait"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        if self.rate <= 0:
+            return
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    def delay(self, tokens: float = 1.0) -> float:
+        """Reserve tokens and return the wait instead of sleeping (for async callers)"""
+        if self.rate <= 0:
+            return 0.0
+        return self._reserve(tokens)
+
+
+class HostLimiter:
+    """One TokenBucket per upstream host, shared by the callers holding this limiter"""
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url: str) -> Optional[TokenBucket]:
+        """Bucket for the URL's host (None for relative/invalid URLs)"""
+        host = urlparse(url).hostname
+        if not host:
+            return None
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+            return bucket
+
+
+# Budget shared by every metric refresh in the process
+refresh_limiter = HostLimiter()
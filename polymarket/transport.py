@@ -0,0 +1,207 @@
+"""
+Shared HTTP transport for upstream APIs (Gamma, CLOB, data-api, GNews).
+
+Sync callers share one requests.Session and async callers share one
+httpx.AsyncClient per upstream host (HTTP/2 when the `h2` package is
+installed), so connections are pooled per host and kept alive across
+calls. Both paths apply the same retry/backoff policy; callers that fan
+out (the metric refresh) also pass a per-host HostLimiter (see
+polymarket/rate_limit.py).
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from polymarket.rate_limit import HostLimiter
+
+RETRY_STATUSES = {429, 502, 503, 504}
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 0.6
+DEFAULT_TIMEOUT = 15
+
+# Connections kept per upstream host
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))
+# Distinct hosts whose pools are cached by the sync session (async clients are per host)
+POOL_HOSTS = 8
+KEEPALIVE_EXPIRY = 30.0
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class RetryableStatus(Exception):
+    """Upstream answered with a status in RETRY_STATUSES"""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"{status_code} retryable")
+        self.status_code = status_code
+
+
+def _backoff(attempt: int, backoff_seconds: float) -> float:
+    return backoff_seconds * (2 ** attempt)
+
+
+# ----------------------------------------------------------------------
+# Sync (requests)
+# ----------------------------------------------------------------------
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Process-wide keep-alive session"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_MAXSIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def request(
+    method: str,
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    json: Any = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    max_retries: int = MAX_RETRIES,
+    backoff_seconds: float = BACKOFF_SECONDS,
+    limiter: Optional[HostLimiter] = None,
+) -> requests.Response:
+    """
+    Request with retries on timeouts, connection errors and RETRY_STATUSES.
+    Other HTTP errors are raised immediately. With a limiter, every attempt
+    first takes a token from its bucket for the URL's host.
+
+    Returns:
+        Successful (2xx) response
+    """
+    session = get_session()
+    bucket = limiter.for_url(url) if limiter else None
+    last_err: Optional[Exception] = None
+
+    for attempt in range(max_retries + 1):
+        if bucket:
+            bucket.acquire()
+        try:
+            r = session.request(method, url, params=params or {}, json=json, timeout=timeout)
+            if r.status_code in RETRY_STATUSES:
+                raise requests.HTTPError(f"{r.status_code} retryable", response=r)
+            r.raise_for_status()
+            return r
+        except (requests.Timeout, requests.ConnectionError, requests.HTTPError) as e:
+            last_err = e
+            status = getattr(getattr(e, "response", None), "status_code", None)
+
+            if status is not None and status not in RETRY_STATUSES:
+                raise
+
+            if attempt >= max_retries:
+                break
+
+            time.sleep(_backoff(attempt, backoff_seconds))
+
+    raise last_err if last_err else RuntimeError("Request failed")
+
+
+def get_json(url: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> Any:
+    return request("GET", url, params=params, **kwargs).json()
+
+
+def post_json(url: str, body: Any, **kwargs) -> Any:
+    return request("POST", url, json=body, **kwargs).json()
+
+
+# ----------------------------------------------------------------------
+# Async (httpx)
+# ----------------------------------------------------------------------
+
+_async_clients: Dict[str, httpx.AsyncClient] = {}
+
+
+def get_async_client(url: str) -> httpx.AsyncClient:
+    """
+    Process-wide async client for the URL's host (created on first use inside
+    the event loop). Each host gets its own pool, so POOL_MAXSIZE caps the
+    connections to every upstream separately and a slow host cannot take
+    connections another one needs.
+    """
+    host = urlparse(url).netloc
+    client = _async_clients.get(host)
+    if client is None or client.is_closed:
+        client = _async_clients[host] = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=POOL_MAXSIZE,
+                max_keepalive_connections=POOL_MAXSIZE,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+        )
+    return client
+
+
+async def aclose_async_client() -> None:
+    """Close every per-host async client (app shutdown)"""
+    clients = list(_async_clients.values())
+    _async_clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+async def arequest(
+    method: str,
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    json: Any = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    max_retries: int = MAX_RETRIES,
+    backoff_seconds: float = BACKOFF_SECONDS,
+    limiter: Optional[HostLimiter] = None,
+) -> httpx.Response:
+    """
+    Async counterpart of request(); rate-limit waits and backoff use
+    asyncio.sleep so other in-flight calls keep running.
+    """
+    client = get_async_client(url)
+    bucket = limiter.for_url(url) if limiter else None
+    last_err: Optional[Exception] = None
+
+    for attempt in range(max_retries + 1):
+        if bucket:
+            wait = bucket.delay()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        try:
+            r = await client.request(method, url, params=params, json=json, timeout=timeout)
+            if r.status_code in RETRY_STATUSES:
+                raise RetryableStatus(r.status_code)
+            r.raise_for_status()
+            return r
+        except (httpx.TimeoutException, httpx.TransportError, RetryableStatus) as e:
+            last_err = e
+            if attempt >= max_retries:
+                break
+            await asyncio.sleep(_backoff(attempt, backoff_seconds))
+
+    raise last_err if last_err else RuntimeError("Request failed")
+
+
+async def aget(url: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> httpx.Response:
+    return await arequest("GET", url, params=params, **kwargs)
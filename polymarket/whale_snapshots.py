@@ -0,0 +1,96 @@
+"""
+Whale Snapshots
+Per-category cache of assembled whale cards (leaderboard wallets + latest
+trade + event), rebuilt on an interval by a background refresher.
+
+The DAY leaderboard moves slowly while /whales is polled for every category
+from every open extension tab, so requests are served from memory. A category
+with no snapshot yet, or one older than WHALES_SNAPSHOT_MAX_AGE (e.g. when no
+refresher is running), is built on demand; concurrent builds of one category
+are coalesced.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from polymarket.get_whales_data import _ALLOWED_CATEGORIES, _normalize_category, top5_latest_trade_cards
+
+WHALES_REFRESH_SECONDS = float(os.getenv("WHALES_REFRESH_SECONDS", "60"))
+WHALES_SNAPSHOT_MAX_AGE = float(os.getenv("WHALES_SNAPSHOT_MAX_AGE", "600"))
+
+Snapshot = Tuple[float, List[Dict[str, Any]]]  # (built_at, cards)
+
+
+class WhaleSnapshotCache:
+    def __init__(self, max_age: float = WHALES_SNAPSHOT_MAX_AGE):
+        self.max_age = max_age
+        self._snapshots: Dict[str, Snapshot] = {}
+        self._lock = threading.Lock()
+        self._build_locks: Dict[str, threading.Lock] = {}
+
+    def _build_lock(self, category: str) -> threading.Lock:
+        with self._lock:
+            return self._build_locks.setdefault(category, threading.Lock())
+
+    def _peek(self, category: str) -> Optional[Snapshot]:
+        with self._lock:
+            return self._snapshots.get(category)
+
+    def _is_fresh(self, snapshot: Optional[Snapshot]) -> bool:
+        return snapshot is not None and time.time() - snapshot[0] < self.max_age
+
+    def refresh(self, category: str) -> Snapshot:
+        """Rebuild one category's snapshot (category must already be canonical)"""
+        cards = top5_latest_trade_cards(category)
+        snapshot = (time.time(), cards)
+        with self._lock:
+            self._snapshots[category] = snapshot
+        return snapshot
+
+    def refresh_all(self) -> None:
+        """Rebuild every canonical category; failures keep the previous snapshot"""
+        for category in sorted(set(_ALLOWED_CATEGORIES.values())):
+            try:
+                with self._build_lock(category):
+                    self.refresh(category)
+            except Exception as e:
+                print(f"[WhaleSnapshots] Refresh failed for {category}: {e}")
+
+    def get(self, category: str) -> Snapshot:
+        """
+        Snapshot for a category (any case or alias)
+
+        Raises:
+            ValueError: Unknown category
+        """
+        canonical = _normalize_category(category)
+        snapshot = self._peek(canonical)
+        if self._is_fresh(snapshot):
+            return snapshot
+
+        with self._build_lock(canonical):
+            # Another caller may have rebuilt it while we waited
+            snapshot = self._peek(canonical)
+            if self._is_fresh(snapshot):
+                return snapshot
+            try:
+                return self.refresh(canonical)
+            except Exception:
+                if snapshot is not None:
+                    print(f"[WhaleSnapshots] Serving stale {canonical} snapshot after failed rebuild")
+                    return snapshot
+                raise
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            return {
+                category: {"cards": len(cards), "age_seconds": round(now - built_at, 1)}
+                for category, (built_at, cards) in self._snapshots.items()
+            }
+
+
+# Process-wide cache used by /whales
+whale_snapshots = WhaleSnapshotCache()
@@ -0,0 +1,98 @@
+"""
+Benchmark: pgvector similarity query, inline literal vs. server-side function
+Compares the old /similar embedding query (source embedding fetched, then
+inlined twice as a ~15KB text literal) with match_similar_markets() from
+migration 007, both over psycopg2 and through PostgREST RPC.
+
+Requires DATABASE_URL (or SUPABASE_URL + SUPABASE_PASSWORD) for the psycopg2
+runs and SUPABASE_URL + SUPABASE_ANON_KEY for the RPC run.
+
+Usage:
+  python scripts/benchmark_similarity_query.py --runs 50 --markets 10
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2.extras
+
+from database.supabase_connection import get_supabase_client, pooled_connection
+from polymarket.get_similar_markets import match_similar_markets
+
+MATCH_COUNT = 20
+
+
+def legacy_query(conn, market_id: str) -> list:
+    """The pre-007 /similar path: fetch the embedding, then inline it into the SQL"""
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+        cursor.execute("SELECT embedding FROM markets WHERE market_id = %s", (market_id,))
+        row = cursor.fetchone()
+        if not row or row["embedding"] is None:
+            return []
+        embedding_str = str(row["embedding"])
+        cursor.execute(f"""
+            SELECT market_id, question, market_slug, tag_label, clob_token_ids,
+                1 - (embedding <=> '{embedding_str}'::vector) as similarity
+            FROM markets
+            WHERE embedding IS NOT NULL AND market_id != %s
+            ORDER BY embedding <=> '{embedding_str}'::vector
+            LIMIT {MATCH_COUNT}
+        """, (market_id,))
+        return cursor.fetchall()
+
+
+def function_query(conn, market_id: str) -> list:
+    """match_similar_markets() over the same psycopg2 connection"""
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+        cursor.execute("SELECT * FROM match_similar_markets(%s, %s, %s)", (market_id, MATCH_COUNT, 0.0))
+        return cursor.fetchall()
+
+
+def time_runs(label: str, fn, market_ids: list, runs: int) -> None:
+    latencies = []
+    for i in range(runs):
+        market_id = market_ids[i % len(market_ids)]
+        start = time.perf_counter()
+        fn(market_id)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{label:<28} p50={statistics.median(latencies) * 1000:7.1f}ms  "
+          f"p95={p95 * 1000:7.1f}ms  mean={statistics.mean(latencies) * 1000:7.1f}ms")
+
+
+def main(args) -> None:
+    client = get_supabase_client()
+    sample = client.table("markets").select("market_id").not_.is_(
+        "embedding", "null"
+    ).limit(args.markets).execute()
+    market_ids = [row["market_id"] for row in sample.data or []]
+    if not market_ids:
+        print("No markets with embeddings found")
+        return
+    print(f"Benchmarking {args.runs} queries over {len(market_ids)} markets\n")
+
+    with pooled_connection() as conn:
+        if conn is None:
+            print("No direct database connection configured; skipping psycopg2 runs")
+        else:
+            # Warm both plans once so the first-run parse is not counted
+            legacy_query(conn, market_ids[0])
+            function_query(conn, market_ids[0])
+            time_runs("inline literal (legacy)", lambda mid: legacy_query(conn, mid), market_ids, args.runs)
+            time_runs("match_similar_markets()", lambda mid: function_query(conn, mid), market_ids, args.runs)
+
+    time_runs("PostgREST rpc", lambda mid: match_similar_markets(client, mid, MATCH_COUNT, use_pool=False), market_ids, args.runs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--markets", type=int, default=10, help="Distinct source markets to cycle through")
+    main(parser.parse_args())
@@ -0,0 +1,45 @@
+"""
+Compute Market Neighbors
+Builds the market_neighbors table (migrations 008, 011): top-K cosine neighbours for
+every market from markets.embedding, using blocked NumPy matrix multiplication.
+
+By default only markets whose embedding changed since the last run (and the
+lists they affect) are recomputed; pass --full to rebuild everything.
+
+Usage:
+  python scripts/compute_market_neighbors.py
+  python scripts/compute_market_neighbors.py --full --k 20 --block-size 512
+"""
+
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.neighbors import NEIGHBORS_BLOCK_SIZE, NEIGHBORS_TOP_K, NeighborJob
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="Recompute every market")
+    parser.add_argument("--k", type=int, default=NEIGHBORS_TOP_K, help="Neighbours per market")
+    parser.add_argument("--block-size", type=int, default=NEIGHBORS_BLOCK_SIZE, help="Query rows per matmul block")
+    args = parser.parse_args()
+
+    job = NeighborJob(k=args.k, block_size=args.block_size)
+    summary = job.run(full=args.full)
+
+    print("=" * 60)
+    print(f"Mode:        {summary['mode']}")
+    print(f"Markets:     {summary['markets']}")
+    print(f"Recomputed:  {summary['recomputed']}")
+    print(f"Removed:     {summary['removed']}")
+    print(f"Rows:        {summary['rows_written']}")
+    print(f"Time:        {summary['seconds']}s")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
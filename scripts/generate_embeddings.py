@@ -0,0 +1,79 @@
+"""
+Generate Market Embeddings
+Backfills/refreshes markets.embedding for markets with no embedding or whose
+question changed (requires migrations 006, 009 and 010).
+
+Embeds in batches of up to 100 questions per Gemini request, several requests
+in flight under a requests-per-second limit, and writes the vectors back to
+the existing rows with one UPDATE per chunk (the question is never written).
+Progress is checkpointed; rerunning after an interruption resumes.
+
+Usage:
+  python scripts/generate_embeddings.py
+  python scripts/generate_embeddings.py --limit 500 --workers 4 --rps 5
+  python scripts/generate_embeddings.py --offline   # deterministic local embedder, no API key
+"""
+
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.embedding_pipeline import (
+    DEFAULT_CHECKPOINT,
+    EMBED_BATCH_SIZE,
+    EMBED_REQUESTS_PER_SECOND,
+    EMBED_WORKERS,
+    EmbeddingPipeline,
+    HashingEmbedder,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--offline", action="store_true", help="Use the deterministic hashing embedder")
+    parser.add_argument("--limit", type=int, default=None, help="Embed at most this many markets")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=EMBED_WORKERS, help="Concurrent embedding requests")
+    parser.add_argument("--rps", type=float, default=EMBED_REQUESTS_PER_SECOND, help="Embedding requests per second")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Checkpoint file path")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    if args.offline:
+        embedder = HashingEmbedder()
+        embed_fn, model = embedder, embedder.model
+    else:
+        from api.clients.gemini_client import GeminiClient
+        gemini = GeminiClient()
+        if not gemini.embedding_model:
+            print("Gemini embeddings unavailable (set GEMINI_API_KEY) - use --offline for local embeddings")
+            sys.exit(1)
+        embed_fn, model = gemini.get_embeddings, gemini.embedding_model
+
+    pipeline = EmbeddingPipeline(
+        embed_fn,
+        model,
+        batch_size=min(args.batch_size, 100),
+        workers=args.workers,
+        requests_per_second=args.rps,
+        checkpoint_path=args.checkpoint,
+    )
+    summary = pipeline.run(limit=args.limit, resume=not args.restart)
+
+    print("=" * 60)
+    print(f"Model:     {summary['model']}")
+    print(f"Pending:   {summary['pending']}")
+    print(f"Embedded:  {summary['embedded']}")
+    print(f"Failed:    {summary['failed']}")
+    print(f"Written:   {summary['written']}")
+    print(f"Time:      {summary['seconds']}s")
+    print("=" * 60)
+    if summary["failed"]:
+        print(f"Some markets failed; rerun to retry them (checkpoint: {args.checkpoint})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Load Test: /similar vs. other traffic
+Fires concurrent /similar requests while probing a cheap endpoint, and reports
+probe latency. If /similar blocked the event loop, probe latency would track
+/similar latency; with the blocking work offloaded it stays flat.
+
+Usage:
+  uvicorn api.main:app --port 8000
+  python scripts/load_test_similar.py --base-url http://localhost:8000 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+DEFAULT_TITLES = [
+    "Will Bitcoin reach $100k",
+    "Will Trump win the 2024 presidential election",
+    "Fed rate cut",
+    "Will Ethereum hit $5000",
+]
+
+
+def summarize(label: str, latencies: list) -> None:
+    if not latencies:
+        print(f"{label}: no successful requests")
+        return
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"{label}: n={len(ordered)} "
+        f"p50={statistics.median(ordered) * 1000:.1f}ms "
+        f"p95={p95 * 1000:.1f}ms "
+        f"max={ordered[-1] * 1000:.1f}ms"
+    )
+
+
+async def timed_get(client: httpx.AsyncClient, path: str, params: dict, out: list) -> None:
+    start = time.perf_counter()
+    try:
+        response = await client.get(path, params=params)
+        if response.status_code < 500:
+            out.append(time.perf_counter() - start)
+    except httpx.HTTPError as e:
+        print(f"  {path} failed: {e}")
+
+
+async def similar_worker(client, titles, requests_per_worker, out):
+    for i in range(requests_per_worker):
+        await timed_get(client, "/similar", {"event_title": titles[i % len(titles)]}, out)
+
+
+async def probe_worker(client, stop: asyncio.Event, interval: float, out):
+    while not stop.is_set():
+        await timed_get(client, "/cache/stats", {}, out)
+        await asyncio.sleep(interval)
+
+
+async def main(args) -> None:
+    similar_latencies: list = []
+    probe_latencies: list = []
+    stop = asyncio.Event()
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+        # Baseline probe latency with no /similar load
+        baseline: list = []
+        for _ in range(10):
+            await timed_get(client, "/cache/stats", {}, baseline)
+        summarize("probe (idle)", baseline)
+
+        prober = asyncio.create_task(probe_worker(client, stop, args.probe_interval, probe_latencies))
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            similar_worker(client, DEFAULT_TITLES, args.requests, similar_latencies)
+            for _ in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await prober
+
+    print(f"\n{len(similar_latencies)} /similar requests in {elapsed:.1f}s "
+          f"({len(similar_latencies) / elapsed:.1f} req/s)")
+    summarize("/similar", similar_latencies)
+    summarize("probe (under load)", probe_latencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent /similar clients")
+    parser.add_argument("--requests", type=int, default=5, help="Requests per /similar client")
+    parser.add_argument("--probe-interval", type=float, default=0.05, help="Seconds between probes")
+    asyncio.run(main(parser.parse_args()))
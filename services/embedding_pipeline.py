@@ -0,0 +1,252 @@
+"""
+Embedding Pipeline
+Batch backfill/refresh of markets.embedding: finds markets with no embedding
+or whose question changed (embedding_source_hash, migration 009), embeds them
+in concurrent rate-limited batches and writes the vectors back to the
+existing rows in bulk (embedding and embedding_source_hash only, migration 010).
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from database.supabase_connection import get_supabase_client
+from polymarket.rate_limit import TokenBucket
+
+EMBEDDING_DIM = 768
+# Gemini batchEmbedContents accepts at most 100 texts per request
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "4"))
+EMBED_REQUESTS_PER_SECOND = float(os.getenv("EMBED_REQUESTS_PER_SECOND", "5"))
+WRITE_CHUNK_SIZE = 200
+PAGE_SIZE = 1000
+DEFAULT_CHECKPOINT = ".embedding_checkpoint.json"
+
+EmbedFn = Callable[[List[str]], List[Optional[List[float]]]]
+
+
+def source_hash(model: str, text: str) -> str:
+    """sha256 hex of '<model>\\n<text>' (matches the SQL backfill in migration 009)"""
+    return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+
+def format_vector(values) -> str:
+    """pgvector text literal"""
+    return "[" + ",".join(f"{float(v):.7g}" for v in values) + "]"
+
+
+class HashingEmbedder:
+    """
+    Deterministic local stand-in for the Gemini embedder (offline runs/tests).
+
+    Feature-hashes word unigrams and bigrams into `dim` signed buckets and
+    L2-normalizes, so texts sharing words get positive cosine similarity.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self.model = f"local/hashing-{dim}"
+
+    def _features(self, text: str) -> List[str]:
+        words = re.findall(r"\w+", text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed_one(self, text: str) -> List[float]:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            digest = hashlib.sha256(feature.encode("utf-8")).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vec[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = float(np.linalg.norm(vec))
+        if norm > 0:
+            vec /= norm
+        return vec.tolist()
+
+    def __call__(self, texts: List[str]) -> List[Optional[List[float]]]:
+        return [self.embed_one(text) for text in texts]
+
+
+class EmbeddingPipeline:
+    """
+    Resumable batch embedder for the markets table.
+
+    The work list (market_id, question, hash) is computed once and saved to a
+    JSON checkpoint together with the ids already written, so an interrupted
+    run resumes where it stopped instead of rescanning and re-embedding. The
+    checkpoint is removed when a run completes.
+    """
+
+    def __init__(
+        self,
+        embed_fn: EmbedFn,
+        model: str,
+        client=None,
+        batch_size: int = EMBED_BATCH_SIZE,
+        workers: int = EMBED_WORKERS,
+        requests_per_second: float = EMBED_REQUESTS_PER_SECOND,
+        checkpoint_path: Optional[str] = DEFAULT_CHECKPOINT,
+    ):
+        self.embed_fn = embed_fn
+        self.model = model
+        self.client = client or get_supabase_client()
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+        self.limiter = TokenBucket(rate=requests_per_second, burst=max(1, workers))
+        self.checkpoint_path = checkpoint_path
+        self._checkpoint_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Work list
+    # ------------------------------------------------------------------
+
+    def find_stale(self, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """Markets with no embedding for their current question under this model"""
+        pending: List[Dict[str, str]] = []
+        offset = 0
+        while True:
+            page = self.client.table("markets").select(
+                "market_id, question, embedding_source_hash"
+            ).order("market_id").range(offset, offset + PAGE_SIZE - 1).execute().data or []
+
+            for row in page:
+                # Hash the stored text as-is so it matches migration 009's SQL backfill
+                question = row.get("question") or ""
+                if not question.strip():
+                    continue
+                expected = source_hash(self.model, question)
+                if row.get("embedding_source_hash") != expected:
+                    pending.append({"market_id": row["market_id"], "question": question, "source_hash": expected})
+                    if limit and len(pending) >= limit:
+                        return pending
+
+            if len(page) < PAGE_SIZE:
+                return pending
+            offset += PAGE_SIZE
+
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return None
+        try:
+            with open(self.checkpoint_path) as f:
+                checkpoint = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"[Embeddings] Ignoring unreadable checkpoint: {e}")
+            return None
+        if checkpoint.get("model") != self.model:
+            print("[Embeddings] Checkpoint is for a different model; starting over")
+            return None
+        return checkpoint
+
+    def _save_checkpoint(self, checkpoint: Dict[str, Any]) -> None:
+        if not self.checkpoint_path:
+            return
+        with self._checkpoint_lock:
+            tmp_path = f"{self.checkpoint_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(checkpoint, f)
+            os.replace(tmp_path, self.checkpoint_path)
+
+    def _clear_checkpoint(self) -> None:
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    # ------------------------------------------------------------------
+    # Embedding and writes
+    # ------------------------------------------------------------------
+
+    def _embed_batch(self, batch: List[Dict[str, str]]) -> List[Optional[List[float]]]:
+        self.limiter.acquire()
+        return self.embed_fn([item["question"] for item in batch])
+
+    def _write(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        One write_market_embeddings() call per chunk (migration 010): a single
+        UPDATE of embedding and embedding_source_hash, guarded on the question
+        so markets deleted or reworded since the work list was built are
+        skipped. Returns the rows actually updated.
+        """
+        result = self.client.rpc("write_market_embeddings", {"rows": rows}).execute()
+        return int(result.data or 0)
+
+    def run(self, limit: Optional[int] = None, resume: bool = True) -> Dict[str, Any]:
+        """
+        Embed every stale market
+
+        Args:
+            limit: Cap on markets embedded in this run
+            resume: Continue from an existing checkpoint when present
+
+        Returns:
+            Summary with pending, embedded, failed and written counts
+        """
+        started = time.time()
+        checkpoint = self._load_checkpoint() if resume else None
+        if checkpoint is None:
+            checkpoint = {"model": self.model, "pending": self.find_stale(limit), "completed": []}
+            self._save_checkpoint(checkpoint)
+        else:
+            print(f"[Embeddings] Resuming: {len(checkpoint['completed'])} of {len(checkpoint['pending'])} already written")
+
+        completed = set(checkpoint["completed"])
+        todo = [item for item in checkpoint["pending"] if item["market_id"] not in completed]
+        batches = [todo[i:i + self.batch_size] for i in range(0, len(todo), self.batch_size)]
+        print(f"[Embeddings] {len(todo)} markets to embed in {len(batches)} batches ({self.model})")
+
+        embedded = failed = written = 0
+        buffer: List[Dict[str, Any]] = []
+
+        def flush():
+            nonlocal written
+            if not buffer:
+                return
+            written += self._write(buffer)
+            checkpoint["completed"].extend(row["market_id"] for row in buffer)
+            self._save_checkpoint(checkpoint)
+            buffer.clear()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self._embed_batch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    vectors = future.result()
+                except Exception as e:
+                    print(f"[Embeddings] Batch of {len(batch)} failed: {e}")
+                    failed += len(batch)
+                    continue
+
+                for item, vector in zip(batch, vectors):
+                    if not vector or len(vector) != EMBEDDING_DIM:
+                        failed += 1
+                        continue
+                    embedded += 1
+                    buffer.append({
+                        "market_id": item["market_id"],
+                        "question": item["question"],
+                        "embedding": format_vector(vector),
+                        "embedding_source_hash": item["source_hash"],
+                    })
+                if len(buffer) >= WRITE_CHUNK_SIZE:
+                    flush()
+            flush()
+
+        if failed == 0:
+            self._clear_checkpoint()
+
+        summary = {
+            "model": self.model,
+            "pending": len(todo),
+            "embedded": embedded,
+            "failed": failed,
+            "written": written,
+            "seconds": round(time.time() - started, 2),
+        }
+        print(f"[Embeddings] {summary}")
+        return summary
@@ -0,0 +1,154 @@
+"""
+Trending Leaderboard
+In-memory ranking of active markets by trending score, kept per category and
+updated incrementally as market metrics are refreshed
+"""
+
+import bisect
+import heapq
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+ALL = "all"
+
+# Query category -> substring matched (case-insensitively) against tag_label
+CATEGORY_MAP = {
+    'politics': 'politics',
+    'sports': 'sports',
+    'crypto': 'crypto',
+    'pop-culture': 'pop culture',
+    'pop culture': 'pop culture',
+    'business': 'business',
+    'economy': 'economy',
+    'science': 'science',
+    'tech': 'technology',
+    'technology': 'technology',
+}
+
+
+def board_key(category: Optional[str]) -> str:
+    """Normalize a query category to its leaderboard key"""
+    if not category or category.lower().strip() == ALL:
+        return ALL
+    normalized = category.lower().strip()
+    return CATEGORY_MAP.get(normalized, normalized)
+
+
+class TrendingLeaderboard:
+    """
+    Sorted per-category boards of (-score, market_id).
+
+    Every market sits on the "all" board and on each category board whose key
+    is a substring of its tag_label (mirroring the old ilike filter). Reads
+    walk a board from the top, so limit/min_score queries cost O(limit).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Dict] = {}
+        self._scores: Dict[str, float] = {}
+        self._boards: Dict[str, List[Tuple[float, str]]] = {}
+        self.built_at: Optional[float] = None
+
+    @property
+    def is_built(self) -> bool:
+        return self.built_at is not None
+
+    def age(self) -> float:
+        """Seconds since the last full rebuild (inf if never built)"""
+        return time.time() - self.built_at if self.built_at else float("inf")
+
+    def _keys_for(self, tag_label: Optional[str]) -> List[str]:
+        label = (tag_label or "").lower()
+        return [ALL] + [key for key in self._boards if key != ALL and key in label]
+
+    def rebuild(self, entries: List[Dict], scores: List[float]) -> None:
+        """
+        Replace the leaderboard contents
+
+        Args:
+            entries: Result dicts (market_id, canonical_category, metrics...)
+            scores: Unrounded trending score for each entry
+        """
+        boards: Dict[str, List[Tuple[float, str]]] = {key: [] for key in set(CATEGORY_MAP.values())}
+        boards[ALL] = []
+
+        entry_map = {}
+        score_map = {}
+        for entry, score in zip(entries, scores):
+            market_id = entry["market_id"]
+            entry_map[market_id] = entry
+            score_map[market_id] = score
+            label = (entry.get("canonical_category") or "").lower()
+            for key in boards:
+                if key == ALL or key in label:
+                    boards[key].append((-score, market_id))
+
+        for board in boards.values():
+            board.sort()
+
+        with self._lock:
+            self._entries = entry_map
+            self._scores = score_map
+            self._boards = boards
+            self.built_at = time.time()
+
+    def update(self, market_id: str, metrics: Dict, score: float) -> bool:
+        """
+        Re-rank one market after its metrics changed
+
+        Returns:
+            False if the market is not on the leaderboard (not an active market)
+        """
+        with self._lock:
+            entry = self._entries.get(market_id)
+            if entry is None:
+                return False
+
+            old_key = (-self._scores[market_id], market_id)
+            new_key = (-score, market_id)
+            for key in self._keys_for(entry.get("canonical_category")):
+                board = self._boards[key]
+                i = bisect.bisect_left(board, old_key)
+                if i < len(board) and board[i] == old_key:
+                    del board[i]
+                bisect.insort(board, new_key)
+
+            self._scores[market_id] = score
+            entry.update({
+                "trending_score": round(score, 4),
+                "open_interest": float(metrics.get("open_interest", 0) or 0),
+                "volume_24h": float(metrics.get("volume_24h", 0) or 0),
+                "liquidity": float(metrics.get("liquidity", 0) or 0),
+                "last_price": metrics.get("last_price"),
+            })
+            return True
+
+    def top(self, category: Optional[str] = None, limit: int = 20, min_score: float = 0.0) -> List[Dict]:
+        """Highest-scoring markets for a category, best first"""
+        key = board_key(category)
+        with self._lock:
+            board = self._boards.get(key)
+            if board is None:
+                # Category outside CATEGORY_MAP (free-form query string): rank it
+                # for this call only so arbitrary keys never grow the maintained boards
+                board = heapq.nsmallest(limit, (
+                    (-self._scores[mid], mid) for mid, entry in self._entries.items()
+                    if key in (entry.get("canonical_category") or "").lower()
+                ))
+
+            results = []
+            for neg_score, market_id in board:
+                if len(results) >= limit or -neg_score < min_score:
+                    break
+                results.append(dict(self._entries[market_id]))
+            return results
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "markets": len(self._entries),
+                "boards": {key: len(board) for key, board in self._boards.items()},
+                "built_at": self.built_at,
+            }
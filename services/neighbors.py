@@ -0,0 +1,294 @@
+"""
+Market Neighbors Service
+Batch top-K cosine neighbours for every market from markets.embedding,
+stored in the market_neighbors table (migrations 008, 011)
+"""
+
+import hashlib
+import os
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from database.supabase_connection import get_supabase_client
+from polymarket.get_similar_markets import in_list
+from services.vector_index import parse_embedding
+
+NEIGHBORS_TOP_K = int(os.getenv("NEIGHBORS_TOP_K", "20"))
+# Query rows per matrix multiplication block (block x N float32 scores in memory)
+NEIGHBORS_BLOCK_SIZE = int(os.getenv("NEIGHBORS_BLOCK_SIZE", "512"))
+PAGE_SIZE = 1000
+WRITE_CHUNK_SIZE = 500
+# Ids per `in.(...)` filter, to keep request URLs short
+FILTER_CHUNK_SIZE = 100
+
+EMBEDDING_COLUMNS = "market_id, embedding, embedding_source_hash"
+
+
+def top_k_neighbors(
+    queries: np.ndarray,
+    corpus: np.ndarray,
+    k: int,
+    exclude: Optional[np.ndarray] = None,
+    block_size: int = NEIGHBORS_BLOCK_SIZE,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact top-K cosine neighbours by blocked matrix multiplication
+
+    Args:
+        queries: (Q, d) unit-length query vectors
+        corpus: (N, d) unit-length corpus vectors
+        k: Neighbours per query
+        exclude: Optional (Q,) corpus row to skip for each query (the query itself)
+        block_size: Query rows scored per block
+
+    Returns:
+        (indices, similarities), both (Q, k'), best first, where k' is k capped
+        at the number of eligible corpus rows
+    """
+    n = len(corpus)
+    k = min(k, n - 1 if exclude is not None else n)
+    if k <= 0 or len(queries) == 0:
+        return np.zeros((len(queries), 0), dtype=np.int64), np.zeros((len(queries), 0), dtype=np.float32)
+
+    indices = np.empty((len(queries), k), dtype=np.int64)
+    sims = np.empty((len(queries), k), dtype=np.float32)
+
+    for start in range(0, len(queries), block_size):
+        stop = min(start + block_size, len(queries))
+        scores = queries[start:stop] @ corpus.T
+        if exclude is not None:
+            scores[np.arange(stop - start), exclude[start:stop]] = -np.inf
+
+        if k < n:
+            top = np.argpartition(scores, n - k, axis=1)[:, n - k:]
+        else:
+            top = np.broadcast_to(np.arange(n), scores.shape).copy()
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+
+        indices[start:stop] = np.take_along_axis(top, order, axis=1)
+        sims[start:stop] = np.take_along_axis(top_scores, order, axis=1)
+
+    return indices, sims
+
+
+def embedding_key(row: Dict[str, Any]) -> str:
+    """
+    Identifies the embedding a list was computed from: embedding_source_hash
+    (migration 009), or a digest of the stored vector for rows without one
+    """
+    if row.get("embedding_source_hash"):
+        return row["embedding_source_hash"]
+    return "vector:" + hashlib.sha256(str(row.get("embedding")).encode("utf-8")).hexdigest()
+
+
+def _chunks(items: List[Any], size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class NeighborJob:
+    """
+    Computes and stores top-K neighbour lists.
+
+    A full run recomputes every market. An incremental run recomputes only
+    markets whose embedding changed since their list was stored (the list's
+    source_embedding_hash, migration 011, no longer matches embedding_key)
+    plus unchanged markets whose lists they affect: lists that contained a
+    changed market, and lists whose K-th similarity a changed market now
+    beats. Other writes to a market row do not trigger recomputation.
+    """
+
+    def __init__(self, client=None, k: int = NEIGHBORS_TOP_K, block_size: int = NEIGHBORS_BLOCK_SIZE):
+        self.client = client or get_supabase_client()
+        self.k = k
+        self.block_size = block_size
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _page(self, build_query) -> List[Dict[str, Any]]:
+        rows: List[Dict[str, Any]] = []
+        offset = 0
+        while True:
+            page = build_query().range(offset, offset + PAGE_SIZE - 1).execute().data or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+            offset += PAGE_SIZE
+
+    def load_embeddings(self) -> Tuple[List[str], np.ndarray, List[str]]:
+        """All markets with a usable embedding: (ids, unit vectors, embedding keys)"""
+        rows = self._page(lambda: self.client.table("markets").select(
+            EMBEDDING_COLUMNS
+        ).not_.is_("embedding", "null").order("market_id"))
+
+        ids, vectors, keys = [], [], []
+        dim = None
+        for row in rows:
+            vec = parse_embedding(row.get("embedding"))
+            if vec is None:
+                continue
+            dim = dim or vec.size
+            if vec.size != dim:
+                continue
+            ids.append(row["market_id"])
+            vectors.append(vec)
+            keys.append(embedding_key(row))
+
+        matrix = np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+        return ids, matrix, keys
+
+    def _stored_sources(self) -> Dict[str, Optional[str]]:
+        """market_id -> source_embedding_hash of every stored list"""
+        rows = self._page(lambda: self.client.table("market_neighbors").select(
+            "market_id, source_embedding_hash"
+        ).eq("rank", 1).order("market_id"))
+        return {row["market_id"]: row.get("source_embedding_hash") for row in rows}
+
+    def _kth_similarity(self) -> Dict[str, float]:
+        rows = self._page(lambda: self.client.table("market_neighbors").select(
+            "market_id, similarity"
+        ).eq("rank", self.k).order("market_id"))
+        return {row["market_id"]: float(row["similarity"]) for row in rows}
+
+    def _lists_containing(self, market_ids: List[str]) -> Set[str]:
+        sources: Set[str] = set()
+        for chunk in _chunks(market_ids, FILTER_CHUNK_SIZE):
+            rows = self._page(lambda: self.client.table("market_neighbors").select(
+                "market_id"
+            ).filter("neighbor_market_id", "in", in_list(chunk)).order("market_id"))
+            sources.update(row["market_id"] for row in rows)
+        return sources
+
+    # ------------------------------------------------------------------
+    # Planning
+    # ------------------------------------------------------------------
+
+    def _affected_rows(
+        self,
+        ids: List[str],
+        matrix: np.ndarray,
+        changed_rows: np.ndarray,
+        removed_ids: List[str],
+    ) -> np.ndarray:
+        """Unchanged rows whose stored lists are invalidated by the changes"""
+        row_of = {market_id: i for i, market_id in enumerate(ids)}
+        affected = np.zeros(len(ids), dtype=bool)
+
+        # Lists that contain a changed or removed market
+        changed_ids = [ids[i] for i in changed_rows] + removed_ids
+        for market_id in self._lists_containing(changed_ids):
+            if market_id in row_of:
+                affected[row_of[market_id]] = True
+
+        # Lists whose K-th neighbour a changed market now beats (or short lists)
+        if len(changed_rows):
+            kth = self._kth_similarity()
+            threshold = np.array([kth.get(market_id, -np.inf) for market_id in ids], dtype=np.float32)
+            changed_vectors = matrix[changed_rows]
+            for start in range(0, len(ids), self.block_size):
+                stop = min(start + self.block_size, len(ids))
+                best = (matrix[start:stop] @ changed_vectors.T).max(axis=1)
+                affected[start:stop] |= best > threshold[start:stop]
+
+        affected[changed_rows] = False
+        return np.flatnonzero(affected)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def _write(
+        self,
+        ids: List[str],
+        keys: List[str],
+        rows: np.ndarray,
+        indices: np.ndarray,
+        sims: np.ndarray,
+    ) -> int:
+        """Upsert lists by (market_id, rank), then trim ranks beyond the new length"""
+        records = []
+        for row, neighbor_rows, neighbor_sims in zip(rows, indices, sims):
+            for rank, (j, sim) in enumerate(zip(neighbor_rows, neighbor_sims), start=1):
+                records.append({
+                    "market_id": ids[row],
+                    "rank": rank,
+                    "neighbor_market_id": ids[j],
+                    "similarity": round(float(sim), 6),
+                    "source_embedding_hash": keys[row],
+                })
+
+        for chunk in _chunks(records, WRITE_CHUNK_SIZE):
+            self.client.table("market_neighbors").upsert(chunk, on_conflict="market_id,rank").execute()
+
+        if indices.shape[1] < self.k:
+            source_ids = [ids[row] for row in rows]
+            for chunk in _chunks(source_ids, FILTER_CHUNK_SIZE):
+                self.client.table("market_neighbors").delete().filter(
+                    "market_id", "in", in_list(chunk)
+                ).gt("rank", indices.shape[1]).execute()
+
+        return len(records)
+
+    def _delete_sources(self, market_ids: List[str]) -> None:
+        for chunk in _chunks(market_ids, FILTER_CHUNK_SIZE):
+            self.client.table("market_neighbors").delete().filter("market_id", "in", in_list(chunk)).execute()
+
+    # ------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------
+
+    def run(self, full: bool = False) -> Dict[str, Any]:
+        """
+        Compute and store neighbour lists
+
+        Args:
+            full: Recompute every market instead of only changed/affected ones
+
+        Returns:
+            Summary with market count, recomputed lists and rows written
+        """
+        started = time.time()
+        ids, matrix, keys = self.load_embeddings()
+        print(f"[Neighbors] Loaded {len(ids)} embeddings")
+
+        stored = {} if full else self._stored_sources()
+        full = full or not stored
+
+        removed: List[str] = []
+        if full:
+            rows = np.arange(len(ids))
+        else:
+            current = set(ids)
+            changed_rows = np.array([
+                i for i, market_id in enumerate(ids)
+                if stored.get(market_id) != keys[i]
+            ], dtype=np.int64)
+            removed = sorted(set(stored) - current)
+            affected_rows = self._affected_rows(ids, matrix, changed_rows, removed)
+            rows = np.union1d(changed_rows, affected_rows).astype(np.int64)
+            print(f"[Neighbors] {len(changed_rows)} changed, {len(removed)} removed, "
+                  f"{len(affected_rows)} affected lists")
+
+        if removed:
+            self._delete_sources(removed)
+
+        written = 0
+        if len(rows):
+            indices, sims = top_k_neighbors(matrix[rows], matrix, self.k, exclude=rows, block_size=self.block_size)
+            written = self._write(ids, keys, rows, indices, sims)
+
+        summary = {
+            "mode": "full" if full else "incremental",
+            "markets": len(ids),
+            "recomputed": int(len(rows)),
+            "removed": len(removed),
+            "rows_written": written,
+            "seconds": round(time.time() - started, 2),
+        }
+        print(f"[Neighbors] {summary}")
+        return summary
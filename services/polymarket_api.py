@@ -3,19 +3,31 @@ Polymarket API Service
 Fetches live market data from Polymarket APIs
 """
 
-from typing import List, Dict, Optional
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, List, Dict, Optional, Tuple
 import requests
 import json
-from polymarket.get_markets_data import GAMMA, CLOB, _get, _to_list, mid
+from polymarket.get_markets_data import GAMMA, CLOB, _get, _to_list, mids
+from polymarket.rate_limit import HostLimiter, refresh_limiter
+
+# Worker threads for metric collection (upstream calls are still rate limited per host via self.limiter)
+METRICS_WORKERS = int(os.getenv("METRICS_REFRESH_WORKERS", "16"))
+# Tokens per bulk /midpoints request when prefetching
+MIDPOINT_BATCH_SIZE = 100
 
 
 class PolymarketAPIService:
     """Service for fetching data from Polymarket APIs"""
     
-    def __init__(self):
+    def __init__(self, trending_service=None, limiter: Optional[HostLimiter] = refresh_limiter):
         self.gamma_base = GAMMA
         self.clob_base = CLOB
         self.timeout = 15
+        # Reused across refreshes so each one does not open a new Supabase client
+        self._trending_service = trending_service
+        # Per-host budget for this service's upstream calls (None disables it); ui() and the API clients pass none
+        self.limiter = limiter
     
     def get_active_markets(
         self,
@@ -49,7 +61,7 @@ class PolymarketAPIService:
             if tag_id:
                 params["tag_id"] = tag_id
             
-            response = _get(f"{self.gamma_base}/markets", params)
+            response = _get(f"{self.gamma_base}/markets", params, self.limiter)
             
             if not isinstance(response, list):
                 return []
@@ -95,10 +107,11 @@ class PolymarketAPIService:
             # Get token IDs
             token_ids = _to_list(market.get("clobTokenIds"))
             
-            # Get prices for tokens
+            # Get prices for tokens (one bulk lookup through the shared midpoint cache)
+            token_mids = mids(token_ids, self.limiter)
             prices = []
             for token_id in token_ids:
-                price = mid(token_id)
+                price = token_mids.get(token_id.strip())
                 if price:
                     try:
                         prices.append(float(price))
@@ -129,32 +142,68 @@ class PolymarketAPIService:
                 "liquidity": 0
             }
     
-    def fetch_and_update_metrics(self, limit: int = 100) -> int:
+    def _prefetch_midpoints(self, token_ids: List[str]) -> None:
+        """Warm the midpoint cache for a batch of tokens (errors fall through to per-market fetches)"""
+        try:
+            mids(token_ids, self.limiter)
+        except Exception as e:
+            print(f"Error prefetching midpoints: {e}")
+    
+    def collect_market_metrics(
+        self,
+        markets: List[Dict],
+        max_workers: int = METRICS_WORKERS
+    ) -> Iterator[Tuple[str, Dict]]:
+        """
+        Collect metrics for many markets concurrently
+        
+        Midpoints for every token are first prefetched in bulk batches across a
+        bounded worker pool; per-market metric extraction then runs on the same
+        pool and mostly reads the warmed midpoint cache.
+        
+        Args:
+            markets: Market dictionaries from Gamma API
+            max_workers: Size of the worker pool
+        
+        Yields:
+            (market_id, metrics) tuples in completion order
+        """
+        markets = [m for m in markets if m.get("id") is not None]
+        if not markets:
+            return
+        
+        token_ids = list(dict.fromkeys(
+            t.strip() for m in markets for t in _to_list(m.get("clobTokenIds")) if t.strip()
+        ))
+        batches = [token_ids[i:i + MIDPOINT_BATCH_SIZE] for i in range(0, len(token_ids), MIDPOINT_BATCH_SIZE)]
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            list(executor.map(self._prefetch_midpoints, batches))
+            
+            futures = {executor.submit(self.get_market_metrics, m): str(m.get("id")) for m in markets}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+    
+    def fetch_and_update_metrics(self, limit: int = 100, chunk_size: Optional[int] = None) -> int:
         """
         Fetch markets from Polymarket and update metrics in database
         
         Args:
             limit: Number of markets to process
+            chunk_size: Rows per market_metrics upsert (defaults to METRICS_UPSERT_CHUNK_SIZE)
         
         Returns:
             Number of markets updated
         """
-        from services.trending import TrendingService
+        from services.trending import TrendingService, METRICS_CHUNK_SIZE
         
-        trending_service = TrendingService()
+        if self._trending_service is None:
+            self._trending_service = TrendingService()
         markets = self.get_active_markets(limit=limit)
         
-        updated = 0
-        for market in markets:
-            market_id = str(market.get("id"))
-            if not market_id:
-                continue
-            
-            # Get metrics
-            metrics = self.get_market_metrics(market)
-            
-            # Update in database
-            if trending_service.update_market_metrics(market_id, metrics):
-                updated += 1
+        with self._trending_service.metrics_writer(chunk_size or METRICS_CHUNK_SIZE) as writer:
+            # Metrics are collected concurrently and queued for the bulk upsert as they complete
+            for market_id, metrics in self.collect_market_metrics(markets):
+                writer.add(market_id, metrics)
         
-        return updated
+        return writer.written
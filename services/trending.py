@@ -3,15 +3,182 @@ Trending Markets Service
 Calculates trending scores and ranks markets by popularity
 """
 
-from typing import List, Dict, Optional
+import math
+import os
+import threading
+from typing import Callable, List, Dict, Optional
+import numpy as np
 from datetime import datetime, timedelta
-from database.supabase_connection import SupabaseConnection
+from database.supabase_connection import get_supabase_client
+from services.leaderboard import TrendingLeaderboard
+
+# Rows per market_metrics upsert request during bulk refreshes
+METRICS_CHUNK_SIZE = int(os.getenv("METRICS_UPSERT_CHUNK_SIZE", "200"))
+# Full leaderboard rebuild interval (picks up new/closed markets); metric refreshes apply in between.
+# Rebuilds run in the API's background task, never on the request path
+LEADERBOARD_MAX_AGE = float(os.getenv("LEADERBOARD_MAX_AGE", "900"))
+PAGE_SIZE = 1000
+
+# Fixed normalization caps (open interest, 24h volume, liquidity)
+DEFAULT_MAX_OI = 1000000  # 1M open interest
+DEFAULT_MAX_VOL = 100000  # 100K volume
+DEFAULT_MAX_LIQ = 50000   # 50K liquidity
+
+# "fixed" uses the caps above; "data" derives them from the current distribution
+TRENDING_NORMALIZATION = os.getenv("TRENDING_NORMALIZATION", "fixed").lower()
+NORMALIZATION_PERCENTILE = float(os.getenv("TRENDING_NORMALIZATION_PERCENTILE", "99"))
+
+
+def calculate_trending_scores(
+    open_interest,
+    volume_24h,
+    liquidity,
+    w1: float = 0.5,
+    w2: float = 0.3,
+    w3: float = 0.2,
+    max_oi: float = DEFAULT_MAX_OI,
+    max_vol: float = DEFAULT_MAX_VOL,
+    max_liq: float = DEFAULT_MAX_LIQ
+) -> np.ndarray:
+    """
+    Vectorized TrendingService.calculate_trending_score
+    
+    Args:
+        open_interest, volume_24h, liquidity: Array-likes of equal length
+        w1, w2, w3: Weights for each metric
+        max_oi, max_vol, max_liq: Values that map to a normalized 1.0
+    
+    Returns:
+        float64 array of scores in [0, 1]; matches the scalar version to
+        within libm vs NumPy log1p rounding (~1e-16 relative)
+    """
+    def normalize(values, cap):
+        values = np.asarray(values, dtype=np.float64)
+        logged = np.log1p(values, out=np.zeros_like(values), where=values > 0)
+        return np.minimum(logged / math.log1p(cap), 1.0)
+    
+    score = (w1 * normalize(open_interest, max_oi)
+             + w2 * normalize(volume_24h, max_vol)
+             + w3 * normalize(liquidity, max_liq))
+    return np.clip(score, 0.0, 1.0)
+
+
+def normalization_from_distribution(
+    open_interest,
+    volume_24h,
+    liquidity,
+    percentile: float = NORMALIZATION_PERCENTILE
+) -> Dict[str, float]:
+    """
+    Data-driven normalization caps: the given percentile of each metric's
+    positive values (falling back to the fixed cap when a metric has no data)
+    
+    Returns:
+        Dict with max_oi, max_vol, max_liq
+    """
+    def cap(values, default):
+        values = np.asarray(values, dtype=np.float64)
+        positive = values[values > 0]
+        return float(np.percentile(positive, percentile)) if positive.size else float(default)
+    
+    return {
+        "max_oi": cap(open_interest, DEFAULT_MAX_OI),
+        "max_vol": cap(volume_24h, DEFAULT_MAX_VOL),
+        "max_liq": cap(liquidity, DEFAULT_MAX_LIQ),
+    }
+
+
+def _metrics_row(market_id: str, metrics: Dict) -> Dict:
+    """Build a market_metrics row from a metrics dict"""
+    return {
+        "market_id": market_id,
+        "last_price": metrics.get("last_price"),
+        "open_interest": metrics.get("open_interest", 0),
+        "volume_24h": metrics.get("volume_24h", 0),
+        "liquidity": metrics.get("liquidity", 0),
+        "updated_at": datetime.utcnow().isoformat()
+    }
+
+
+class MarketMetricsWriter:
+    """
+    Accumulates market_metrics rows and upserts them in chunks
+
+    Use as a context manager (or call flush()) so the final partial chunk is
+    written. When a chunk upsert fails, its rows are retried one at a time so
+    a single bad row (e.g. a market_id missing from markets) does not drop
+    the whole chunk.
+    """
+
+    def __init__(
+        self,
+        client,
+        chunk_size: int = METRICS_CHUNK_SIZE,
+        on_written: Optional[Callable[[Dict], None]] = None
+    ):
+        self.client = client
+        self.chunk_size = max(1, chunk_size)
+        self.on_written = on_written
+        self._pending: List[Dict] = []
+        self.written = 0
+        self.failed = 0
+
+    def add(self, market_id: str, metrics: Dict) -> None:
+        """Queue one market's metrics, flushing when a chunk is full"""
+        self._pending.append(_metrics_row(market_id, metrics))
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Upsert all queued rows
+
+        Returns:
+            Number of rows written by this flush
+        """
+        written = 0
+        while self._pending:
+            chunk = self._pending[:self.chunk_size]
+            self._pending = self._pending[self.chunk_size:]
+            try:
+                self.client.table("market_metrics").upsert(chunk).execute()
+                written += len(chunk)
+                self._notify(chunk)
+            except Exception as e:
+                print(f"Bulk metrics upsert failed ({len(chunk)} rows), retrying individually: {e}")
+                for row in chunk:
+                    try:
+                        self.client.table("market_metrics").upsert(row).execute()
+                        written += 1
+                        self._notify([row])
+                    except Exception as row_error:
+                        self.failed += 1
+                        print(f"Error updating market metrics for {row['market_id']}: {row_error}")
+
+        self.written += written
+        return written
+
+    def _notify(self, rows: List[Dict]) -> None:
+        if self.on_written is None:
+            return
+        for row in rows:
+            self.on_written(row)
+
+    def __enter__(self) -> "MarketMetricsWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.flush()
 
 
 class TrendingService:
     def __init__(self):
-        self.conn = SupabaseConnection()
-        self.client = self.conn.get_client()
+        self.client = get_supabase_client()
+        self.leaderboard = TrendingLeaderboard()
+        # One rebuild at a time; cold-start readers wait for it instead of starting their own
+        self._rebuild_lock = threading.Lock()
+        # Caps used for leaderboard scoring; replaced from the data on rebuild in "data" mode
+        self.normalization = {"max_oi": DEFAULT_MAX_OI, "max_vol": DEFAULT_MAX_VOL, "max_liq": DEFAULT_MAX_LIQ}
     
     def calculate_trending_score(
         self,
@@ -59,6 +226,93 @@ class TrendingService:
         # Ensure score is between 0 and 1
         return min(max(score, 0.0), 1.0)
     
+    def _fetch_all(self, query_fn) -> List[Dict]:
+        """Page through a PostgREST query (default responses are capped at 1000 rows)"""
+        rows: List[Dict] = []
+        offset = 0
+        while True:
+            response = query_fn().range(offset, offset + PAGE_SIZE - 1).execute()
+            page = response.data if hasattr(response, 'data') else []
+            rows.extend(page or [])
+            if not page or len(page) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+        return rows
+    
+    def rebuild_leaderboard(self) -> int:
+        """
+        Score every active market and rebuild the in-memory leaderboard
+        
+        Returns:
+            Number of markets on the leaderboard
+        """
+        markets = self._fetch_all(lambda: self.client.table("markets").select(
+            "market_id, market_slug, question, tag_label, tag_id, active, closed"
+        ).eq("active", True).eq("closed", False).order("market_id"))
+        
+        metrics_data = self._fetch_all(lambda: self.client.table("market_metrics").select(
+            "market_id, last_price, open_interest, volume_24h, liquidity"
+        ).order("market_id"))
+        
+        # Create metrics lookup
+        metrics_dict = {m["market_id"]: m for m in metrics_data}
+        
+        market_metrics = [metrics_dict.get(m["market_id"], {}) for m in markets]
+        
+        # Get metrics with defaults
+        open_interest = np.array([float(m.get("open_interest", 0) or 0) for m in market_metrics])
+        volume_24h = np.array([float(m.get("volume_24h", 0) or 0) for m in market_metrics])
+        liquidity = np.array([float(m.get("liquidity", 0) or 0) for m in market_metrics])
+        
+        if TRENDING_NORMALIZATION == "data":
+            self.normalization = normalization_from_distribution(open_interest, volume_24h, liquidity)
+        
+        # Score every market in one vectorized pass
+        scores = calculate_trending_scores(open_interest, volume_24h, liquidity, **self.normalization)
+        
+        entries = []
+        for i, market in enumerate(markets):
+            entries.append({
+                "market_id": market["market_id"],
+                "market_slug": market.get("market_slug"),
+                "question": market.get("question"),
+                "canonical_category": market.get("tag_label"),
+                "trending_score": round(float(scores[i]), 4),
+                "open_interest": float(open_interest[i]),
+                "volume_24h": float(volume_24h[i]),
+                "liquidity": float(liquidity[i]),
+                "last_price": market_metrics[i].get("last_price")
+            })
+        
+        self.leaderboard.rebuild(entries, scores.tolist())
+        return len(entries)
+    
+    def ensure_leaderboard(self) -> bool:
+        """
+        Build the leaderboard if it has never been built (single-flight)
+        
+        A stale board keeps being served; only the first requests after
+        startup wait, and they share one build.
+        
+        Returns:
+            True if the leaderboard is built
+        """
+        if self.leaderboard.is_built:
+            return True
+        with self._rebuild_lock:
+            if not self.leaderboard.is_built:
+                self.rebuild_leaderboard()
+        return self.leaderboard.is_built
+    
+    def refresh_leaderboard(self) -> int:
+        """Rebuild the leaderboard unless a rebuild is already running (background task)"""
+        if not self._rebuild_lock.acquire(blocking=False):
+            return 0
+        try:
+            return self.rebuild_leaderboard()
+        finally:
+            self._rebuild_lock.release()
+    
     def get_trending_markets(
         self,
         category: Optional[str] = None,
@@ -68,6 +322,10 @@ class TrendingService:
         """
         Get trending markets ranked by popularity
         
+        Served from the in-memory leaderboard in O(limit). The board is built
+        once on first use, rebuilt every LEADERBOARD_MAX_AGE seconds by the
+        API's background task and kept current by metric refreshes in between.
+        
         Args:
             category: Optional category filter (e.g., 'politics', 'sports', 'tech')
             limit: Maximum number of results
@@ -77,99 +335,34 @@ class TrendingService:
             List of trending markets with scores
         """
         try:
-            # Build query for markets
-            query = self.client.table("markets").select(
-                "market_id, market_slug, question, tag_label, tag_id, active, closed"
-            )
-            
-            # Filter active markets only
-            query = query.eq("active", True).eq("closed", False)
-            
-            # Filter by category if provided (case-insensitive matching)
-            if category and category.lower() != 'all':
-                # Normalize category name for matching
-                category_normalized = category.lower().strip()
-                # Handle common variations
-                category_map = {
-                    'politics': 'politics',
-                    'sports': 'sports',
-                    'crypto': 'crypto',
-                    'pop-culture': 'pop culture',
-                    'pop culture': 'pop culture',
-                    'business': 'business',
-                    'economy': 'economy',
-                    'science': 'science',
-                    'tech': 'technology',
-                    'technology': 'technology',
-                }
-                mapped_category = category_map.get(category_normalized, category_normalized)
-                query = query.ilike("tag_label", f"%{mapped_category}%")
-            
-            # Get markets
-            markets_response = query.execute()
-            markets = markets_response.data if hasattr(markets_response, 'data') else []
-            
-            if not markets:
-                return []
-            
-            # Get market IDs
-            market_ids = [m["market_id"] for m in markets]
-            
-            # Get metrics for these markets
-            metrics_query = self.client.table("market_metrics").select(
-                "market_id, last_price, open_interest, volume_24h, liquidity"
-            ).in_("market_id", market_ids)
+            self.ensure_leaderboard()
             
-            metrics_response = metrics_query.execute()
-            metrics_data = metrics_response.data if hasattr(metrics_response, 'data') else []
-            
-            # Create metrics lookup
-            metrics_dict = {m["market_id"]: m for m in metrics_data}
-            
-            # Calculate trending scores and combine
-            results = []
-            for market in markets:
-                market_id = market["market_id"]
-                metrics = metrics_dict.get(market_id, {})
-                
-                # Get metrics with defaults
-                open_interest = float(metrics.get("open_interest", 0) or 0)
-                volume_24h = float(metrics.get("volume_24h", 0) or 0)
-                liquidity = float(metrics.get("liquidity", 0) or 0)
-                
-                # Calculate trending score
-                trending_score = self.calculate_trending_score(
-                    open_interest=open_interest,
-                    volume_24h=volume_24h,
-                    liquidity=liquidity
-                )
-                
-                # Skip if below minimum score
-                if trending_score < min_score:
-                    continue
-                
-                results.append({
-                    "market_id": market_id,
-                    "market_slug": market.get("market_slug"),
-                    "question": market.get("question"),
-                    "canonical_category": market.get("tag_label"),
-                    "trending_score": round(trending_score, 4),
-                    "open_interest": open_interest,
-                    "volume_24h": volume_24h,
-                    "liquidity": liquidity,
-                    "last_price": metrics.get("last_price")
-                })
-            
-            # Sort by trending score (descending)
-            results.sort(key=lambda x: x["trending_score"], reverse=True)
-            
-            # Return top N
-            return results[:limit]
+            return self.leaderboard.top(category=category, limit=limit, min_score=min_score)
         
         except Exception as e:
             print(f"Error getting trending markets: {e}")
             return []
     
+    def apply_metrics_row(self, row: Dict) -> bool:
+        """
+        Re-rank a market on the leaderboard after its metrics were written
+        
+        Args:
+            row: market_metrics row (market_id, open_interest, volume_24h, liquidity, last_price)
+        
+        Returns:
+            True if the market is on the leaderboard
+        """
+        if not self.leaderboard.is_built:
+            return False
+        score = float(calculate_trending_scores(
+            [float(row.get("open_interest", 0) or 0)],
+            [float(row.get("volume_24h", 0) or 0)],
+            [float(row.get("liquidity", 0) or 0)],
+            **self.normalization
+        )[0])
+        return self.leaderboard.update(row["market_id"], row, score)
+    
     def update_market_metrics(self, market_id: str, metrics: Dict) -> bool:
         """
         Update or insert market metrics
@@ -182,19 +375,25 @@ class TrendingService:
             True if successful
         """
         try:
-            data = {
-                "market_id": market_id,
-                "last_price": metrics.get("last_price"),
-                "open_interest": metrics.get("open_interest", 0),
-                "volume_24h": metrics.get("volume_24h", 0),
-                "liquidity": metrics.get("liquidity", 0),
-                "updated_at": datetime.utcnow().isoformat()
-            }
+            data = _metrics_row(market_id, metrics)
             
             # Upsert metrics
             self.client.table("market_metrics").upsert(data).execute()
+            self.apply_metrics_row(data)
             return True
         
         except Exception as e:
             print(f"Error updating market metrics: {e}")
             return False
+    
+    def metrics_writer(self, chunk_size: int = METRICS_CHUNK_SIZE) -> MarketMetricsWriter:
+        """
+        Create a bulk writer on this service's client
+        
+        Args:
+            chunk_size: Rows per upsert request
+        
+        Returns:
+            MarketMetricsWriter (use as a context manager)
+        """
+        return MarketMetricsWriter(self.client, chunk_size=chunk_size, on_written=self.apply_metrics_row)
@@ -0,0 +1,457 @@
+"""
+Vector Index Service
+Resident in-process ANN index over markets.embedding for semantic search
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+from database.supabase_connection import get_supabase_client
+
+INDEX_COLUMNS = "market_id, question, market_slug, tag_label, clob_token_ids, embedding, updated_at"
+PAGE_SIZE = 1000
+
+# IVF parameters: below IVF_MIN_ROWS an exact scan is already sub-millisecond
+IVF_MIN_ROWS = int(os.getenv("VECTOR_INDEX_IVF_MIN_ROWS", "4096"))
+NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", "8"))
+KMEANS_ITERATIONS = 8
+KMEANS_SAMPLE_PER_LIST = 64
+
+
+def parse_embedding(value: Any) -> Optional[np.ndarray]:
+    """
+    Parse a pgvector value into a unit-length float32 vector
+
+    PostgREST returns vector columns as text ('[0.1,0.2,...]'), while
+    psycopg2 or already-decoded JSON may give a list.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            return None
+    try:
+        vec = np.asarray(value, dtype=np.float32)
+    except (TypeError, ValueError):
+        return None
+    if vec.ndim != 1 or vec.size == 0:
+        return None
+    norm = float(np.linalg.norm(vec))
+    if norm == 0.0:
+        return None
+    return vec / norm
+
+
+def normalize_question(text: Optional[str]) -> str:
+    """Key for exact question lookups: case-folded with whitespace collapsed"""
+    return " ".join((text or "").split()).casefold()
+
+
+def _train_centroids(vectors: np.ndarray, nlist: int, seed: int = 0) -> np.ndarray:
+    """Spherical k-means over a sample of rows; returns unit-length centroids"""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), nlist * KMEANS_SAMPLE_PER_LIST)
+    sample = vectors[rng.choice(len(vectors), size=sample_size, replace=False)]
+    centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+    for _ in range(KMEANS_ITERATIONS):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        norms = np.linalg.norm(sums, axis=1)
+        filled = norms > 0
+        # Empty lists keep their previous centroid
+        centroids[filled] = sums[filled] / norms[filled, None]
+
+    return centroids
+
+
+class VectorIndex:
+    """
+    In-memory cosine index over market embeddings.
+
+    Rows are stored L2-normalized in a float32 matrix so cosine similarity is
+    a dot product. Once the index holds IVF_MIN_ROWS rows it is partitioned
+    into an inverted file (IVF) of sqrt(N) lists and queries scan only the
+    NPROBE closest lists; smaller indexes are scanned exactly.
+    """
+
+    def __init__(self, nprobe: int = NPROBE):
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        self._dim: Optional[int] = None
+        self._size = 0
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._meta: List[Dict[str, Any]] = []
+        self._row_by_id: Dict[str, int] = {}
+        # Normalized question -> live rows (several markets may share a question)
+        self._rows_by_question: Dict[str, Set[int]] = {}
+        # updated_at last applied per market, so rows re-read at the watermark are skipped
+        self._applied_at: Dict[str, str] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._lists: List[np.ndarray] = []
+        self._list_vectors: List[np.ndarray] = []
+        self._dirty_lists: set = set()
+        self._trained_size = 0
+        self._watermark: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+
+    @property
+    def is_warm(self) -> bool:
+        """True once a full load has completed and the index holds vectors"""
+        return self.loaded_at is not None and self._size > 0
+
+    def __len__(self) -> int:
+        return int(self._alive[:self._size].sum())
+
+    def stats(self) -> Dict[str, Any]:
+        """Index size and layout, for diagnostics"""
+        with self._lock:
+            return {
+                "warm": self.is_warm,
+                "rows": len(self),
+                "dim": self._dim,
+                "ivf_lists": len(self._lists),
+                "nprobe": self.nprobe,
+                "loaded_at": self.loaded_at,
+                "watermark": self._watermark,
+            }
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def load(self, client=None) -> int:
+        """
+        Full load of every market with an embedding
+
+        Args:
+            client: Optional Supabase client (the shared client otherwise)
+
+        Returns:
+            Number of indexed markets
+        """
+        client = client or get_supabase_client()
+        rows = self._fetch_rows(client)
+
+        fresh = VectorIndex(nprobe=self.nprobe)
+        fresh._upsert_rows(rows)
+        fresh._rebuild_ivf()
+
+        with self._lock:
+            for name, value in vars(fresh).items():
+                if name not in ("_lock", "nprobe"):
+                    setattr(self, name, value)
+            self.loaded_at = time.time()
+            count = len(self)
+
+        print(f"[VectorIndex] Loaded {count} market embeddings")
+        return count
+
+    def refresh(self, client=None) -> int:
+        """
+        Incremental refresh: pull only markets updated since the last load
+
+        Falls back to a full load when the index is cold.
+
+        Returns:
+            Number of rows applied
+        """
+        if not self.is_warm or self._watermark is None:
+            return self.load(client)
+
+        client = client or get_supabase_client()
+        rows = self._fetch_rows(client, since=self._watermark)
+        if not rows:
+            return 0
+
+        with self._lock:
+            applied = self._upsert_rows(rows)
+            if not applied:
+                return 0
+            if self._centroids is None or self._size >= 2 * max(self._trained_size, 1):
+                self._rebuild_ivf()
+
+        return applied
+
+    def _fetch_rows(self, client, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Page through markets (optionally only those updated at or after `since`)"""
+        rows: List[Dict[str, Any]] = []
+        offset = 0
+        while True:
+            query = client.table("markets").select(INDEX_COLUMNS)
+            if since is None:
+                query = query.not_.is_("embedding", "null").order("market_id")
+            else:
+                # gte: a row committed with the watermark's timestamp after the
+                # previous read must not be skipped; already-applied rows are
+                # dropped in _upsert_rows
+                query = query.gte("updated_at", since).order("updated_at")
+            response = query.range(offset, offset + PAGE_SIZE - 1).execute()
+            page = response.data or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+        return rows
+
+    def _upsert_rows(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert or replace rows by market_id; rows without a vector are retired. Returns rows applied"""
+        applied = 0
+        latest = {}
+        for row in rows:
+            if row.get("market_id"):
+                latest[row["market_id"]] = row
+
+        for market_id, row in latest.items():
+            updated_at = row.get("updated_at")
+            if updated_at and self._applied_at.get(market_id) == updated_at:
+                continue
+            if updated_at:
+                self._applied_at[market_id] = updated_at
+            applied += 1
+
+            if updated_at and (self._watermark is None or updated_at > self._watermark):
+                self._watermark = updated_at
+
+            vec = parse_embedding(row.get("embedding"))
+            existing = self._row_by_id.get(market_id)
+
+            if vec is None or (self._dim is not None and vec.size != self._dim):
+                if existing is not None:
+                    self._retire(existing)
+                continue
+
+            meta = {
+                "market_id": market_id,
+                "question": row.get("question"),
+                "market_slug": row.get("market_slug"),
+                "tag_label": row.get("tag_label"),
+                "clob_token_ids": row.get("clob_token_ids"),
+            }
+
+            if existing is not None:
+                self._unindex_question(existing)
+                self._vectors[existing] = vec
+                self._meta[existing] = meta
+                self._reassign(existing)
+                row_idx = existing
+            else:
+                row_idx = self._append(vec)
+                self._meta.append(meta)
+                self._row_by_id[market_id] = row_idx
+
+            question = normalize_question(meta["question"])
+            if question:
+                self._rows_by_question.setdefault(question, set()).add(row_idx)
+
+        return applied
+
+    def _unindex_question(self, row_idx: int) -> None:
+        question = normalize_question(self._meta[row_idx].get("question"))
+        rows = self._rows_by_question.get(question)
+        if rows is not None:
+            rows.discard(row_idx)
+            if not rows:
+                del self._rows_by_question[question]
+
+    def _append(self, vec: np.ndarray) -> int:
+        """Append a vector, growing the backing matrix geometrically"""
+        if self._dim is None:
+            self._dim = int(vec.size)
+            self._vectors = np.zeros((0, self._dim), dtype=np.float32)
+
+        if self._size == len(self._vectors):
+            capacity = max(1024, 2 * len(self._vectors))
+            grown = np.zeros((capacity, self._dim), dtype=np.float32)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+            alive = np.zeros(capacity, dtype=bool)
+            alive[:self._size] = self._alive[:self._size]
+            self._alive = alive
+            assign = np.full(capacity, -1, dtype=np.int32)
+            assign[:self._size] = self._assign[:self._size]
+            self._assign = assign
+
+        row_idx = self._size
+        self._vectors[row_idx] = vec
+        self._alive[row_idx] = True
+        self._size += 1
+        self._reassign(row_idx)
+        return row_idx
+
+    def _retire(self, row_idx: int) -> None:
+        self._alive[row_idx] = False
+        old = int(self._assign[row_idx])
+        if old >= 0:
+            self._lists[old] = self._lists[old][self._lists[old] != row_idx]
+            self._dirty_lists.add(old)
+            self._assign[row_idx] = -1
+        self._row_by_id.pop(self._meta[row_idx]["market_id"], None)
+        self._unindex_question(row_idx)
+
+    # ------------------------------------------------------------------
+    # IVF maintenance
+    # ------------------------------------------------------------------
+
+    def _rebuild_ivf(self) -> None:
+        """(Re)train centroids and rebuild inverted lists over all live rows"""
+        live_rows = np.flatnonzero(self._alive[:self._size])
+        self._trained_size = self._size
+
+        if len(live_rows) < IVF_MIN_ROWS:
+            self._centroids = None
+            self._lists = []
+            self._list_vectors = []
+            self._dirty_lists = set()
+            return
+
+        nlist = max(1, int(np.sqrt(len(live_rows))))
+        self._centroids = _train_centroids(self._vectors[live_rows], nlist)
+
+        assign = np.argmax(self._vectors[live_rows] @ self._centroids.T, axis=1).astype(np.int32)
+        self._assign[:self._size] = -1
+        self._assign[live_rows] = assign
+
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(nlist + 1))
+        sorted_rows = live_rows[order]
+        self._lists = [sorted_rows[bounds[c]:bounds[c + 1]] for c in range(nlist)]
+        self._list_vectors = [np.ascontiguousarray(self._vectors[rows]) for rows in self._lists]
+        self._dirty_lists = set()
+
+    def _reassign(self, row_idx: int) -> None:
+        """Move a single row to its nearest list after an insert or update"""
+        if self._centroids is None:
+            return
+        old = int(self._assign[row_idx])
+        new = int(np.argmax(self._centroids @ self._vectors[row_idx]))
+        # The row's vector may have changed even if its list did not
+        self._dirty_lists.add(new)
+        if old == new:
+            return
+        if old >= 0:
+            self._lists[old] = self._lists[old][self._lists[old] != row_idx]
+            self._dirty_lists.add(old)
+        self._lists[new] = np.append(self._lists[new], row_idx)
+        self._assign[row_idx] = new
+
+    def _flush_dirty_lists(self) -> None:
+        """Re-gather the contiguous vector block of lists touched by updates"""
+        for c in self._dirty_lists:
+            self._list_vectors[c] = np.ascontiguousarray(self._vectors[self._lists[c]])
+        self._dirty_lists = set()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def get(self, market_id: str) -> Optional[Dict[str, Any]]:
+        """Metadata for an indexed market"""
+        row_idx = self._row_by_id.get(market_id)
+        return dict(self._meta[row_idx]) if row_idx is not None else None
+
+    def find_by_question(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Market whose question equals `text` (ignoring case and whitespace)
+
+        A single dict lookup; partial titles are matched in the database
+        (ilike) by the caller, which can then search the index by market_id.
+        """
+        needle = normalize_question(text)
+        if not needle:
+            return None
+
+        with self._lock:
+            rows = self._rows_by_question.get(needle)
+            # Earliest-indexed market when several share the question
+            return dict(self._meta[min(rows)]) if rows else None
+
+    def search(
+        self,
+        market_id: str,
+        k: int = 20,
+        min_similarity: float = 0.0
+    ) -> List[Dict[str, Any]]:
+        """
+        Top-k markets most similar to an indexed market (excluding itself)
+
+        Returns:
+            List of market metadata dicts with a `similarity` key, best first
+        """
+        with self._lock:
+            row_idx = self._row_by_id.get(market_id)
+            if row_idx is None:
+                return []
+            return self._search(self._vectors[row_idx], k, min_similarity, exclude=row_idx)
+
+    def search_vector(
+        self,
+        vector: Any,
+        k: int = 20,
+        min_similarity: float = 0.0
+    ) -> List[Dict[str, Any]]:
+        """Top-k markets most similar to an arbitrary embedding"""
+        query = parse_embedding(vector)
+        if query is None or query.size != self._dim:
+            return []
+        with self._lock:
+            return self._search(query, k, min_similarity)
+
+    def _search(
+        self,
+        query: np.ndarray,
+        k: int,
+        min_similarity: float,
+        exclude: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        if self._size == 0 or k <= 0:
+            return []
+
+        if self._centroids is not None and self.nprobe < len(self._lists):
+            if self._dirty_lists:
+                self._flush_dirty_lists()
+            centroid_scores = self._centroids @ query
+            probe = np.argpartition(-centroid_scores, self.nprobe - 1)[:self.nprobe]
+            # Each list's vectors are stored contiguously, so probing is a few
+            # small GEMVs rather than a gather over the full matrix
+            candidates = np.concatenate([self._lists[c] for c in probe])
+            scores = np.concatenate([self._list_vectors[c] @ query for c in probe])
+        else:
+            candidates = np.flatnonzero(self._alive[:self._size])
+            scores = self._vectors[candidates] @ query
+
+        if exclude is not None:
+            keep = candidates != exclude
+            candidates, scores = candidates[keep], scores[keep]
+        if len(candidates) == 0:
+            return []
+
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for i in top:
+            similarity = float(scores[i])
+            if similarity < min_similarity:
+                break
+            hit = dict(self._meta[candidates[i]])
+            hit["similarity"] = max(-1.0, min(1.0, similarity))
+            results.append(hit)
+        return results
@@ -0,0 +1,117 @@
+"""Pairwise-complete correlations in backend/services/correlation.py."""
+
+import asyncio
+import importlib.util
+import os
+import sys
+import time
+
+import numpy as np
+
+# The backend is its own app (imports `clients`, `config`); load the module by
+# path so its `services` package does not shadow the top-level one
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+_spec = importlib.util.spec_from_file_location(
+    "backend_correlation", os.path.join(BACKEND_DIR, "services", "correlation.py")
+)
+correlation = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(correlation)
+
+
+def _returns_with_gaps(rows=200, columns=6, seed=7):
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=(rows, 1))
+    values = 0.6 * base + rng.normal(size=(rows, columns))
+    values[rng.random(values.shape) < 0.3] = np.nan
+    return values
+
+
+def test_matches_corrcoef_on_overlapping_rows():
+    values = _returns_with_gaps()
+    corr, counts = correlation.masked_correlation(values)
+
+    n = values.shape[1]
+    for i in range(n):
+        for j in range(n):
+            both = ~np.isnan(values[:, i]) & ~np.isnan(values[:, j])
+            assert counts[i, j] == both.sum()
+            expected = np.corrcoef(values[both, i], values[both, j])[0, 1]
+            np.testing.assert_allclose(corr[i, j], expected, rtol=0, atol=1e-10)
+
+
+def test_pairs_below_min_overlap_are_nan():
+    values = _returns_with_gaps(rows=40)
+    # Column 5 overlaps column 4 on only three rows
+    values[:, 4] = np.nan
+    values[:3, 4] = [0.1, -0.2, 0.3]
+    values[:, 5] = np.nan
+    values[:3, 5] = [0.2, 0.1, -0.1]
+    values[3:10, 5] = np.linspace(-1, 1, 7)
+
+    corr, counts = correlation.masked_correlation(values, min_periods=correlation.MIN_OVERLAP)
+
+    assert counts[4, 5] == 3
+    assert np.isnan(corr[4, 5]) and np.isnan(corr[5, 4])
+    assert not np.isnan(corr[0, 1])
+
+
+def test_constant_column_is_nan():
+    values = _returns_with_gaps(rows=50)
+    values[:, 2] = 0.5
+    corr, _ = correlation.masked_correlation(values)
+    assert np.isnan(corr[2, 0]) and np.isnan(corr[0, 2])
+
+
+def test_coverage_counts_defined_pairs():
+    corr = np.array([
+        [1.0, 0.2, np.nan],
+        [0.2, 1.0, np.nan],
+        [np.nan, np.nan, 1.0],
+    ])
+    assert correlation.correlation_coverage(corr) == 1 / 3
+    assert correlation.correlation_coverage(np.ones((1, 1))) == 0.0
+
+
+class FakeClob:
+    """get_price_history_window over fixed hourly price series"""
+
+    def __init__(self, series):
+        self.series = series
+        self.calls = []
+
+    async def get_price_history_window(self, token_id, days=30):
+        self.calls.append(token_id)
+        return self.series.get(token_id, [])
+
+
+def _hourly(prices, start):
+    return [{"timestamp": int(start + i * 3600), "price": p} for i, p in enumerate(prices)]
+
+
+def test_service_reports_overlap_and_none_for_short_pairs():
+    rng = np.random.default_rng(3)
+    start = (time.time() - 10 * 86400) // 3600 * 3600
+    walk = 0.5 + np.cumsum(rng.normal(scale=0.01, size=100))
+    clob = FakeClob({
+        "a": _hourly(walk, start),
+        "b": _hourly(walk + rng.normal(scale=0.002, size=100), start),
+        # Only four prices (three returns) inside a's range
+        "c": _hourly([0.4, 0.41, 0.39, 0.42], start + 50 * 3600),
+    })
+    service = correlation.CorrelationService(clob)
+    store = service.returns_store(max_days=30)
+
+    async def run():
+        await store.load_many(["a", "b", "c", "a"])
+        return await service.get_pair_correlation("a", "c", store=store)
+
+    assert asyncio.run(run()) is None
+    assert sorted(clob.calls) == ["a", "b", "c"]  # each token fetched once
+
+    corr, counts = service.pairwise_correlations(["a", "b", "c"], store)
+    assert counts[0, 1] == 99 and counts[0, 2] == 3
+    assert corr[0, 1] > 0.9
+    assert np.isnan(corr[0, 2])
+    assert service.pair_correlations("a", ["b", "c"], store) == [float(corr[0, 1]), None]
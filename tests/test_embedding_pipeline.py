@@ -0,0 +1,185 @@
+"""Offline EmbeddingPipeline runs: HashingEmbedder plus an in-memory markets table."""
+
+import hashlib
+import json
+from types import SimpleNamespace
+
+from services.embedding_pipeline import EMBEDDING_DIM, EmbeddingPipeline, HashingEmbedder, source_hash
+
+
+class FakeQuery:
+    def __init__(self, client):
+        self.client = client
+        self.start = 0
+        self.end = None
+
+    def select(self, columns):
+        return self
+
+    def order(self, column):
+        return self
+
+    def range(self, start, end):
+        self.start, self.end = start, end
+        return self
+
+    def execute(self):
+        self.client.selects += 1
+        rows = sorted(self.client.markets.values(), key=lambda row: row["market_id"])
+        return SimpleNamespace(data=[dict(row) for row in rows[self.start:self.end + 1]])
+
+
+class FakeRpc:
+    def __init__(self, client, params):
+        self.client = client
+        self.params = params
+
+    def execute(self):
+        # Mirrors write_market_embeddings() (migration 010)
+        self.client.write_calls += 1
+        updated = 0
+        for row in self.params["rows"]:
+            market = self.client.markets.get(row["market_id"])
+            if market is None or market["question"] != row["question"]:
+                continue
+            market["embedding"] = row["embedding"]
+            market["embedding_source_hash"] = row["embedding_source_hash"]
+            updated += 1
+        return SimpleNamespace(data=updated)
+
+
+class FakeClient:
+    def __init__(self, markets):
+        self.markets = {row["market_id"]: dict(row) for row in markets}
+        self.selects = 0
+        self.write_calls = 0
+
+    def table(self, name):
+        assert name == "markets"
+        return FakeQuery(self)
+
+    def rpc(self, name, params):
+        assert name == "write_market_embeddings"
+        return FakeRpc(self, params)
+
+
+def _markets(n):
+    return [
+        {"market_id": f"m{i:03d}", "question": f"Will team {i} win the final?", "embedding_source_hash": None}
+        for i in range(n)
+    ]
+
+
+def _pipeline(client, embed_fn, model, checkpoint_path, batch_size=10):
+    return EmbeddingPipeline(
+        embed_fn,
+        model,
+        client=client,
+        batch_size=batch_size,
+        workers=1,
+        requests_per_second=0,
+        checkpoint_path=str(checkpoint_path),
+    )
+
+
+def test_source_hash_matches_migration_sql():
+    # encode(sha256(convert_to(model || E'\n' || question, 'UTF8')), 'hex')
+    expected = hashlib.sha256("models/text-embedding-004\nWill it rain?".encode("utf-8")).hexdigest()
+    assert source_hash("models/text-embedding-004", "Will it rain?") == expected
+
+
+def test_hashing_embedder_is_deterministic_and_normalized():
+    embedder = HashingEmbedder()
+    first, second = embedder(["Will team 1 win?", "Will team 1 win?"])
+    assert first == second
+    assert len(first) == EMBEDDING_DIM
+    assert abs(sum(v * v for v in first) - 1.0) < 1e-5
+
+
+def test_find_stale_uses_the_source_hash(tmp_path):
+    embedder = HashingEmbedder()
+    markets = _markets(4)
+    markets[0]["embedding_source_hash"] = source_hash(embedder.model, markets[0]["question"])
+    markets[1]["embedding_source_hash"] = source_hash("some/other-model", markets[1]["question"])
+    markets[2]["question"] = "   "
+    client = FakeClient(markets)
+
+    pending = _pipeline(client, embedder, embedder.model, tmp_path / "ckpt.json").find_stale()
+
+    assert [item["market_id"] for item in pending] == ["m001", "m003"]
+    assert pending[1]["source_hash"] == source_hash(embedder.model, "Will team 3 win the final?")
+
+
+def test_run_writes_in_bulk_and_skips_reworded_markets(tmp_path):
+    embedder = HashingEmbedder()
+    client = FakeClient(_markets(25))
+    pipeline = _pipeline(client, embedder, embedder.model, tmp_path / "ckpt.json")
+
+    original = pipeline._embed_batch
+
+    def embed_and_reword(batch):
+        # A market is reworded after the work list was built
+        client.markets["m004"]["question"] = "Reworded question"
+        return original(batch)
+
+    pipeline._embed_batch = embed_and_reword
+    summary = pipeline.run()
+
+    assert summary["embedded"] == 25 and summary["failed"] == 0
+    assert summary["written"] == 24
+    assert client.write_calls == 1  # every row fits one WRITE_CHUNK_SIZE chunk
+    assert client.markets["m004"]["embedding_source_hash"] is None
+    assert client.markets["m005"]["embedding_source_hash"] == source_hash(embedder.model, "Will team 5 win the final?")
+    assert not (tmp_path / "ckpt.json").exists()
+
+    # Everything is now current: a second run has nothing to do but the reworded market
+    assert [item["market_id"] for item in pipeline.find_stale()] == ["m004"]
+
+
+def test_interrupted_run_resumes_from_checkpoint(tmp_path):
+    embedder = HashingEmbedder()
+    checkpoint_path = tmp_path / "ckpt.json"
+    client = FakeClient(_markets(30))
+    calls = []
+
+    def flaky(texts):
+        calls.append(len(texts))
+        if len(calls) == 2:
+            raise RuntimeError("quota exceeded")
+        return embedder(texts)
+
+    summary = _pipeline(client, flaky, embedder.model, checkpoint_path).run()
+    assert summary["failed"] == 10 and summary["written"] == 20
+
+    checkpoint = json.loads(checkpoint_path.read_text())
+    assert len(checkpoint["pending"]) == 30
+    assert len(checkpoint["completed"]) == 20
+
+    selects = client.selects
+    resumed_calls = []
+
+    def counting(texts):
+        resumed_calls.append(len(texts))
+        return embedder(texts)
+
+    summary = _pipeline(client, counting, embedder.model, checkpoint_path).run()
+
+    assert client.selects == selects  # the work list came from the checkpoint
+    assert resumed_calls == [10]
+    assert summary["pending"] == 10 and summary["written"] == 10
+    assert not checkpoint_path.exists()
+    assert all(
+        row["embedding_source_hash"] == source_hash(embedder.model, row["question"])
+        for row in client.markets.values()
+    )
+
+
+def test_checkpoint_for_another_model_is_ignored(tmp_path):
+    embedder = HashingEmbedder()
+    checkpoint_path = tmp_path / "ckpt.json"
+    checkpoint_path.write_text(json.dumps({"model": "other", "pending": [], "completed": []}))
+    client = FakeClient(_markets(3))
+
+    summary = _pipeline(client, embedder, embedder.model, checkpoint_path).run()
+
+    assert summary["pending"] == 3 and summary["written"] == 3
@@ -0,0 +1,48 @@
+"""Vectorized trending scores must agree with TrendingService.calculate_trending_score."""
+
+import numpy as np
+
+from services.trending import TrendingService, calculate_trending_scores
+
+
+def _scalar_scores(open_interest, volume_24h, liquidity):
+    # The scalar method only uses its arguments; skip __init__ (no database)
+    service = object.__new__(TrendingService)
+    return np.array([
+        service.calculate_trending_score(open_interest=oi, volume_24h=vol, liquidity=liq)
+        for oi, vol, liq in zip(open_interest, volume_24h, liquidity)
+    ])
+
+
+def _assert_equivalent(open_interest, volume_24h, liquidity):
+    vectorized = calculate_trending_scores(open_interest, volume_24h, liquidity)
+    scalar = _scalar_scores(open_interest, volume_24h, liquidity)
+
+    # math.log1p and np.log1p may differ in the last bit, nothing more
+    np.testing.assert_allclose(vectorized, scalar, rtol=0, atol=1e-12)
+    # Identical at the precision scores are stored and served with
+    assert [round(float(v), 4) for v in vectorized] == [round(float(s), 4) for s in scalar]
+
+
+def test_randomized_inputs_match_scalar():
+    rng = np.random.default_rng(20240601)
+    n = 20000
+    _assert_equivalent(
+        rng.lognormal(10, 3, n),
+        rng.lognormal(8, 3, n),
+        rng.lognormal(7, 3, n),
+    )
+
+
+def test_edge_values_match_scalar():
+    values = [0.0, -5.0, 1e-9, 0.5, 1.0, 50000.0, 100000.0, 1000000.0, 5e6, 1e12]
+    grid = np.array(np.meshgrid(values, values, values)).reshape(3, -1)
+    _assert_equivalent(*grid)
+
+
+def test_scores_are_bounded():
+    rng = np.random.default_rng(7)
+    scores = calculate_trending_scores(
+        rng.normal(0, 1e7, 1000), rng.normal(0, 1e6, 1000), rng.normal(0, 1e5, 1000)
+    )
+    assert scores.min() >= 0.0 and scores.max() <= 1.0